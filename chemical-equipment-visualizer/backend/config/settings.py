@@ -112,6 +112,43 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Vital for Render: Use Whitenoise to serve static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Uploaded files spooled for background ingestion live under MEDIA_ROOT
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Resumable upload sessions: the largest file a session may declare, and
+# seconds before an unfinished session and its chunks are removed.
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(2 * 1024 ** 3)))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', str(24 * 60 * 60)))
+
+# Worker threads per process that drain the ingestion job queue.
+# Set to 0 to leave jobs for `manage.py process_ingest_jobs` instead.
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', '2'))
+
+# Seconds a running ingestion job may go without progress before it is
+# considered abandoned (worker crashed or restarted) and queued again.
+INGEST_JOB_TIMEOUT = int(os.environ.get('INGEST_JOB_TIMEOUT', '600'))
+
+# Total bytes of cached Parquet exports kept under MEDIA_ROOT/exports;
+# the least recently used files are removed beyond this.
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', str(1024 ** 3)))
+
+# Worker threads per process that render queued PDF reports.
+# Set to 0 to leave them for `manage.py process_reports` instead.
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '1'))
+
+# Seconds a report may stay running before it is treated as lost (its
+# worker died) and queued again.
+REPORT_TIMEOUT = int(os.environ.get('REPORT_TIMEOUT', '600'))
+
+# Response cache for the dataset summary endpoints. Per-process memory by
+# default; point CACHE_URL at Redis (redis://...) to share it between workers.
+# Version pointers (and so 304s without a query) need the shared cache.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 # NOTE: Removed STATICFILES_DIRS pointing to frontend/dist 
 # because that folder does not exist on the backend server.
 
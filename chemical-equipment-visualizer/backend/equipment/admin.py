@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Equipment, Dataset
+from .models import Equipment, Dataset, DatasetSummary, IngestJob, ReportArtifact, TypeRollup
 
 admin.site.register(Equipment)
 admin.site.register(Dataset)
+admin.site.register(DatasetSummary)
+admin.site.register(IngestJob)
+admin.site.register(TypeRollup)
+admin.site.register(ReportArtifact)
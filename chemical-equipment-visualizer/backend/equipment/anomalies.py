@@ -0,0 +1,130 @@
+"""Per-type outlier flags for Equipment rows.
+
+Each row is compared with the other rows of the same type in its dataset,
+for pressure and temperature, by two rules:
+
+* ``zscore``: more than ``Z_THRESHOLD`` standard deviations from the mean;
+* ``iqr``: outside ``[Q1 - IQR_FACTOR * IQR, Q3 + IQR_FACTOR * IQR]``.
+
+Every (parameter, rule) pair is one bit of ``Equipment.anomaly_flags``;
+``is_anomalous`` is set when any bit is, and is covered by a partial index.
+
+Frames about to be loaded are flagged with pandas group transforms
+(``flag_columns``). Rows already stored are reflagged in the database
+(``flag_dataset``): per-type mean and standard deviation come from
+aggregates and the quartiles from ordered single-row reads, then one
+``UPDATE ... CASE`` per type rewrites the rows whose flags changed, so no
+rows are loaded into Python.
+"""
+import math
+from functools import reduce
+from operator import add, or_
+
+import pandas as pd
+from django.db.models import Avg, Case, Count, F, Q, StdDev, Value, When
+from django.db.models.lookups import Exact
+
+from .models import Equipment
+
+Z_THRESHOLD = 3.0
+IQR_FACTOR = 1.5
+
+CHECKED = ('pressure', 'temperature')
+RULES = ('zscore', 'iqr')
+FLAGS = {
+    f'{parameter}_{rule}': 1 << i
+    for i, (parameter, rule) in enumerate((p, r) for p in CHECKED for r in RULES)
+}
+
+def compute_flags(frame):
+    """Integer Series of flag bits for a frame with ``type`` and the checked parameters."""
+    flags = pd.Series(0, index=frame.index, dtype='int64')
+    if frame.empty:
+        return flags
+    groups = frame.groupby('type')
+    for parameter in CHECKED:
+        values = frame[parameter]
+        column = groups[parameter]
+
+        std = column.transform('std', ddof=0)
+        z = (values - column.transform('mean')).abs() / std.where(std > 0)
+        flags |= (z > Z_THRESHOLD).astype('int64') * FLAGS[f'{parameter}_zscore']
+
+        q1 = column.transform('quantile', 0.25)
+        q3 = column.transform('quantile', 0.75)
+        spread = IQR_FACTOR * (q3 - q1)
+        outside = (values < q1 - spread) | (values > q3 + spread)
+        flags |= outside.astype('int64') * FLAGS[f'{parameter}_iqr']
+    return flags
+
+
+def flag_columns(frame):
+    """``frame`` with ``anomaly_flags``/``is_anomalous`` columns, ready for the loaders."""
+    flags = compute_flags(frame)
+    return frame.assign(anomaly_flags=flags, is_anomalous=flags != 0)
+
+
+def describe(flags):
+    """Names of the rules set in ``flags``."""
+    return [name for name, bit in FLAGS.items() if flags & bit]
+
+
+def _quantile(rows, parameter, count, q):
+    """``q`` quantile of ``parameter`` over ``rows`` by linear interpolation, as pandas does."""
+    position = (count - 1) * q
+    low = math.floor(position)
+    values = list(rows.order_by(parameter).values_list(parameter, flat=True)[low:low + 2])
+    if len(values) == 1 or position == low:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (position - low)
+
+
+def _type_conditions(rows):
+    """``{flag name: Q}`` matching the outliers among ``rows`` (one dataset and type)."""
+    aggregates = {'count': Count('id')}
+    for parameter in CHECKED:
+        aggregates[f'mean_{parameter}'] = Avg(parameter)
+        aggregates[f'std_{parameter}'] = StdDev(parameter)
+    stats = rows.aggregate(**aggregates)
+    conditions = {}
+    if not stats['count']:
+        return conditions
+    for parameter in CHECKED:
+        mean, std = stats[f'mean_{parameter}'], stats[f'std_{parameter}']
+        if std and std > 0:
+            reach = Z_THRESHOLD * std
+            conditions[f'{parameter}_zscore'] = (
+                Q(**{f'{parameter}__gt': mean + reach}) | Q(**{f'{parameter}__lt': mean - reach})
+            )
+        q1 = _quantile(rows, parameter, stats['count'], 0.25)
+        q3 = _quantile(rows, parameter, stats['count'], 0.75)
+        spread = IQR_FACTOR * (q3 - q1)
+        conditions[f'{parameter}_iqr'] = (
+            Q(**{f'{parameter}__lt': q1 - spread}) | Q(**{f'{parameter}__gt': q3 + spread})
+        )
+    return conditions
+
+
+def flag_dataset(dataset, types=None):
+    """Recompute the flags of the rows in ``dataset`` in the database.
+
+    With ``types``, only rows of those types are reflagged (an edit only
+    moves its own type's statistics). Only rows whose flags change are
+    written. Returns the number of anomalous rows in the dataset.
+    """
+    rows = Equipment.objects.filter(dataset=dataset)
+    if types is None:
+        types = rows.values_list('type', flat=True).distinct().order_by()
+    for type_ in list(types):
+        typed = rows.filter(type=type_)
+        conditions = _type_conditions(typed)
+        if conditions:
+            flags = reduce(add, (
+                Case(When(condition, then=Value(FLAGS[name])), default=Value(0))
+                for name, condition in conditions.items()
+            ))
+            anomalous = Case(When(reduce(or_, conditions.values()), then=Value(True)), default=Value(False))
+        else:
+            flags, anomalous = Value(0), Value(False)
+        typed.exclude(Exact(F('anomaly_flags'), flags)).update(anomaly_flags=flags, is_anomalous=anomalous)
+    return rows.filter(is_anomalous=True).count()
@@ -3,3 +3,23 @@ from django.apps import AppConfig
 class EquipmentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'equipment'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from .cache import dataset_deleted, summary_saved
+        from .jobs import kick_on_first_request
+        from .loaders import tune_sqlite
+        from .models import Dataset, DatasetSummary, ReportArtifact
+        from .reports import artifact_deleted
+        from .search import restore_search_triggers
+        connection_created.connect(tune_sqlite)
+        # Migrations that rebuild the Equipment table drop the search triggers.
+        post_migrate.connect(restore_search_triggers, sender=self)
+        # Pick up jobs queued or orphaned before this process started.
+        request_started.connect(kick_on_first_request)
+        post_save.connect(summary_saved, sender=DatasetSummary)
+        post_delete.connect(summary_saved, sender=DatasetSummary)
+        post_delete.connect(dataset_deleted, sender=Dataset)
+        post_delete.connect(artifact_deleted, sender=ReportArtifact)
@@ -0,0 +1,112 @@
+"""Versioned response cache for the dataset summary endpoints.
+
+Cached bodies are keyed by version tokens, so they never need to be
+purged: a write simply moves the token on. The tokens themselves live in
+the cache as small pointers:
+
+* one per dataset, holding its DatasetSummary ``version`` and
+  ``updated_at``;
+* one list generation, derived from every summary's latest write.
+
+Writes delete the pointers (immediately and again once committed), and the
+next reader reloads them from the database. A write in one process cannot
+delete another process's pointers, so they are only cached when the cache
+is shared (Redis via ``CACHE_URL``); with the default per-process LocMem
+cache every request reads them from the database, and only bodies are
+cached. The same tokens drive ETag / Last-Modified, letting a conditional
+GET be answered with 304 from a shared cache alone.
+"""
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Dataset, DatasetSummary
+
+# Seconds a version pointer may be served before it is re-read (a backstop;
+# writes delete them).
+POINTER_TTL = 30
+
+# Seconds a rendered body is kept; its key changes on every write anyway.
+BODY_TTL = 60 * 60
+
+GENERATION_KEY = 'equipment:datasets:generation'
+
+
+def _pointer_key(pk):
+    return f'equipment:dataset:{pk}:version'
+
+
+def _shared():
+    """Whether every process sees the same cache, so writes can invalidate pointers."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def dataset_version(pk):
+    """``{'etag', 'modified'}`` for dataset ``pk``, or None if it does not exist."""
+    key = _pointer_key(pk)
+    shared = _shared()
+    pointer = cache.get(key) if shared else None
+    if pointer is None:
+        row = DatasetSummary.objects.filter(dataset_id=pk).values_list('version', 'updated_at').first()
+        if row is None:
+            dataset = Dataset.objects.filter(pk=pk).first()
+            if dataset is None:
+                return None
+            from .summary import rebuild_summary
+            summary = rebuild_summary(dataset)
+            row = (summary.version, summary.updated_at)
+        version, modified = row
+        pointer = {'etag': f'{pk}.{version}.{modified.timestamp():.6f}', 'modified': modified}
+        if shared:
+            cache.set(key, pointer, POINTER_TTL)
+    return pointer
+
+
+def list_generation():
+    """``{'etag', 'modified'}`` covering every dataset's summary."""
+    shared = _shared()
+    pointer = cache.get(GENERATION_KEY) if shared else None
+    if pointer is None:
+        agg = DatasetSummary.objects.aggregate(count=Count('pk'), modified=Max('updated_at'))
+        modified = agg['modified']
+        stamp = f'{modified.timestamp():.6f}' if modified else '0'
+        pointer = {'etag': f'{agg["count"]}.{stamp}', 'modified': modified}
+        if shared:
+            cache.set(GENERATION_KEY, pointer, POINTER_TTL)
+    return pointer
+
+
+def cached_body(key, build):
+    """Return the cached body at ``key``, building and storing it on a miss."""
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, BODY_TTL)
+    return body
+
+
+def dataset_body_key(pk, pointer, kind='summary'):
+    return f'equipment:dataset:{pk}:{kind}:{pointer["etag"]}'
+
+
+def list_body_key(pointer, query):
+    return f'equipment:datasets:body:{pointer["etag"]}:{query}'
+
+
+def invalidate(pk):
+    """Forget the version pointers touched by a write to dataset ``pk``."""
+    keys = [_pointer_key(pk), GENERATION_KEY]
+    cache.delete_many(keys)
+    # Again after commit, in case a reader repopulated them in between.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def summary_saved(sender, instance, **kwargs):
+    """``post_save`` / ``post_delete`` handler for DatasetSummary."""
+    invalidate(instance.dataset_id)
+
+
+def dataset_deleted(sender, instance, **kwargs):
+    """``post_delete`` handler for Dataset."""
+    invalidate(instance.pk)
@@ -0,0 +1,201 @@
+"""Streaming exports of Equipment querysets.
+
+Rows are read with a chunked ``values_list`` iterator and written out one
+chunk at a time, so memory stays flat however many rows match:
+
+* CSV is streamed to the client, header first, before the query runs,
+  gzip-compressed when accepted, with a sync flush after every chunk so
+  each one reaches the client as soon as it is written;
+* Parquet (zstd) is written to ``MEDIA_ROOT/exports/`` one row group of
+  ``ROW_GROUP_ROWS`` at a time, then served as a file. Files are named
+  by a version token (a dataset's version, or the list generation for
+  filtered queries), so a file is reused until the data changes, and
+  older versions are removed when a new one is written. Filtered exports
+  are keyed only by the normalized filters, search terms and ordering, and
+  the directory is capped at ``EXPORT_CACHE_MAX_BYTES``, evicting the
+  least recently used files first.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import uuid
+import zlib
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.middleware.gzip import re_accepts_gzip
+
+try:
+    # Optional dependency for Parquet exports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+CSV_FIELDS = ('name', 'type', 'material', 'flowrate', 'pressure', 'temperature')
+CSV_HEADER = ('Name', 'Type', 'Material', 'Flowrate', 'Pressure', 'Temperature')
+
+# Rows fetched per database round trip and written per response chunk.
+CHUNK_ROWS = 2000
+
+PARQUET_COLUMNS = (
+    ('id', 'int64'),
+    ('dataset', 'int64'),
+    ('name', 'string'),
+    ('type', 'string'),
+    ('material', 'string'),
+    ('flowrate', 'float64'),
+    ('pressure', 'float64'),
+    ('temperature', 'float64'),
+    ('anomaly_flags', 'int16'),
+    ('is_anomalous', 'bool'),
+)
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+
+# Rows per Parquet row group, and so the most rows held in memory at once.
+ROW_GROUP_ROWS = 50000
+
+
+def csv_chunks(queryset):
+    """CSV text for ``queryset``: the header, then one string per ``CHUNK_ROWS`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(CSV_HEADER)
+    yield flush()
+    rows = queryset.values_list(*CSV_FIELDS).iterator(chunk_size=CHUNK_ROWS)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield flush()
+    tail = flush()
+    if tail:
+        yield tail
+
+
+def accepts_gzip(request):
+    """Whether ``Accept-Encoding`` allows gzip, honouring ``q=0`` refusals."""
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not re_accepts_gzip.search(header):
+        return False
+    for coding in header.split(','):
+        token, _, params = coding.partition(';')
+        if token.strip().lower() != 'gzip':
+            continue
+        q = params.strip().lower()
+        if q.startswith('q='):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks, flushing after each so none waits in zlib's buffer."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_dir():
+    path = Path(settings.MEDIA_ROOT) / 'exports'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _normalize(value):
+    if hasattr(value, 'pk'):
+        return value.pk
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def query_name(filters, terms, ordering):
+    """File name stem for a filtered export.
+
+    ``filters`` are a filterset's cleaned values, ``terms`` the search words
+    and ``ordering`` the applied ordering, so parameters no backend reads,
+    and different spellings of the same query, share one file.
+    """
+    key = {
+        'filters': {k: _normalize(v) for k, v in filters.items() if v not in (None, '')},
+        'search': sorted(set(terms)),
+        'ordering': list(ordering),
+    }
+    query = json.dumps(key, sort_keys=True, default=str)
+    return 'query-' + hashlib.sha1(query.encode()).hexdigest()[:16]
+
+
+def write_parquet(queryset, path):
+    """Write ``queryset`` to ``path`` as zstd Parquet, one row group per ``ROW_GROUP_ROWS`` rows."""
+    schema = pa.schema(PARQUET_COLUMNS)
+    rows = queryset.values_list(*(name for name, _ in PARQUET_COLUMNS)).iterator(chunk_size=CHUNK_ROWS)
+    # Written beside the target and renamed, so readers never see a partial file.
+    tmp = path.with_name(f'{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        with pq.ParquetWriter(tmp, schema, compression='zstd') as writer:
+            while True:
+                batch = list(islice(rows, ROW_GROUP_ROWS))
+                if not batch:
+                    break
+                arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*batch), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def cached_parquet(queryset, name, version):
+    """Path of the Parquet export ``name`` at ``version``, written on first use."""
+    directory = export_dir()
+    path = directory / f'{name}-{version}.parquet'
+    if path.exists():
+        # The modification time records use, for eviction.
+        os.utime(path)
+        return path
+    write_parquet(queryset, path)
+    for old in directory.glob(f'{name}-*.parquet'):
+        # Versions contain no '-', so this skips e.g. dataset-10 for dataset-1.
+        if old != path and old.stem.rsplit('-', 1)[0] == name:
+            old.unlink(missing_ok=True)
+    evict(directory, keep=path)
+    return path
+
+
+def evict(directory, keep=None):
+    """Remove least recently used exports until the directory fits ``EXPORT_CACHE_MAX_BYTES``."""
+    files = []
+    for path in directory.glob('*.parquet'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= settings.EXPORT_CACHE_MAX_BYTES:
+            break
+        if path != keep:
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def parquet_response(path, filename):
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                        content_type=PARQUET_MEDIA_TYPE)
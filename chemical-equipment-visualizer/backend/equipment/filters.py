@@ -0,0 +1,19 @@
+from django_filters import rest_framework as filters
+
+from .models import Equipment
+
+
+class EquipmentFilter(filters.FilterSet):
+    """Query filters for Equipment, shared by the list API and exports."""
+
+    anomalous = filters.BooleanFilter(field_name='is_anomalous')
+
+    class Meta:
+        model = Equipment
+        fields = {
+            'material': ['exact'],
+            'pressure': ['gte'],
+            'temperature': ['gte'],
+            'type': ['exact'],
+            'dataset': ['exact'],
+        }
@@ -0,0 +1,417 @@
+"""Shared ingestion engine used by the upload API and the load_sample command.
+
+Rows are mapped and coerced column-wise with pandas, then written inside a
+single transaction by the backend's native bulk loader (see ``loaders``). Rows that fail
+validation are reported back with a reason instead of being dropped silently.
+
+Large files go through ``ingest_stream`` instead, which parses and commits
+the file in bounded chunks so memory stays flat regardless of file size.
+
+Besides CSV, Parquet and Arrow IPC/Feather files are read with pyarrow
+(optional) when the filename says so. Every reader projects the file down
+to the aliased Equipment columns before anything is materialized.
+
+Uploads are fingerprinted with a SHA-256 of their bytes, stored on the
+Dataset, so re-sending identical content can return the existing dataset.
+
+Every write also maintains the dataset's DatasetSummary row (see
+``summary``) in the same transaction as the rows it describes. Rows can
+also be appended to an existing dataset; its summary is then merged with
+the new rows' statistics rather than recomputed. Per-type anomaly flags
+(see ``anomalies``) are computed over the dataset at the end of each ingest.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+try:
+    # Optional dependency for Parquet / Arrow uploads
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+from .anomalies import flag_columns, flag_dataset
+from .loaders import get_loader
+from .models import Dataset, Equipment, IngestJob
+from .summary import append_to_summary, empty_stats, save_summary, summarize_frame
+
+# Rows parsed per chunk in streaming mode.
+CHUNK_ROWS = 50000
+
+# Uploads larger than this (bytes) are streamed even if not requested.
+STREAM_THRESHOLD = 10 * 1024 * 1024
+
+# Only the first rejections are echoed back; the total is always counted.
+MAX_REPORTED_REJECTIONS = 100
+
+# Accepted header spellings for each Equipment field, in priority order.
+# Like the old per-row ``row.get(a) or row.get(b)`` lookups, a blank value in
+# one alias falls through to the next.
+COLUMN_ALIASES = {
+    'name': ('Equipment Name', 'name', 'Name'),
+    'type': ('Type', 'type'),
+    'material': ('Material', 'material'),
+    'flowrate': ('Flowrate', 'flowrate'),
+    'pressure': ('Pressure', 'pressure'),
+    'temperature': ('Temperature', 'temperature'),
+}
+
+ALIAS_NAMES = frozenset(alias for aliases in COLUMN_ALIASES.values() for alias in aliases)
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+SUPPORTED_EXTENSIONS = ('.csv',) + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+TEXT_FIELDS = ('name', 'type', 'material')
+NUMERIC_FIELDS = ('flowrate', 'pressure', 'temperature')
+FIELDS = TEXT_FIELDS + NUMERIC_FIELDS
+
+
+class IngestError(Exception):
+    """Raised when a streaming ingest stops part way; carries the progress."""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+class IngestResult:
+    """Counts and rejection reasons for one ingestion run."""
+
+    def __init__(self, dataset=None):
+        self.dataset = dataset
+        self.created = 0
+        self.rejected = 0
+        self.rejections = []
+        self.chunks = 0
+        self.duplicate = False
+
+    @classmethod
+    def duplicate_of(cls, dataset):
+        """Result for an upload whose content already exists as ``dataset``."""
+        result = cls(dataset)
+        result.duplicate = True
+        return result
+
+    def add_rejections(self, reasons):
+        """Record a Series of reasons indexed by 1-based data row number."""
+        self.rejected += len(reasons)
+        room = MAX_REPORTED_REJECTIONS - len(self.rejections)
+        if room > 0:
+            self.rejections.extend(
+                {'row': int(row), 'reason': reason}
+                for row, reason in reasons.iloc[:room].items()
+            )
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'rejected': self.rejected,
+            'rejections': self.rejections,
+            'chunks': self.chunks,
+            'duplicate': self.duplicate,
+        }
+
+
+def file_digest(source):
+    """SHA-256 hex digest of a path or uploaded file, read in chunks."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        for block in source.chunks():
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def find_duplicate(content_hash):
+    """Oldest Dataset fully ingested from identical content, if any.
+
+    Datasets whose background job is still loading, or failed part way,
+    do not count.
+    """
+    if not content_hash:
+        return None
+    unfinished = (IngestJob.QUEUED, IngestJob.RUNNING, IngestJob.FAILED)
+    return (Dataset.objects.filter(content_hash=content_hash)
+            .exclude(jobs__state__in=unfinished).order_by('id').first())
+
+
+def source_format(source, name=None):
+    """'parquet', 'arrow' or 'csv', judged by the file extension."""
+    filename = source if isinstance(source, str) else (name or getattr(source, 'name', '') or '')
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if ext in ARROW_EXTENSIONS:
+        return 'arrow'
+    return 'csv'
+
+
+def _is_projected(column):
+    return str(column).strip() in ALIAS_NAMES
+
+
+def _check_columns(columns):
+    """Raise ValueError unless the projected ``columns`` include a name column.
+
+    Without one every row would be rejected, or with nothing else projected
+    the rows would vanish from the count altogether.
+    """
+    if not any(str(c).strip() in COLUMN_ALIASES['name'] for c in columns):
+        expected = ', '.join(COLUMN_ALIASES['name'])
+        raise ValueError(f'missing name column (expected one of: {expected})')
+
+
+def _csv_columns(source):
+    """Projected header of a CSV path or file object, leaving the file rewound."""
+    columns = pd.read_csv(source, nrows=0, usecols=_is_projected).columns
+    if not isinstance(source, str):
+        source.seek(0)
+    return columns
+
+
+def _arrow_input(source):
+    """A path or seekable file object pyarrow can read from."""
+    if isinstance(source, str):
+        return source
+    if hasattr(source, 'temporary_file_path'):
+        return source.temporary_file_path()
+    source.seek(0)
+    return getattr(source, 'file', source)
+
+
+def _open_arrow(source, fmt):
+    """Open a columnar file; returns ``(columns, iter_batches(batch_size))``."""
+    if not PYARROW_AVAILABLE:
+        raise ValueError(f'{fmt.capitalize()} support not available (pyarrow missing).')
+    data = _arrow_input(source)
+    if fmt == 'parquet':
+        parquet = pq.ParquetFile(data)
+        columns = [c for c in parquet.schema_arrow.names if _is_projected(c)]
+        _check_columns(columns)
+        return columns, lambda size: parquet.iter_batches(batch_size=size, columns=columns)
+
+    # Feather v2 is the Arrow IPC file format; also accept the stream format.
+    try:
+        reader = pa.ipc.open_file(data)
+        batches = lambda: (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        if not isinstance(data, str):
+            data.seek(0)
+        reader = pa.ipc.open_stream(data)
+        batches = lambda: iter(reader)
+    columns = [c for c in reader.schema.names if _is_projected(c)]
+    _check_columns(columns)
+
+    def iter_batches(size):
+        for batch in batches():
+            batch = batch.select(columns)
+            for offset in range(0, batch.num_rows, size):
+                yield batch.slice(offset, size)
+    return columns, iter_batches
+
+
+def read_frame(source, name=None):
+    """Parse an uploaded file (path or file object) into a DataFrame.
+
+    Only columns that map onto an Equipment field are read; a file without a
+    name column raises ValueError.
+    """
+    fmt = source_format(source, name)
+    if fmt == 'csv':
+        _check_columns(_csv_columns(source))
+        return pd.read_csv(source, usecols=_is_projected)
+    columns, iter_batches = _open_arrow(source, fmt)
+    frames = [batch.to_pandas() for batch in iter_batches(CHUNK_ROWS)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_frames(source, chunksize=None, name=None):
+    """Parse an uploaded file lazily, yielding DataFrames of ``chunksize`` rows.
+
+    Row indexes continue across chunks so rejections keep their row numbers.
+    The header is checked up front, as in ``read_frame``.
+    """
+    chunksize = chunksize or CHUNK_ROWS
+    fmt = source_format(source, name)
+    if fmt == 'csv':
+        _check_columns(_csv_columns(source))
+        return pd.read_csv(source, chunksize=chunksize, usecols=_is_projected)
+    _, iter_batches = _open_arrow(source, fmt)
+
+    def frames():
+        start = 0
+        for batch in iter_batches(chunksize):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+    return frames()
+
+
+def _coalesce(df, aliases):
+    """Return the first non-blank value across ``aliases`` for every row."""
+    result = None
+    for alias in aliases:
+        if alias not in df.columns:
+            continue
+        col = df[alias].astype('string').str.strip().replace('', pd.NA)
+        result = col if result is None else result.fillna(col)
+    if result is None:
+        result = pd.Series(pd.NA, index=df.index, dtype='string')
+    return result
+
+
+def normalize_frame(df):
+    """Map aliased headers onto Equipment fields and coerce values.
+
+    Returns ``(frame, rejections)``: ``frame`` holds the six Equipment columns
+    for valid rows, ``rejections`` is a Series of reasons for the others,
+    indexed by 1-based data row number.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    reasons = pd.Series(pd.NA, index=df.index, dtype='string')
+    columns = {}
+
+    def flag(mask, reason):
+        reasons[mask.fillna(False).astype(bool) & reasons.isna()] = reason
+
+    for field in TEXT_FIELDS:
+        values = _coalesce(df, COLUMN_ALIASES[field])
+        if field == 'name':
+            flag(values.isna(), 'missing name')
+        max_length = Equipment._meta.get_field(field).max_length
+        flag(values.str.len() > max_length, f'{field} longer than {max_length} characters')
+        columns[field] = values.fillna('')
+
+    for field in NUMERIC_FIELDS:
+        raw = _coalesce(df, COLUMN_ALIASES[field])
+        values = pd.to_numeric(raw, errors='coerce').astype('float64')
+        invalid = raw.notna() & ~np.isfinite(values)
+        flag(invalid, f'invalid {field}')
+        # A missing reading counts as 0, matching the original importer.
+        columns[field] = values.where(raw.notna(), 0.0)
+
+    frame = pd.DataFrame(columns, index=df.index)
+    bad = reasons.notna()
+    rejections = reasons[bad]
+    rejections.index = rejections.index + 1
+    return frame[~bad], rejections
+
+
+def write_frame(dataset, frame):
+    """Insert normalized rows for ``dataset`` with the backend's bulk loader."""
+    return get_loader()(dataset, frame)
+
+
+def prepare_file(source, name=None):
+    """Read and normalize ``source`` without touching the database.
+
+    Returns ``(frame, rejections)`` as ``normalize_frame`` does; safe to run
+    in a worker process, with the write left to ``ingest_prepared``.
+    """
+    return normalize_frame(read_frame(source, name))
+
+
+def ingest_frame(df, name, content_hash='', dataset=None):
+    """Create a Dataset named ``name`` from ``df`` in a single transaction.
+
+    With ``dataset``, the rows are appended to that dataset instead.
+    """
+    frame, rejections = normalize_frame(df)
+    return ingest_prepared(frame, rejections, name, content_hash, dataset)
+
+
+def append_rows(dataset, frame):
+    """Insert normalized rows into an existing dataset, merging them into its summary."""
+    append_to_summary(dataset, frame)
+    return write_frame(dataset, frame)
+
+
+def _start_append(dataset):
+    # The dataset no longer matches any single uploaded file.
+    if dataset.content_hash:
+        dataset.content_hash = ''
+        dataset.save(update_fields=['content_hash'])
+
+
+def ingest_prepared(frame, rejections, name, content_hash='', dataset=None):
+    """Create a Dataset (or append to ``dataset``) from a normalized frame in one transaction."""
+    with transaction.atomic():
+        if dataset is None:
+            dataset = Dataset.objects.create(name=name, content_hash=content_hash)
+            created = write_frame(dataset, flag_columns(frame))
+            save_summary(dataset, summarize_frame(frame))
+        else:
+            _start_append(dataset)
+            created = append_rows(dataset, frame)
+            flag_dataset(dataset)
+    result = IngestResult(dataset)
+    result.created = created
+    result.add_rejections(rejections)
+    result.chunks = 1
+    return result
+
+
+def ingest_stream(source, name, chunksize=None, on_progress=None, content_hash='', dataset=None):
+    """Create a Dataset named ``name`` by streaming ``source`` chunk by chunk.
+
+    Each chunk is normalized and committed before the next one is read, so
+    only one chunk is held in memory. ``on_progress`` is called with the
+    running result after every chunk. If parsing fails part way, the rows
+    committed so far are kept and ``IngestError`` reports them. With
+    ``dataset``, chunks are appended to that dataset instead. ``on_progress``
+    is also called once the dataset exists, before the first chunk.
+
+    A new dataset records ``content_hash`` only after the last chunk, so a
+    partial load is never taken for a duplicate of its file.
+    """
+    result = IngestResult()
+    try:
+        frames = iter_frames(source, chunksize, name)
+    except Exception as e:
+        raise IngestError(f'Failed to parse file: {e}', result) from e
+    with transaction.atomic():
+        if dataset is None:
+            dataset = Dataset.objects.create(name=name)
+            save_summary(dataset, empty_stats())
+        else:
+            content_hash = ''
+            _start_append(dataset)
+    result.dataset = dataset
+    if on_progress:
+        on_progress(result)
+    try:
+        while True:
+            try:
+                df = next(frames)
+            except StopIteration:
+                break
+            except Exception as e:
+                raise IngestError(f'Failed to parse chunk {result.chunks + 1}: {e}', result) from e
+            frame, rejections = normalize_frame(df)
+            with transaction.atomic():
+                result.created += append_rows(dataset, frame)
+            result.add_rejections(rejections)
+            result.chunks += 1
+            if on_progress:
+                on_progress(result)
+    finally:
+        # Outliers are judged against the whole dataset, so flag once at the end.
+        if result.created:
+            flag_dataset(dataset)
+    if content_hash:
+        Dataset.objects.filter(pk=dataset.pk).update(content_hash=content_hash)
+        dataset.content_hash = content_hash
+    return result
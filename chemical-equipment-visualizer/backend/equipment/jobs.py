@@ -0,0 +1,147 @@
+"""Background ingestion backed by the IngestJob table.
+
+Uploads are spooled to local disk and recorded as queued jobs. A small
+thread pool inside each web process claims jobs from the table and runs
+them through ``ingest_stream``; ``manage.py process_ingest_jobs`` drains the
+same queue from a separate process (see ``taskqueue``).
+
+The pool is kicked when a job is enqueued, on the first request a process
+serves (so jobs queued before a restart are picked up), and when a client
+polls a job that is waiting. A running job reports a heartbeat with every
+chunk; one silent for ``INGEST_JOB_TIMEOUT`` seconds lost its worker and
+is reclaimed by the next claim (see ``_reclaim``). For a queue that
+drains without web traffic, run ``process_ingest_jobs --loop``.
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import IngestError, ingest_stream
+from .models import Dataset, IngestJob
+from .taskqueue import TableQueue
+
+
+def spool_dir():
+    path = Path(settings.MEDIA_ROOT) / 'ingest'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def spool_upload(f):
+    """Copy an uploaded file to the spool directory.
+
+    Returns ``(path, sha256 hex digest)``; the digest is computed while the
+    file is written.
+    """
+    suffix = Path(getattr(f, 'name', '') or '').suffix
+    path = spool_dir() / f'{uuid.uuid4().hex}{suffix}'
+    digest = hashlib.sha256()
+    with open(path, 'wb') as fh:
+        for chunk in f.chunks():
+            digest.update(chunk)
+            fh.write(chunk)
+    return str(path), digest.hexdigest()
+
+
+def enqueue(source, name, content_hash='', dataset=None, owner=None):
+    """Queue a job for the spooled file ``source``; workers start once committed.
+
+    With ``dataset``, the job appends to that dataset instead of creating one.
+    Only ``owner`` can poll the job.
+    """
+    job = IngestJob.objects.create(
+        name=name, source=source, content_hash=content_hash,
+        dataset=dataset, append=dataset is not None, owner=owner,
+    )
+    transaction.on_commit(kick)
+    return job
+
+
+def kick_on_first_request(sender, **kwargs):
+    """One-shot ``request_started`` handler: drain jobs left over from a previous process."""
+    request_started.disconnect(kick_on_first_request)
+    if queue.pending().exists():
+        kick()
+
+
+def _reclaim(job, current):
+    """Reclaim a job whose worker stopped sending heartbeats.
+
+    A job that was creating a dataset starts over: the partial dataset from
+    the interrupted run is deleted. Rows already appended to an existing
+    dataset cannot be told apart, so such a job fails instead (and its
+    spool file is removed).
+    """
+    if job.append and job.rows_processed:
+        if current.update(state=IngestJob.FAILED, finished_at=timezone.now(),
+                          error='Ingestion was interrupted after appending rows; upload the file again.'):
+            _remove_source(job)
+        return False
+    if current.update(state=IngestJob.QUEUED, started_at=None, heartbeat_at=None,
+                      rows_processed=0, rows_rejected=0, rejections=[]):
+        if not job.append and job.dataset_id:
+            Dataset.objects.filter(pk=job.dataset_id).delete()
+        return True
+    return False
+
+
+def run_job(job):
+    """Ingest a claimed job's spooled file, recording progress as it goes."""
+    def progress(result):
+        IngestJob.objects.filter(pk=job.pk).update(
+            dataset=result.dataset,
+            rows_processed=result.created + result.rejected,
+            rows_rejected=result.rejected,
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        if job.append and job.dataset is None:
+            raise ValueError('the dataset to append to no longer exists')
+        result = ingest_stream(
+            job.source, job.name, on_progress=progress, content_hash=job.content_hash,
+            dataset=job.dataset if job.append else None,
+        )
+        job.state = IngestJob.SUCCEEDED
+    except IngestError as e:
+        result = e.result
+        job.state = IngestJob.FAILED
+        job.error = str(e)
+    except Exception as e:
+        result = None
+        job.state = IngestJob.FAILED
+        job.error = f'Ingestion failed: {e}'
+
+    if result is not None:
+        job.dataset = result.dataset
+        job.rows_processed = result.created + result.rejected
+        job.rows_rejected = result.rejected
+        job.rejections = result.rejections
+    job.finished_at = timezone.now()
+    job.save()
+    _remove_source(job)
+    return job
+
+
+def _remove_source(job):
+    try:
+        os.remove(job.source)
+    except OSError:
+        pass
+
+
+queue = TableQueue(
+    IngestJob, run_job, name='ingest', workers_setting='INGEST_WORKERS',
+    timeout_setting='INGEST_JOB_TIMEOUT', heartbeat_field='heartbeat_at', reclaim=_reclaim,
+)
+kick = queue.kick
+is_stale = queue.is_stale
+reclaim_stale = queue.reclaim_stale
+claim_next = queue.claim_next
+drain = queue.drain
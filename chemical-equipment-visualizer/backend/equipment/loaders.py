@@ -0,0 +1,124 @@
+"""Database-native bulk loaders for the Equipment table.
+
+Each loader takes a Dataset and a normalized frame (see ``ingest``) and
+inserts the rows. ``get_loader`` picks the fastest one for the configured
+backend: ``COPY FROM STDIN`` on PostgreSQL, a single-transaction
+``executemany`` on SQLite, and ORM ``bulk_create`` everywhere else.
+"""
+import io
+from itertools import repeat
+
+from django.db import connections, transaction
+
+from .models import Equipment
+from .search import deferred_index
+
+LOAD_FIELDS = ('name', 'type', 'material', 'flowrate', 'pressure', 'temperature',
+               'anomaly_flags', 'is_anomalous')
+
+# Columns a frame may leave out, with the value written for them. The raw
+# loaders bypass model defaults, so every column is always written.
+FIELD_DEFAULTS = {'anomaly_flags': 0, 'is_anomalous': False}
+
+# Rows per ORM INSERT batch and per COPY buffer.
+ORM_BATCH_SIZE = 2000
+COPY_BATCH_SIZE = 50000
+
+
+def _complete(frame):
+    """``frame`` with any missing ``FIELD_DEFAULTS`` columns filled in."""
+    missing = {f: value for f, value in FIELD_DEFAULTS.items() if f not in frame.columns}
+    return frame.assign(**missing) if missing else frame
+
+
+def _columns(fields):
+    opts = Equipment._meta
+    return [opts.get_field('dataset').column] + [opts.get_field(f).column for f in fields]
+
+
+def orm_load(dataset, frame, using='default'):
+    """Portable fallback: batched ``bulk_create``."""
+    frame, fields = _complete(frame), LOAD_FIELDS
+    for start in range(0, len(frame), ORM_BATCH_SIZE):
+        chunk = frame.iloc[start:start + ORM_BATCH_SIZE]
+        rows = zip(*(chunk[field].tolist() for field in fields))
+        Equipment.objects.using(using).bulk_create(
+            [Equipment(dataset=dataset, **dict(zip(fields, row))) for row in rows],
+            batch_size=ORM_BATCH_SIZE,
+        )
+    return len(frame)
+
+
+def sqlite_load(dataset, frame, using='default'):
+    """One prepared INSERT run through ``executemany`` in a single transaction.
+
+    The search index is filled once for the whole load (see ``search``).
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(Equipment._meta.db_table)
+    frame, fields = _complete(frame), LOAD_FIELDS
+    columns = ', '.join(connection.ops.quote_name(c) for c in _columns(fields))
+    placeholders = ', '.join(['%s'] * (len(fields) + 1))
+    sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+    rows = zip(repeat(dataset.pk), *(frame[field].tolist() for field in fields))
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        with deferred_index(connection, cursor):
+            cursor.executemany(sql, rows)
+    return len(frame)
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """``connection_created`` handler applying load-friendly SQLite pragmas.
+
+    A 64 MB page cache and in-memory temp b-trees keep index maintenance
+    off disk during large loads. Temp storage cannot be changed inside a
+    transaction, hence per connection rather than per load; durability
+    settings (journal_mode/synchronous) are left alone.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size = -65536')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+
+
+def copy_load(dataset, frame, using='default'):
+    """Stream rows to PostgreSQL with ``COPY ... FROM STDIN`` (CSV format)."""
+    connection = connections[using]
+    table = connection.ops.quote_name(Equipment._meta.db_table)
+    frame, fields = _complete(frame), LOAD_FIELDS
+    columns = _columns(fields)
+    text_columns = ', '.join(connection.ops.quote_name(Equipment._meta.get_field(f).column)
+                             for f in ('name', 'type', 'material'))
+    # FORCE_NOT_NULL keeps blank type/material as '' rather than NULL.
+    sql = (
+        f'COPY {table} ({", ".join(connection.ops.quote_name(c) for c in columns)}) '
+        f'FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))'
+    )
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        raw = cursor.cursor
+        for start in range(0, len(frame), COPY_BATCH_SIZE):
+            buf = io.StringIO()
+            chunk = frame.iloc[start:start + COPY_BATCH_SIZE]
+            chunk = chunk[list(fields)].assign(dataset_id=dataset.pk)
+            chunk[['dataset_id', *fields]].to_csv(buf, header=False, index=False)
+            buf.seek(0)
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                raw.copy_expert(sql, buf)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buf.getvalue())
+    return len(frame)
+
+
+LOADERS = {
+    'postgresql': copy_load,
+    'sqlite': sqlite_load,
+}
+
+
+def get_loader(using='default'):
+    """The fastest loader available for the ``using`` database."""
+    return LOADERS.get(connections[using].vendor, orm_load)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+import time
+import numpy as np
+import pandas as pd
+from rest_framework.renderers import JSONRenderer
+from equipment.models import Dataset, Equipment
+from equipment.loaders import get_loader
+from equipment.serializers import EQUIPMENT_LIST_FIELDS, EquipmentSerializer, equipment_rows
+
+
+class Command(BaseCommand):
+    help = ('Compare the per-row cost of listing equipment through EquipmentSerializer '
+            'with the values_list fast path used by /api/equipment/.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Rows listed per run (default: 20000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the best is reported (default: 3)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame({
+            'name': [f'EQ-{i}' for i in range(rows)],
+            'type': 'Pump',
+            'material': 'Steel',
+            'flowrate': rng.uniform(10, 500, rows),
+            'pressure': rng.uniform(1, 20, rows),
+            'temperature': rng.uniform(20, 400, rows),
+        })
+        dataset = Dataset.objects.create(name='benchmark-list')
+        renderer = JSONRenderer()
+        try:
+            get_loader()(dataset, frame)
+            qs = Equipment.objects.filter(dataset=dataset).order_by('id')
+            paths = [
+                ('serializer', lambda: renderer.render(EquipmentSerializer(qs, many=True).data)),
+                ('values_list', lambda: renderer.render(
+                    equipment_rows(qs.values_list(*EQUIPMENT_LIST_FIELDS, named=True)))),
+            ]
+            results = {}
+            for label, run in paths:
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    body = run()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                results[label] = body
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label:>12}: {best / rows * 1e6:>8.2f} us/row ({best:.2f}s for {rows} rows)'
+                ))
+            if results['serializer'] != results['values_list']:
+                self.stdout.write(self.style.WARNING('Responses differ!'))
+        finally:
+            dataset.delete()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+import time
+import numpy as np
+import pandas as pd
+from equipment.models import Dataset
+from equipment import loaders
+
+
+class Command(BaseCommand):
+    help = ('Time the Equipment bulk loaders on the configured database and print rows/sec. '
+            'Each run is rolled back, so no rows are kept. '
+            'Point DATABASE_URL at a local PostgreSQL instance to benchmark COPY.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Synthetic rows per run (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per loader; the best is reported (default: 3)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rng = np.random.default_rng(0)
+        types = np.array(['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor'])
+        frame = pd.DataFrame({
+            'name': [f'EQ-{i}' for i in range(rows)],
+            'type': types[rng.integers(0, len(types), rows)],
+            'material': '',
+            'flowrate': rng.uniform(10, 500, rows),
+            'pressure': rng.uniform(1, 20, rows),
+            'temperature': rng.uniform(20, 400, rows),
+        })
+
+        candidates = [('orm', loaders.orm_load)]
+        native = loaders.LOADERS.get(connection.vendor)
+        if native:
+            candidates.append((native.__name__, native))
+
+        self.stdout.write(f'Backend: {connection.vendor}, {rows} rows per run')
+        for label, loader in candidates:
+            best = None
+            for _ in range(options['repeat']):
+                with transaction.atomic():
+                    dataset = Dataset.objects.create(name=f'benchmark-{label}')
+                    start = time.perf_counter()
+                    loader(dataset, frame)
+                    elapsed = time.perf_counter() - start
+                    # Nothing the benchmark writes outlives the run.
+                    transaction.set_rollback(True)
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(self.style.SUCCESS(f'{label:>12}: {rows / best:>12,.0f} rows/sec ({best:.2f}s)'))
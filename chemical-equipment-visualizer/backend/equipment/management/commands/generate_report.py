@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from equipment.models import Dataset
 import os
+import shutil
 from django.conf import settings
 
 
@@ -29,30 +30,18 @@ class Command(BaseCommand):
             if out_dir:
                 os.makedirs(out_dir, exist_ok=True)
 
-        # Use the existing view function logic by calling the view and writing binary content
-        from equipment.views import dataset_report_pdf
-        from rest_framework.test import APIRequestFactory
-        from rest_framework.authtoken.models import Token
-        factory = APIRequestFactory()
-        user = None
-        # Use the first superuser if exists, else create a temp user
-        from django.contrib.auth.models import User
-        users = User.objects.filter(is_superuser=True)
-        if users.exists():
-            user = users.first()
-        else:
-            user, _ = User.objects.get_or_create(username='report-temp')
-        token, _ = Token.objects.get_or_create(user=user)
-
-        req = factory.get(f'/api/datasets/{ds_id}/report/pdf/')
-        req.META['HTTP_AUTHORIZATION'] = 'Token ' + token.key
+        from equipment import reports
+        if not reports.REPORTLAB_AVAILABLE:
+            self.stdout.write(self.style.ERROR('PDF generation not available (reportlab missing)'))
+            return
 
-        resp = dataset_report_pdf(req, ds_id)
-        if resp.status_code != 200:
-            self.stdout.write(self.style.ERROR(f'Failed to generate report: status {resp.status_code}'))
+        # Reuses the stored report for the dataset's current version, if any.
+        artifact, cached = reports.ensure_report(ds)
+        if artifact.state != artifact.READY:
+            self.stdout.write(self.style.ERROR(f'Failed to generate report: {artifact.error or artifact.state}'))
             return
 
-        with open(out, 'wb') as fh:
-            fh.write(resp.content)
+        shutil.copyfile(artifact.path, out)
 
-        self.stdout.write(self.style.SUCCESS(f'Report written to {out}'))
\ No newline at end of file
+        source = 'cached report' if cached else 'new report'
+        self.stdout.write(self.style.SUCCESS(f'Report written to {out} ({source})'))
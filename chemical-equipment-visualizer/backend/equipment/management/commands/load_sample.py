@@ -1,41 +1,169 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import django
+import glob
 import os
-import pandas as pd
-from equipment.models import Dataset, Equipment
+import time
+from equipment.ingest import (
+    SUPPORTED_EXTENSIONS,
+    IngestError,
+    file_digest,
+    find_duplicate,
+    prepare_file,
+    ingest_prepared,
+    ingest_stream,
+)
+
+
+def parse_file(path):
+    """Parse and fingerprint one file; runs in a worker process, no DB access."""
+    start = time.perf_counter()
+    content_hash = file_digest(path)
+    frame, rejections = prepare_file(path)
+    return path, content_hash, frame, rejections, time.perf_counter() - start
 
 
 class Command(BaseCommand):
-    help = 'Load sample_equipment_data.csv into the database (creates a Dataset)'
+    help = ('Load CSV, Parquet or Arrow/Feather files into the database, one Dataset per file '
+            '(default: backend/sample_equipment_data.csv). Files are parsed in '
+            'parallel worker processes and written one at a time.')
 
     def add_arguments(self, parser):
-        parser.add_argument('--file', type=str, help='Path to CSV file (default: backend/sample_equipment_data.csv)')
+        parser.add_argument('--file', type=str, nargs='+',
+                            help='Data files, directories or glob patterns (default: backend/sample_equipment_data.csv)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Parser processes (default: CPU count; 1 parses in-process)')
+        parser.add_argument('--chunksize', type=int, help='Stream each file, committing this many rows at a time')
+        parser.add_argument('--force', action='store_true', help='Load even if identical content was loaded before')
 
     def handle(self, *args, **options):
-        fpath = options.get('file')
-        if not fpath:
-            fpath = os.path.join(settings.BASE_DIR, 'sample_equipment_data.csv')
+        specs = options.get('file') or [os.path.join(settings.BASE_DIR, 'sample_equipment_data.csv')]
+        files = self.expand(specs)
+        if not files:
+            return
+
+        self.force = options.get('force')
+        self.total_rows = 0
+        self.loaded = 0
+        self.failed = 0
+        started = time.perf_counter()
+
+        workers = min(options.get('workers') or 1, len(files))
+        if options.get('chunksize'):
+            for fpath in files:
+                self.stream_file(fpath, options['chunksize'])
+        elif workers <= 1:
+            for fpath in files:
+                self.write_parsed(*self.parse_safely(fpath))
+        else:
+            self.load_parallel(files, workers)
+
+        if len(files) > 1:
+            elapsed = time.perf_counter() - started
+            rate = self.total_rows / elapsed if elapsed > 0 else 0
+            failed = f', {self.failed} failed' if self.failed else ''
+            self.stdout.write(self.style.SUCCESS(
+                f'Total: {self.loaded} datasets, {self.total_rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec){failed}'
+            ))
+
+    def expand(self, specs):
+        """Resolve paths, directories and glob patterns to a sorted file list."""
+        files = []
+        for spec in specs:
+            if os.path.isdir(spec):
+                matches = [os.path.join(spec, n) for n in os.listdir(spec)
+                           if n.lower().endswith(SUPPORTED_EXTENSIONS)]
+            elif glob.has_magic(spec):
+                matches = glob.glob(spec, recursive=True)
+            else:
+                matches = [spec]
+            for fpath in sorted(matches):
+                if not os.path.exists(fpath):
+                    self.stdout.write(self.style.ERROR(f'File not found: {fpath}'))
+                elif os.path.isfile(fpath) and fpath not in files:
+                    files.append(fpath)
+        if not files and specs:
+            self.stdout.write(self.style.ERROR(f'No files matched: {" ".join(specs)}'))
+        return files
+
+    def parse_safely(self, fpath):
+        try:
+            return parse_file(fpath), None
+        except Exception as e:
+            return (fpath, None, None, None, 0), e
+
+    def load_parallel(self, files, workers):
+        # Keep at most two parsed files per worker waiting for the writer
+        pending = {}
+        queue = list(reversed(files))
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            while queue or pending:
+                while queue and len(pending) < workers * 2:
+                    fpath = queue.pop()
+                    pending[pool.submit(parse_file, fpath)] = fpath
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    fpath = pending.pop(future)
+                    try:
+                        parsed, error = future.result(), None
+                    except Exception as e:
+                        parsed, error = (fpath, None, None, None, 0), e
+                    self.write_parsed(parsed, error)
+
+    def write_parsed(self, parsed, error):
+        fpath, content_hash, frame, rejections, parse_seconds = parsed
+        name = os.path.basename(fpath)
+        if error is not None:
+            self.failed += 1
+            self.stdout.write(self.style.ERROR(f'{name}: failed to parse: {error}'))
+            return
+
+        if self.is_duplicate(name, content_hash):
+            return
+
+        start = time.perf_counter()
+        result = ingest_prepared(frame, rejections, name, content_hash)
+        write_seconds = time.perf_counter() - start
+        self.report(result, parse_seconds + write_seconds,
+                    f'parse {parse_seconds:.2f}s, write {write_seconds:.2f}s')
+
+    def is_duplicate(self, name, content_hash):
+        existing = None if self.force else find_duplicate(content_hash)
+        if existing is not None:
+            self.stdout.write(self.style.WARNING(f'{name}: identical content already loaded as dataset {existing.id} ("{existing.name}"); use --force to load again'))
+        return existing is not None
+
+    def stream_file(self, fpath, chunksize):
+        name = os.path.basename(fpath)
+        content_hash = file_digest(fpath)
+        if self.is_duplicate(name, content_hash):
+            return
+
+        def progress(result):
+            self.stdout.write(f'  chunk {result.chunks}: {result.created} rows loaded')
 
-        if not os.path.exists(fpath):
-            self.stdout.write(self.style.ERROR(f'File not found: {fpath}'))
+        start = time.perf_counter()
+        try:
+            result = ingest_stream(fpath, name, chunksize=chunksize, on_progress=progress, content_hash=content_hash)
+        except IngestError as e:
+            # Keep going with the other files; rows committed so far stay.
+            self.failed += 1
+            kept = f' ({e.result.created} rows kept in dataset {e.result.dataset.id})' if e.result.dataset else ''
+            self.stdout.write(self.style.ERROR(f'{name}: {e}{kept}'))
             return
+        elapsed = time.perf_counter() - start
+        self.report(result, elapsed, f'{result.chunks} chunks')
 
-        df = pd.read_csv(fpath)
-        dataset = Dataset.objects.create(name=os.path.basename(fpath))
-        created = 0
-        for _, row in df.iterrows():
-            try:
-                Equipment.objects.create(
-                    dataset=dataset,
-                    name=row.get('Equipment Name') or row.get('name') or '',
-                    type=row.get('Type') or row.get('type') or '',
-                    flowrate=float(row.get('Flowrate') or 0),
-                    pressure=float(row.get('Pressure') or 0),
-                    temperature=float(row.get('Temperature') or 0),
-                    material=row.get('Material') or ''
-                )
-                created += 1
-            except Exception as e:
-                continue
-
-        self.stdout.write(self.style.SUCCESS(f'Loaded dataset "{dataset.name}" with {created} equipment rows'))
\ No newline at end of file
+    def report(self, result, seconds, detail):
+        self.loaded += 1
+        self.total_rows += result.created
+        rate = result.created / seconds if seconds > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded dataset "{result.dataset.name}" with {result.created} equipment rows '
+            f'({detail}, {rate:,.0f} rows/sec)'
+        ))
+        if result.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {result.rejected} rows'))
+            for r in result.rejections:
+                self.stdout.write(f"  row {r['row']}: {r['reason']}")
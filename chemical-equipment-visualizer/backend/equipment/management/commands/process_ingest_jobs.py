@@ -0,0 +1,8 @@
+from equipment.jobs import queue
+from equipment.taskqueue import DrainCommand
+
+
+class Command(DrainCommand):
+    help = 'Run queued background ingestion jobs (use --loop to keep polling for new ones)'
+    queue = queue
+    done_message = 'Processed {} ingestion jobs'
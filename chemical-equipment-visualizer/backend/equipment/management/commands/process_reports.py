@@ -0,0 +1,8 @@
+from equipment.reports import queue
+from equipment.taskqueue import DrainCommand
+
+
+class Command(DrainCommand):
+    help = 'Render queued PDF reports (use --loop to keep polling for new ones)'
+    queue = queue
+    done_message = 'Rendered {} reports'
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from equipment.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Remove expired upload sessions, their chunks and leftover spool files'
+
+    def handle(self, *args, **options):
+        removed = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired upload sessions'))
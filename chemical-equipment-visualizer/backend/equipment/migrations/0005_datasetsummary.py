@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    Dataset = apps.get_model('equipment', 'Dataset')
+    Equipment = apps.get_model('equipment', 'Equipment')
+    DatasetSummary = apps.get_model('equipment', 'DatasetSummary')
+    parameters = ('flowrate', 'pressure', 'temperature')
+    for ds in Dataset.objects.all():
+        qs = Equipment.objects.filter(dataset=ds)
+        aggregates = {'count': models.Count('id')}
+        for p in parameters:
+            aggregates[f'avg_{p}'] = models.Avg(p)
+            aggregates[f'min_{p}'] = models.Min(p)
+            aggregates[f'max_{p}'] = models.Max(p)
+        agg = qs.aggregate(**aggregates)
+        types = qs.values('type').annotate(count=models.Count('id')).order_by()
+        fields = {'equipment_count': agg['count'] or 0,
+                  'type_distribution': {t['type']: t['count'] for t in types}}
+        for p in parameters:
+            fields[f'avg_{p}'] = agg[f'avg_{p}'] or 0
+            fields[f'min_{p}'] = agg[f'min_{p}']
+            fields[f'max_{p}'] = agg[f'max_{p}']
+        DatasetSummary.objects.create(dataset=ds, **fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0004_dataset_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetSummary',
+            fields=[
+                ('dataset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='equipment.dataset')),
+                ('equipment_count', models.PositiveIntegerField(default=0)),
+                ('avg_flowrate', models.FloatField(default=0)),
+                ('avg_pressure', models.FloatField(default=0)),
+                ('avg_temperature', models.FloatField(default=0)),
+                ('min_flowrate', models.FloatField(blank=True, null=True)),
+                ('max_flowrate', models.FloatField(blank=True, null=True)),
+                ('min_pressure', models.FloatField(blank=True, null=True)),
+                ('max_pressure', models.FloatField(blank=True, null=True)),
+                ('min_temperature', models.FloatField(blank=True, null=True)),
+                ('max_temperature', models.FloatField(blank=True, null=True)),
+                ('type_distribution', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    Equipment = apps.get_model('equipment', 'Equipment')
+    TypeRollup = apps.get_model('equipment', 'TypeRollup')
+    groups = Equipment.objects.values('dataset_id', 'type').annotate(
+        count=models.Count('id'),
+        avg_flowrate=models.Avg('flowrate'),
+        avg_pressure=models.Avg('pressure'),
+        avg_temperature=models.Avg('temperature'),
+    ).order_by()
+    TypeRollup.objects.bulk_create([
+        TypeRollup(
+            dataset_id=g['dataset_id'], type=g['type'], equipment_count=g['count'],
+            avg_flowrate=g['avg_flowrate'], avg_pressure=g['avg_pressure'],
+            avg_temperature=g['avg_temperature'],
+        )
+        for g in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0007_datasetsummary_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=100)),
+                ('equipment_count', models.PositiveIntegerField(default=0)),
+                ('avg_flowrate', models.FloatField(default=0)),
+                ('avg_pressure', models.FloatField(default=0)),
+                ('avg_temperature', models.FloatField(default=0)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_rollups', to='equipment.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['type', 'dataset'], name='type_rollup_trend_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'type'), name='type_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+
+def backfill_m2(apps, schema_editor):
+    Equipment = apps.get_model('equipment', 'Equipment')
+    DatasetSummary = apps.get_model('equipment', 'DatasetSummary')
+    parameters = ('flowrate', 'pressure', 'temperature')
+    groups = Equipment.objects.values('dataset_id').annotate(
+        count=models.Count('id'), **{p: models.Variance(p) for p in parameters}
+    ).order_by()
+    for g in groups:
+        DatasetSummary.objects.filter(dataset_id=g['dataset_id']).update(
+            **{f'm2_{p}': (g[p] or 0) * g['count'] for p in parameters}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0008_typerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetsummary',
+            name='m2_flowrate',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasetsummary',
+            name='m2_pressure',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datasetsummary',
+            name='m2_temperature',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='append',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_m2, migrations.RunPython.noop),
+    ]
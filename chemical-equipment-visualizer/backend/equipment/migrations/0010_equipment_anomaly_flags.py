@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:18
+
+import math
+from functools import reduce
+from operator import add, or_
+
+from django.db import migrations, models
+
+# Frozen copies of the rules in ``equipment.anomalies`` at this migration.
+Z_THRESHOLD = 3.0
+IQR_FACTOR = 1.5
+CHECKED = ('pressure', 'temperature')
+FLAGS = {'pressure_zscore': 1, 'pressure_iqr': 2, 'temperature_zscore': 4, 'temperature_iqr': 8}
+
+
+def _quantile(rows, parameter, count, q):
+    position = (count - 1) * q
+    low = math.floor(position)
+    values = list(rows.order_by(parameter).values_list(parameter, flat=True)[low:low + 2])
+    if len(values) == 1 or position == low:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (position - low)
+
+
+def backfill_flags(apps, schema_editor):
+    Equipment = apps.get_model('equipment', 'Equipment')
+    groups = Equipment.objects.values_list('dataset_id', 'type').distinct().order_by()
+    for dataset_id, type_ in groups:
+        rows = Equipment.objects.filter(dataset_id=dataset_id, type=type_)
+        aggregates = {'count': models.Count('id')}
+        for p in CHECKED:
+            aggregates[f'mean_{p}'] = models.Avg(p)
+            aggregates[f'std_{p}'] = models.StdDev(p)
+        stats = rows.aggregate(**aggregates)
+        conditions = {}
+        for p in CHECKED:
+            mean, std = stats[f'mean_{p}'], stats[f'std_{p}']
+            if std and std > 0:
+                reach = Z_THRESHOLD * std
+                conditions[f'{p}_zscore'] = models.Q(**{f'{p}__gt': mean + reach}) | models.Q(**{f'{p}__lt': mean - reach})
+            q1 = _quantile(rows, p, stats['count'], 0.25)
+            q3 = _quantile(rows, p, stats['count'], 0.75)
+            spread = IQR_FACTOR * (q3 - q1)
+            conditions[f'{p}_iqr'] = models.Q(**{f'{p}__lt': q1 - spread}) | models.Q(**{f'{p}__gt': q3 + spread})
+        flagged = rows.filter(reduce(or_, conditions.values()))
+        flagged.update(
+            anomaly_flags=reduce(add, (
+                models.Case(models.When(condition, then=models.Value(FLAGS[name])), default=models.Value(0))
+                for name, condition in conditions.items()
+            )),
+            is_anomalous=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0009_summary_m2_ingestjob_append'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='anomaly_flags',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='is_anomalous',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(condition=models.Q(('is_anomalous', True)), fields=['dataset', 'id'], name='equipment_anomalous_idx'),
+        ),
+        migrations.RunPython(backfill_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Frozen copies of the statements in ``equipment.search`` at this migration.
+FTS_TABLE = 'equipment_fts'
+
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, type, material, content='equipment_equipment', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, type, material) VALUES (new.id, new.name, new.type, new.material);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type, material)
+        VALUES ('delete', old.id, old.name, old.type, old.material);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, type, material ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type, material)
+        VALUES ('delete', old.id, old.name, old.type, old.material);
+        INSERT INTO {FTS_TABLE}(rowid, name, type, material) VALUES (new.id, new.name, new.type, new.material);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+PG_INDEX_SQL = [
+    'CREATE INDEX IF NOT EXISTS equipment_search_idx ON equipment_equipment '
+    "USING GIN (to_tsvector('simple', name || ' ' || type || ' ' || material))",
+]
+
+PG_DROP_SQL = ['DROP INDEX IF EXISTS equipment_search_idx']
+
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INDEX_SQL, 'postgresql': PG_INDEX_SQL})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP_SQL, 'postgresql': PG_DROP_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0011_equipment_filter_indexes'),
+    ]
+
+    operations = [
+        # FTS5 table + sync triggers on SQLite, GIN tsvector index on PostgreSQL.
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0015_uploadsession_owner'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_ds_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_ds_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_ds_material_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_material_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_flowrate_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_pressure_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_temperature_idx',
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='equipment', to='equipment.dataset'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['name', 'dataset'], name='equipment_name_idx'),
+        ),
+    ]
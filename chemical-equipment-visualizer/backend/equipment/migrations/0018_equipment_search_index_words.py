@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Frozen copies of the statements in ``equipment.search`` at this migration.
+PG_INDEX_SQL = [
+    'DROP INDEX IF EXISTS equipment_search_idx',
+    'CREATE INDEX equipment_search_idx ON equipment_equipment '
+    "USING GIN (to_tsvector('simple', regexp_replace("
+    "name || ' ' || type || ' ' || material, '\\W+', ' ', 'g')))",
+]
+
+PG_PREVIOUS_SQL = [
+    'DROP INDEX IF EXISTS equipment_search_idx',
+    'CREATE INDEX equipment_search_idx ON equipment_equipment '
+    "USING GIN (to_tsvector('simple', name || ' ' || type || ' ' || material))",
+]
+
+
+def _run(schema_editor, statements):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def split_words(apps, schema_editor):
+    _run(schema_editor, PG_INDEX_SQL)
+
+
+def restore_previous(apps, schema_editor):
+    _run(schema_editor, PG_PREVIOUS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0017_equipment_global_indexes'),
+    ]
+
+    operations = [
+        # PostgreSQL only: index words split on non-word characters.
+        migrations.RunPython(split_words, restore_previous),
+    ]
@@ -1,18 +1,40 @@
+import datetime
+import math
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class Dataset(models.Model):
     name = models.CharField(max_length=150)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256 of the uploaded file
+
+    class Meta:
+        indexes = [
+            # Dataset history is read newest first, paged by uploaded_at.
+            models.Index(fields=['-uploaded_at', '-id'], name='dataset_history_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Numeric fields the list orders and keyset-pages on within a dataset.
+EQUIPMENT_INDEXED_FIELDS = ('flowrate', 'pressure', 'temperature')
+# Fields the list filters, orders and keyset-pages on across datasets
+# (name is covered by the trend index).
+EQUIPMENT_GLOBAL_FIELDS = ('type', 'material', 'flowrate', 'pressure', 'temperature')
+
+
 class Equipment(models.Model):
+    # Indexed by the (dataset, ...) composites below.
     dataset = models.ForeignKey(
         Dataset,
         on_delete=models.CASCADE,
-        related_name="equipment"
+        related_name="equipment",
+        db_index=False
     )
 
     name = models.CharField(max_length=100)
@@ -23,5 +45,249 @@ class Equipment(models.Model):
     pressure = models.FloatField()
     temperature = models.FloatField()
 
+    # Per-type outlier bits (see equipment.anomalies), written by the bulk
+    # loaders with every row.
+    anomaly_flags = models.PositiveSmallIntegerField(default=0)
+    is_anomalous = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Partial indexes: only the (few) anomalous rows are indexed.
+            models.Index(
+                fields=['dataset', 'id'],
+                condition=models.Q(is_anomalous=True),
+                name='equipment_anomalous_idx',
+            ),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_anomalous=True),
+                name='equipment_anomalous_all_idx',
+            ),
+            # Per-name trend series across datasets.
+            models.Index(fields=['name', 'dataset'], name='equipment_name_idx'),
+            # A dataset's rows in the list's default (id) order.
+            models.Index(fields=['dataset', 'id'], name='equipment_ds_id_idx'),
+        ] + [
+            # Dataset-scoped ordering and keyset pages on a numeric field,
+            # with id as the tie-breaker.
+            models.Index(fields=['dataset', field, 'id'], name=f'equipment_ds_{field}_idx')
+            for field in EQUIPMENT_INDEXED_FIELDS
+        ] + [
+            # The same across datasets, and the cross-dataset filters.
+            models.Index(fields=[field, 'id'], name=f'equipment_{field}_idx')
+            for field in EQUIPMENT_GLOBAL_FIELDS
+        ]
+
     def __str__(self):
         return self.name
+
+
+class DatasetSummary(models.Model):
+    """Aggregates for one Dataset, written at ingest and refreshed on edits."""
+
+    dataset = models.OneToOneField(
+        Dataset,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="summary"
+    )
+
+    equipment_count = models.PositiveIntegerField(default=0)
+    avg_flowrate = models.FloatField(default=0)
+    avg_pressure = models.FloatField(default=0)
+    avg_temperature = models.FloatField(default=0)
+    min_flowrate = models.FloatField(null=True, blank=True)
+    max_flowrate = models.FloatField(null=True, blank=True)
+    min_pressure = models.FloatField(null=True, blank=True)
+    max_pressure = models.FloatField(null=True, blank=True)
+    min_temperature = models.FloatField(null=True, blank=True)
+    max_temperature = models.FloatField(null=True, blank=True)
+    # Sums of squared deviations from the mean (Welford's M2); variance = M2 / count
+    m2_flowrate = models.FloatField(default=0)
+    m2_pressure = models.FloatField(default=0)
+    m2_temperature = models.FloatField(default=0)
+    type_distribution = models.JSONField(default=dict)
+
+    version = models.PositiveIntegerField(default=0)  # bumped on every write, keys cached responses
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Summary of {self.dataset}'
+
+    def variance(self, parameter):
+        """Population variance of ``parameter`` across the dataset."""
+        count = self.equipment_count
+        return getattr(self, f'm2_{parameter}') / count if count else 0
+
+    @property
+    def var_flowrate(self):
+        return self.variance('flowrate')
+
+    @property
+    def var_pressure(self):
+        return self.variance('pressure')
+
+    @property
+    def var_temperature(self):
+        return self.variance('temperature')
+
+
+class TypeRollup(models.Model):
+    """Per-type count and averages for one Dataset, kept with its summary."""
+
+    dataset = models.ForeignKey(
+        Dataset,
+        on_delete=models.CASCADE,
+        related_name="type_rollups"
+    )
+    type = models.CharField(max_length=100)
+    equipment_count = models.PositiveIntegerField(default=0)
+    avg_flowrate = models.FloatField(default=0)
+    avg_pressure = models.FloatField(default=0)
+    avg_temperature = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'type'], name='type_rollup_unique'),
+        ]
+        indexes = [
+            # Trend queries scan one type across many datasets.
+            models.Index(fields=['type', 'dataset'], name='type_rollup_trend_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.type} in {self.dataset}'
+
+
+class IngestJob(models.Model):
+    """A queued upload, parsed and inserted by the background worker pool."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED, db_index=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='ingest_jobs'
+    )
+    name = models.CharField(max_length=150)
+    source = models.CharField(max_length=500)   # spooled upload on local disk
+    content_hash = models.CharField(max_length=64, blank=True)
+    append = models.BooleanField(default=False)  # add rows to ``dataset`` instead of creating one
+    dataset = models.ForeignKey(
+        Dataset,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="jobs"
+    )
+
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    rejections = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker on every chunk; a RUNNING job whose heartbeat is
+    # older than INGEST_JOB_TIMEOUT lost its worker and is reclaimed.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.state})'
+
+    @property
+    def throughput(self):
+        """Rows processed per second since the job started."""
+        if not self.started_at:
+            return 0
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0
+
+
+class UploadSession(models.Model):
+    """A resumable upload that clients send as numbered chunks."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    filename = models.CharField(max_length=150)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def expires_at(self):
+        return self.created_at + datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+    @property
+    def expired(self):
+        return timezone.now() >= self.expires_at
+
+    @property
+    def total_chunks(self):
+        return math.ceil(self.total_size / self.chunk_size)
+
+    def expected_chunk_size(self, index):
+        """Byte length of chunk ``index``; only the last chunk may be short."""
+        if index == self.total_chunks - 1:
+            return self.total_size - index * self.chunk_size
+        return self.chunk_size
+
+
+class ReportArtifact(models.Model):
+    """A dataset's PDF report rendered for one version of its data.
+
+    ``version`` is the dataset's version token (see ``cache.dataset_version``),
+    so an artifact is fresh while it matches the dataset's current token.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='reports')
+    version = models.CharField(max_length=100)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED, db_index=True)
+    path = models.CharField(max_length=500, blank=True)   # rendered PDF on local disk
+    size = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'version'], name='report_dataset_version_uniq'),
+        ]
+
+    def __str__(self):
+        return f'Report for {self.dataset_id} @ {self.version} ({self.state})'
@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class DatasetHistoryPagination(CursorPagination):
+    """Opaque-cursor paging over dataset history, newest first.
+
+    The cursor encodes an ``uploaded_at`` position, so each page is an index
+    range scan no matter how deep the client has paged.
+    """
+    ordering = ('-uploaded_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class KeysetPagination(BasePagination):
+    """Seek pagination over ``(ordering field, id)`` for large tables.
+
+    The list's ordering comes from ``OrderingFilter`` (first term only, id
+    breaks ties). Each cursor holds the last row's key, and the next page
+    is ``field >= value`` minus the rows already seen at ``value``: no
+    ``OFFSET`` and no ``COUNT(*)``. With the ``(field, id)`` and
+    ``(dataset, field, id)`` Equipment indexes, a page across datasets on
+    any ordering field, or within a dataset on id or a numeric field, is an
+    index seek; within a dataset, a text ordering sorts that dataset's
+    rows. Only forward links are provided. Rows may be model instances or
+    named ``values_list`` tuples.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(size, self.max_page_size))
+
+    def _ordering_filter(self, view):
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                return backend()
+        return None
+
+    def get_ordering(self, request, queryset, view):
+        backend = self._ordering_filter(view)
+        ordering = backend.get_ordering(request, queryset, view) if backend else None
+        term = (ordering or ['id'])[0]
+        return term.lstrip('-'), term.startswith('-')
+
+    def allowed_fields(self, request, queryset, view):
+        """Fields a cursor may seek on: id and the view's ordering fields."""
+        backend = self._ordering_filter(view)
+        fields = {'id'}
+        if backend:
+            fields.update(name for name, _ in backend.get_valid_fields(queryset, view, {'request': request}))
+        return fields
+
+    def decode_cursor(self, request, queryset, view, ordering):
+        """``(value, id)`` from the cursor parameter, or None without one.
+
+        The value is converted with the ordering field's ``to_python``; a
+        cursor that is malformed, for another ordering, or holds a value of
+        the wrong type raises ``NotFound``.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            field, descending = cursor['o']
+            if [field, descending] != list(ordering) or field not in self.allowed_fields(request, queryset, view):
+                raise ValueError('ordering changed')
+            if cursor['v'] is None or isinstance(cursor['id'], bool):
+                raise ValueError('missing key')
+            value = queryset.model._meta.get_field(field).to_python(cursor['v'])
+            return value, int(cursor['id'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, ordering, value, pk):
+        data = json.dumps({'o': list(ordering), 'v': value, 'id': pk})
+        token = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        field, descending = ordering = self.get_ordering(request, queryset, view)
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset, view, ordering)
+        if position is not None:
+            value, pk = position
+            if descending:
+                queryset = queryset.filter(**{f'{field}__lte': value}).exclude(**{field: value, 'id__gte': pk})
+            else:
+                queryset = queryset.filter(**{f'{field}__gte': value}).exclude(**{field: value, 'id__lte': pk})
+        prefix = '-' if descending else ''
+        rows = list(queryset.order_by(prefix + field, prefix + 'id')[:page_size + 1])
+
+        self.next_link = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_link = self.encode_cursor(ordering, getattr(last, field), last.id)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_link, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,97 @@
+"""Binary renderers for bulk reads, chosen by the ``Accept`` header.
+
+* ``application/vnd.apache.arrow.stream``: an Arrow IPC stream holding
+  one table. Lists (``results`` of the equipment list) become columns, so
+  numeric fields travel as typed buffers; any other body is a single row,
+  nesting as Arrow structs and lists. The rest of a paginated body
+  (``count``, ``next``, ...) is JSON in the schema metadata under ``meta``.
+  A view that puts ``columns`` in its renderer context names the columns
+  of a row list, so an empty page has them too.
+* ``application/msgpack``: the JSON body packed as MessagePack, so numbers
+  are sent as binary ints/floats rather than text.
+
+Both depend on optional packages; ``BINARY_RENDERERS`` only lists the
+available ones. ``?format=arrow`` / ``?format=msgpack`` also select them.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    # Optional dependency for Arrow responses
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+try:
+    # Optional dependency for MessagePack responses
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+
+def _columns(data, fields=None):
+    """``{name: [values]}`` for a response body (see module docstring)."""
+    if isinstance(data, list):
+        if fields is None:
+            fields = list(data[0]) if data else []
+        return {f: [row[f] for row in data] for f in fields}
+    values = list(data.values())
+    if values and all(isinstance(v, list) for v in values) and len({len(v) for v in values}) == 1:
+        return dict(data)  # already columnar
+    return {key: [value] for key, value in data.items()}
+
+
+def arrow_table(data, columns=None):
+    """Arrow table for a response body, with pagination fields as metadata."""
+    meta = {}
+    if isinstance(data, dict) and 'results' in data:
+        meta = {key: value for key, value in data.items() if key != 'results'}
+        data = data['results']
+    table = pa.table(_columns(data, columns))
+    if meta:
+        table = table.replace_schema_metadata({'meta': json.dumps(meta, cls=JSONEncoder)})
+    return table
+
+
+class ArrowStreamRenderer(BaseRenderer):
+    media_type = ARROW_MEDIA_TYPE
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        table = arrow_table(data, (renderer_context or {}).get('columns'))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Dates, decimals etc. are encoded as the JSON renderer would.
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+
+BINARY_RENDERERS = [
+    renderer for renderer, available in (
+        (ArrowStreamRenderer, PYARROW_AVAILABLE),
+        (MessagePackRenderer, MSGPACK_AVAILABLE),
+    ) if available
+]
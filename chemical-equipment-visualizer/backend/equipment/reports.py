@@ -0,0 +1,196 @@
+"""PDF reports, rendered once per dataset version and kept on disk.
+
+Each ReportArtifact is one rendering of a dataset at one version token
+(see ``cache.dataset_version``); its file lives under
+``MEDIA_ROOT/reports/``. A request for a dataset's report reuses the
+artifact for the current token, or queues one. Like ingestion jobs (see
+``jobs``), queued artifacts are rendered by a small in-process thread pool
+or by ``manage.py process_reports`` (see ``taskqueue``); ``ensure_report``
+renders inline for callers that need the file now. An artifact left
+running for ``REPORT_TIMEOUT`` seconds lost its worker and is queued
+again. Older versions' artifacts and files are removed once a newer one
+is ready.
+"""
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache
+from .models import ReportArtifact
+from .summary import get_summary
+from .taskqueue import TableQueue
+
+try:
+    # Optional dependency for PDF generation
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib import colors
+    REPORTLAB_AVAILABLE = True
+except Exception:
+    REPORTLAB_AVAILABLE = False
+
+def report_dir():
+    path = Path(settings.MEDIA_ROOT) / 'reports'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def current_version(dataset):
+    return cache.dataset_version(dataset.pk)['etag']
+
+
+def build_pdf(dataset, out):
+    """Render the report for ``dataset`` to the file ``out`` with a tabular layout."""
+    doc = SimpleDocTemplate(str(out))
+
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph(f"Dataset Report: {dataset.name}", styles['Title']))
+    story.append(Spacer(1, 12))
+
+    summary = get_summary(dataset)
+
+    story.append(Paragraph(f"Uploaded: {dataset.uploaded_at}", styles['Normal']))
+    story.append(Paragraph(f"Equipment Count: {summary.equipment_count}", styles['Normal']))
+    story.append(Paragraph(f"Avg Flowrate: {round(summary.avg_flowrate,2)}", styles['Normal']))
+    story.append(Paragraph(f"Avg Pressure: {round(summary.avg_pressure,2)}", styles['Normal']))
+    story.append(Paragraph(f"Avg Temperature: {round(summary.avg_temperature,2)}", styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    # Table header
+    data = [["Name", "Type", "Flowrate", "Pressure", "Temperature"]]
+    rows = dataset.equipment.order_by('id').values_list('name', 'type', 'flowrate', 'pressure', 'temperature')
+    for name, type_, flowrate, pressure, temperature in rows.iterator(chunk_size=2000):
+        data.append([name, type_, str(flowrate), str(pressure), str(temperature)])
+
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#007bff')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ]))
+
+    story.append(table)
+
+    doc.build(story)
+
+
+def request_report(dataset):
+    """The artifact for ``dataset``'s current version, queued if there is none.
+
+    A failed artifact, or one whose worker was lost, is queued again.
+    Workers start once committed.
+    """
+    artifact, created = ReportArtifact.objects.get_or_create(
+        dataset=dataset, version=current_version(dataset),
+    )
+    if queue.is_stale(artifact) and queue.reclaim_stale():
+        artifact.refresh_from_db()
+        created = artifact.state == ReportArtifact.QUEUED
+    elif not created and artifact.state == ReportArtifact.FAILED:
+        ReportArtifact.objects.filter(pk=artifact.pk, state=ReportArtifact.FAILED).update(
+            state=ReportArtifact.QUEUED, error=''
+        )
+        artifact.refresh_from_db()
+        created = True
+    if created:
+        transaction.on_commit(kick)
+    return artifact
+
+
+def fresh_report(dataset):
+    """The ready artifact for ``dataset``'s current version, or None.
+
+    A ready artifact whose file has gone (purged, lost volume) is dropped,
+    so the next request renders it again.
+    """
+    artifact = ReportArtifact.objects.filter(
+        dataset=dataset, version=current_version(dataset), state=ReportArtifact.READY,
+    ).first()
+    if artifact is not None and not os.path.exists(artifact.path):
+        artifact.delete()
+        return None
+    return artifact
+
+
+def ensure_report(dataset):
+    """A ready artifact for ``dataset``'s current version, rendered inline if needed.
+
+    Returns ``(artifact, cached)``; ``cached`` is False when it was rendered
+    by this call.
+    """
+    artifact = fresh_report(dataset)
+    if artifact is not None:
+        return artifact, True
+    artifact = request_report(dataset)
+    if queue.claim(artifact.pk):
+        artifact = render(artifact)
+    else:
+        # Another worker has it; report its current state.
+        artifact.refresh_from_db()
+    return artifact, False
+
+
+def render(artifact):
+    """Render a claimed artifact's PDF and record the outcome.
+
+    Updates go through ``filter().update()`` so an artifact removed in the
+    meantime (dataset deleted, superseded) is not written back.
+    """
+    path = report_dir() / f'dataset_{artifact.dataset_id}_{artifact.version}.pdf'
+    tmp = path.with_name(f'{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError('PDF generation not available (reportlab missing).')
+        build_pdf(artifact.dataset, tmp)
+        os.replace(tmp, path)
+        changes = {'state': ReportArtifact.READY, 'path': str(path), 'size': path.stat().st_size}
+    except Exception as e:
+        changes = {'state': ReportArtifact.FAILED, 'error': f'Report generation failed: {e}'}
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    changes['finished_at'] = timezone.now()
+    ReportArtifact.objects.filter(pk=artifact.pk).update(**changes)
+    for field, value in changes.items():
+        setattr(artifact, field, value)
+
+    if artifact.state == ReportArtifact.READY:
+        # Older versions are never served again.
+        stale = ReportArtifact.objects.filter(dataset_id=artifact.dataset_id).exclude(version=artifact.version)
+        for old in stale.exclude(state=ReportArtifact.RUNNING):
+            old.delete()
+    return artifact
+
+
+def artifact_deleted(sender, instance, **kwargs):
+    """``post_delete`` handler for ReportArtifact: remove its file."""
+    if instance.path:
+        try:
+            os.remove(instance.path)
+        except OSError:
+            pass
+
+
+def _reclaim(artifact, current):
+    """Queue a lost rendering again, or drop it if its version is out of date."""
+    if artifact.version != current_version(artifact.dataset):
+        current.delete()
+        return False
+    return queue.requeue(artifact, current)
+
+
+queue = TableQueue(
+    ReportArtifact, render, name='report', workers_setting='REPORT_WORKERS',
+    timeout_setting='REPORT_TIMEOUT', reclaim=_reclaim, select_related=('dataset',),
+)
+kick = queue.kick
+claim_next = queue.claim_next
+drain = queue.drain
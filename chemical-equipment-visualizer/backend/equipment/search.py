@@ -0,0 +1,143 @@
+"""Indexed full-text search over equipment name, type and material.
+
+Each word of the query must match (AND), as a prefix, in any of the three
+columns. The index depends on the database (see migration 0012):
+
+* SQLite: an external-content FTS5 table, ``equipment_fts``, kept in sync
+  with ``equipment_equipment`` by triggers, so bulk loads, edits and
+  cascading deletes all update it;
+* PostgreSQL: a GIN index on ``to_tsvector('simple', ...)`` of the three
+  columns with non-word characters replaced by spaces (see migration
+  0018), queried with prefix ``tsquery`` terms.
+
+Anything else falls back to ``icontains`` per word.
+
+Django rebuilds a SQLite table when a migration alters its columns or
+indexes, which drops its triggers. ``restore_search_triggers`` runs after
+every ``migrate`` and puts missing triggers back, re-filling the index.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Equipment
+
+FTS_TABLE = 'equipment_fts'
+SEARCH_FIELDS = ('name', 'type', 'material')
+
+SQLITE_INSERT_TRIGGER_SQL = f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, type, material) VALUES (new.id, new.name, new.type, new.material);
+    END"""
+
+SQLITE_TRIGGER_SQL = {
+    f'{FTS_TABLE}_ai': SQLITE_INSERT_TRIGGER_SQL,
+    f'{FTS_TABLE}_ad': f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type, material)
+        VALUES ('delete', old.id, old.name, old.type, old.material);
+    END""",
+    f'{FTS_TABLE}_au': f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, type, material ON equipment_equipment BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type, material)
+        VALUES ('delete', old.id, old.name, old.type, old.material);
+        INSERT INTO {FTS_TABLE}(rowid, name, type, material) VALUES (new.id, new.name, new.type, new.material);
+    END""",
+}
+
+# The query must repeat the indexed expression for the planner to use it.
+# Splitting on non-word characters, as ``terms`` does, keeps PostgreSQL's
+# parser from reading e.g. "Pump-1" as the words "pump" and "-1".
+PG_VECTOR_SQL = (
+    "to_tsvector('simple', regexp_replace("
+    "{p}name || ' ' || {p}type || ' ' || {p}material, '\\W+', ' ', 'g'))"
+)
+
+
+def restore_search_triggers(sender, using='default', **kwargs):
+    """``post_migrate`` handler: recreate sync triggers a table rebuild dropped.
+
+    Rows changed while a trigger was missing are picked up by rebuilding the
+    index. Returns the names of the triggers recreated.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or FTS_TABLE not in connection.introspection.table_names():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+                       [Equipment._meta.db_table])
+        present = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGER_SQL if name not in present]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGER_SQL[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return missing
+
+
+def terms(text):
+    """Lower-cased words of a search string."""
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def _has_fts(connection):
+    # Looked up once per connection; FTS5 may be missing from a SQLite build.
+    if not hasattr(connection, '_equipment_fts'):
+        connection._equipment_fts = FTS_TABLE in connection.introspection.table_names()
+    return connection._equipment_fts
+
+
+@contextmanager
+def deferred_index(connection, cursor):
+    """Index the rows inserted in the block with one statement, not per-row triggers.
+
+    The insert trigger is dropped for the block and recreated after it, so
+    this must run inside a transaction. Bulk loads through the trigger are
+    several times slower, and degrade further once the index holds deletes.
+    """
+    if connection.vendor != 'sqlite' or not _has_fts(connection):
+        yield
+        return
+    table = connection.ops.quote_name(Equipment._meta.db_table)
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+    last_id = cursor.fetchone()[0]
+    cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai')
+    yield
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE}(rowid, name, type, material) '
+        f'SELECT id, name, type, material FROM {table} WHERE id > %s',
+        [last_id],
+    )
+    cursor.execute(SQLITE_INSERT_TRIGGER_SQL)
+
+
+def search_queryset(queryset, text):
+    """Restrict an Equipment queryset to rows matching every word of ``text``."""
+    words = terms(text)
+    if not words:
+        return queryset
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(Equipment._meta.db_table)
+
+    if connection.vendor == 'sqlite' and _has_fts(connection):
+        match = ' '.join(f'"{w}"*' for w in words)
+        sql = f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+        return queryset.filter(RawSQL(sql, [match], output_field=BooleanField()))
+
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(f'{w}:*' for w in words)
+        sql = f"{PG_VECTOR_SQL.format(p=table + '.')} @@ to_tsquery('simple', %s)"
+        return queryset.filter(RawSQL(sql, [query], output_field=BooleanField()))
+
+    for w in words:
+        queryset = queryset.filter(Q(*(Q(**{f'{f}__icontains': w}) for f in SEARCH_FIELDS), _connector=Q.OR))
+    return queryset
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """``?search=`` backed by the full-text index (replaces DRF's SearchFilter)."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        return search_queryset(queryset, request.query_params.get(self.search_param, ''))
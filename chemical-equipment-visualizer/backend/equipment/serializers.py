@@ -1,23 +1,169 @@
+from django.conf import settings
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
 from rest_framework import serializers
-from .models import Equipment, Dataset
+from .models import Equipment, Dataset, IngestJob, ReportArtifact, UploadSession
+from . import anomalies, uploads
+from .summary import get_summary
 
 class EquipmentSerializer(ModelSerializer):
     class Meta:
         model = Equipment
         fields = '__all__'
+        read_only_fields = ('anomaly_flags', 'is_anomalous')
+
+
+# EquipmentSerializer's output keys, in order. The list fast path reads
+# exactly these columns with ``values_list`` (``dataset`` yields its id).
+EQUIPMENT_LIST_FIELDS = (
+    'id', 'name', 'type', 'material', 'flowrate', 'pressure', 'temperature',
+    'anomaly_flags', 'is_anomalous', 'dataset',
+)
+
+
+LAYOUTS = ('rows', 'columnar')
+
+
+def list_fields(value):
+    """Fields named by a ``?fields=`` value (comma separated); all of them if blank.
+
+    Raises ValueError for a field the list does not expose.
+    """
+    fields = tuple(dict.fromkeys(f.strip() for f in (value or '').split(',') if f.strip()))
+    unknown = [f for f in fields if f not in EQUIPMENT_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}. '
+                         f'Choose from {", ".join(EQUIPMENT_LIST_FIELDS)}.')
+    return fields or EQUIPMENT_LIST_FIELDS
+
+
+def equipment_rows(rows, fields=EQUIPMENT_LIST_FIELDS):
+    """EquipmentSerializer-shaped dicts from ``values_list(*fields)`` rows.
+
+    Columns past ``fields`` (selected only for pagination) are dropped.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def equipment_columns(rows, fields=EQUIPMENT_LIST_FIELDS):
+    """``{field: [values]}`` from ``values_list(*fields)`` rows: each key sent once."""
+    columns = list(zip(*rows)) or [()] * len(fields)
+    return {field: list(column) for field, column in zip(fields, columns)}
+
+
+class AnomalySerializer(EquipmentSerializer):
+    reasons = SerializerMethodField()
+
+    def get_reasons(self, obj):
+        return anomalies.describe(obj.anomaly_flags)
 
 
 class DatasetSerializer(serializers.ModelSerializer):
-    equipment_count = serializers.IntegerField(read_only=True)
-    avg_flowrate = serializers.FloatField(read_only=True)
-    avg_pressure = serializers.FloatField(read_only=True)
-    avg_temperature = serializers.FloatField(read_only=True)
-    type_distribution = serializers.DictField(read_only=True)
+    """Dataset with its precomputed DatasetSummary figures.
+
+    Query with ``select_related('summary')`` to avoid one lookup per dataset.
+    """
+    equipment_count = serializers.IntegerField(source='summary.equipment_count', read_only=True)
+    avg_flowrate = serializers.FloatField(source='summary.avg_flowrate', read_only=True)
+    avg_pressure = serializers.FloatField(source='summary.avg_pressure', read_only=True)
+    avg_temperature = serializers.FloatField(source='summary.avg_temperature', read_only=True)
+    min_flowrate = serializers.FloatField(source='summary.min_flowrate', read_only=True)
+    max_flowrate = serializers.FloatField(source='summary.max_flowrate', read_only=True)
+    min_pressure = serializers.FloatField(source='summary.min_pressure', read_only=True)
+    max_pressure = serializers.FloatField(source='summary.max_pressure', read_only=True)
+    min_temperature = serializers.FloatField(source='summary.min_temperature', read_only=True)
+    max_temperature = serializers.FloatField(source='summary.max_temperature', read_only=True)
+    var_flowrate = serializers.FloatField(source='summary.var_flowrate', read_only=True)
+    var_pressure = serializers.FloatField(source='summary.var_pressure', read_only=True)
+    var_temperature = serializers.FloatField(source='summary.var_temperature', read_only=True)
+    type_distribution = serializers.DictField(source='summary.type_distribution', read_only=True)
 
     class Meta:
         model = Dataset
         fields = (
             'id', 'name', 'uploaded_at',
-            'equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution'
+            'equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature',
+            'min_flowrate', 'max_flowrate', 'min_pressure', 'max_pressure',
+            'min_temperature', 'max_temperature',
+            'var_flowrate', 'var_pressure', 'var_temperature', 'type_distribution'
+        )
+
+    def to_representation(self, instance):
+        get_summary(instance)
+        return super().to_representation(instance)
+
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    throughput = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = IngestJob
+        fields = (
+            'id', 'name', 'state', 'dataset', 'append',
+            'rows_processed', 'rows_rejected', 'rejections', 'throughput', 'error',
+            'created_at', 'started_at', 'finished_at'
+        )
+
+
+
+class ReportArtifactSerializer(serializers.ModelSerializer):
+    download = SerializerMethodField()
+
+    class Meta:
+        model = ReportArtifact
+        fields = (
+            'id', 'dataset', 'version', 'state', 'size', 'error', 'download',
+            'created_at', 'started_at', 'finished_at'
+        )
+
+    def get_download(self, obj):
+        if obj.state != ReportArtifact.READY:
+            return None
+        url = f'/api/datasets/{obj.dataset_id}/report/pdf/'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.IntegerField(
+        min_value=1, max_value=uploads.MAX_CHUNK_SIZE, default=uploads.DEFAULT_CHUNK_SIZE
+    )
+    total_size = serializers.IntegerField(min_value=0)
+    total_chunks = serializers.IntegerField(read_only=True)
+    expires_at = serializers.DateTimeField(read_only=True)
+    # Counts, plus at most ``uploads.MAX_LISTED_CHUNKS`` missing indexes.
+    received = SerializerMethodField()
+    missing = SerializerMethodField()
+    missing_count = SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            'id', 'filename', 'total_size', 'chunk_size', 'total_chunks',
+            'received', 'missing', 'missing_count', 'completed', 'created_at', 'expires_at'
         )
+        read_only_fields = ('completed',)
+
+    def validate_total_size(self, value):
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Uploads are limited to {settings.UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+    def validate(self, attrs):
+        chunk_size = attrs.get('chunk_size', uploads.DEFAULT_CHUNK_SIZE)
+        if chunk_size < uploads.MIN_CHUNK_SIZE and attrs['total_size'] > chunk_size:
+            raise serializers.ValidationError({
+                'chunk_size': f'Chunks must be at least {uploads.MIN_CHUNK_SIZE} bytes '
+                              'unless the file fits in one chunk.'
+            })
+        return attrs
+
+    def get_received(self, obj):
+        return len(uploads.received_chunks(obj))
+
+    def get_missing(self, obj):
+        return uploads.missing_chunks(obj)
+
+    def get_missing_count(self, obj):
+        return obj.total_chunks - len(uploads.received_chunks(obj))
@@ -0,0 +1,98 @@
+"""Downsampling of per-row parameter series for charts.
+
+A dataset's rows, in insertion order, form a series per parameter. Charts
+cannot show more points than they have pixels, so the series is reduced
+to a target count before it leaves the server:
+
+* ``lttb``: Largest-Triangle-Three-Buckets, keeps the visual shape;
+* ``minmax``: the lowest and highest point of each bucket, keeps spikes.
+
+Both always keep the first and last point and return row positions, so
+the caller can look up only the labels of the points that survive.
+"""
+import numpy as np
+
+from .summary import PARAMETERS
+
+METHODS = ('lttb', 'minmax')
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+def lttb(y, threshold):
+    """Indexes of the ``threshold`` points LTTB selects from ``y`` (x is the position)."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype='float64')
+    selected = np.empty(threshold, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+    # Buckets over the interior points; the first and last point are fixed.
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        # Twice the triangle area between the last pick, each candidate and
+        # the next bucket's average; the constant factor does not matter.
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y, threshold):
+    """Indexes of each bucket's minimum and maximum, about ``threshold`` in total."""
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    buckets = (threshold - 2) // 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype('int64')
+    picks = [0, n - 1]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop > start:
+            chunk = y[start:stop]
+            picks.extend((start + int(chunk.argmin()), start + int(chunk.argmax())))
+    return np.unique(picks)
+
+
+def downsample(dataset, parameter, points=DEFAULT_POINTS, method='lttb'):
+    """Downsampled series of ``parameter`` for ``dataset`` as parallel lists.
+
+    Reads ids and values in one query, then the names of the kept rows only.
+    """
+    rows = dataset.equipment.order_by('id').values_list('id', parameter)
+    ids, values = (np.array(c) for c in zip(*rows)) if rows else (np.array([]), np.array([]))
+    values = values.astype('float64')
+    pick = lttb if method == 'lttb' else minmax
+    kept = pick(values, points)
+    kept_ids = ids[kept].tolist()
+    names = dict(dataset.equipment.filter(id__in=kept_ids).values_list('id', 'name'))
+    return {
+        'parameter': parameter,
+        'method': method,
+        'total': int(len(values)),
+        'index': kept.tolist(),
+        'name': [names[i] for i in kept_ids],
+        'value': values[kept].tolist(),
+    }
+
+
+def validate(parameter, points, method):
+    """Check query parameters; returns ``(parameter, points, method)`` or raises ValueError."""
+    if parameter not in PARAMETERS:
+        raise ValueError(f'parameter must be one of {", ".join(PARAMETERS)}.')
+    if method not in METHODS:
+        raise ValueError(f'method must be one of {", ".join(METHODS)}.')
+    try:
+        points = int(points)
+    except (TypeError, ValueError):
+        raise ValueError('points must be an integer.')
+    if not 3 <= points <= MAX_POINTS:
+        raise ValueError(f'points must be between 3 and {MAX_POINTS}.')
+    return parameter, points, method
@@ -0,0 +1,84 @@
+"""Extended per-dataset statistics computed with NumPy.
+
+The dataset is fetched with a single query into column arrays. Rows are
+then sorted once by group, so every type/material group is a contiguous
+slice and its statistics are plain array reductions. Histograms share the
+overall bin edges so groups can be compared bar for bar.
+"""
+import numpy as np
+
+from .summary import PARAMETERS
+
+HISTOGRAM_BINS = 10
+PERCENTILES = (50, 90, 99)
+GROUPS = ('type', 'material')
+
+
+def load_columns(dataset):
+    """Column arrays for ``dataset``: the group labels plus the parameters."""
+    fields = GROUPS + PARAMETERS
+    rows = list(dataset.equipment.values_list(*fields))
+    if not rows:
+        return {field: np.array([]) for field in fields}
+    columns = list(zip(*rows))
+    arrays = {field: np.array(columns[i], dtype=object) for i, field in enumerate(GROUPS)}
+    for i, field in enumerate(PARAMETERS, start=len(GROUPS)):
+        arrays[field] = np.array(columns[i], dtype='float64')
+    return arrays
+
+
+def describe(values, edges):
+    """min/max/mean/std/percentiles and a histogram over ``edges`` for one array."""
+    if not len(values):
+        return None
+    percentiles = np.percentile(values, PERCENTILES)
+    counts, _ = np.histogram(values, bins=edges)
+    stats = {
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+    }
+    stats.update({f'p{p}': float(v) for p, v in zip(PERCENTILES, percentiles)})
+    stats['histogram'] = counts.tolist()
+    return stats
+
+
+def _edges(values):
+    if not len(values):
+        return np.array([0.0, 1.0])
+    return np.histogram_bin_edges(values, bins=HISTOGRAM_BINS)
+
+
+def group_stats(labels, arrays, edges):
+    """Per-label statistics; rows are sorted by label once and sliced."""
+    if not len(labels):
+        return {}
+    keys, inverse, counts = np.unique(labels.astype(str), return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    sorted_arrays = {p: arrays[p][order] for p in PARAMETERS}
+    groups = {}
+    for i, key in enumerate(keys):
+        start, stop = bounds[i], bounds[i + 1]
+        group = {'count': int(counts[i])}
+        for p in PARAMETERS:
+            group[p] = describe(sorted_arrays[p][start:stop], edges[p])
+        groups[str(key)] = group
+    return groups
+
+
+def dataset_stats(dataset):
+    """Overall and grouped statistics for ``dataset`` as a JSON-ready dict."""
+    arrays = load_columns(dataset)
+    edges = {p: _edges(arrays[p]) for p in PARAMETERS}
+    result = {
+        'id': dataset.pk,
+        'count': int(len(arrays[PARAMETERS[0]])),
+        'percentiles': list(PERCENTILES),
+        'histogram_edges': {p: edges[p].tolist() for p in PARAMETERS},
+        'overall': {p: describe(arrays[p], edges[p]) for p in PARAMETERS},
+    }
+    for field in GROUPS:
+        result[f'by_{field}'] = group_stats(arrays[field], arrays, edges)
+    return result
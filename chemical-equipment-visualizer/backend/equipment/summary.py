@@ -0,0 +1,178 @@
+"""Maintenance of the materialized DatasetSummary rows.
+
+Ingestion summarizes each normalized frame with pandas and merges the
+partial results chunk by chunk (and append by append), so a summary never needs a rescan of the
+Equipment table. Edits through the API fall back to ``rebuild_summary``,
+which recomputes one dataset with a pair of aggregate queries.
+
+Alongside the summary, one TypeRollup row per equipment type keeps the
+per-type count and averages that the trend endpoint reads across datasets.
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Sum, Variance
+
+from .models import DatasetSummary, TypeRollup
+
+PARAMETERS = ('flowrate', 'pressure', 'temperature')
+
+
+def empty_stats():
+    return {
+        'count': 0,
+        'mean': {p: 0.0 for p in PARAMETERS},
+        'm2': {p: 0.0 for p in PARAMETERS},
+        'min': {p: None for p in PARAMETERS},
+        'max': {p: None for p in PARAMETERS},
+        'types': {},
+        'type_sums': {},
+    }
+
+
+def summarize_frame(frame):
+    """Partial statistics for a normalized frame (see ``ingest.normalize_frame``)."""
+    stats = empty_stats()
+    stats['count'] = len(frame)
+    if not len(frame):
+        return stats
+    for p in PARAMETERS:
+        column = frame[p]
+        stats['mean'][p] = float(column.mean())
+        stats['m2'][p] = float(((column - stats['mean'][p]) ** 2).sum())
+        stats['min'][p] = float(column.min())
+        stats['max'][p] = float(column.max())
+    stats['types'] = {str(t): int(n) for t, n in frame['type'].value_counts().items()}
+    sums = frame.groupby('type')[list(PARAMETERS)].sum()
+    stats['type_sums'] = {str(t): {p: float(row[p]) for p in PARAMETERS} for t, row in sums.iterrows()}
+    return stats
+
+
+def _pick(a, b, fn):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return fn(a, b)
+
+
+def merge_stats(a, b):
+    """Combine two partial statistics as if computed over both row sets.
+
+    Means and M2 use the pairwise form of Welford's update (Chan et al.),
+    so appending a chunk never needs the rows already stored.
+    """
+    count = a['count'] + b['count']
+    merged = empty_stats()
+    merged['count'] = count
+    for p in PARAMETERS:
+        if count:
+            delta = b['mean'][p] - a['mean'][p]
+            merged['mean'][p] = a['mean'][p] + delta * b['count'] / count
+            merged['m2'][p] = a['m2'][p] + b['m2'][p] + delta * delta * a['count'] * b['count'] / count
+        merged['min'][p] = _pick(a['min'][p], b['min'][p], min)
+        merged['max'][p] = _pick(a['max'][p], b['max'][p], max)
+    types = dict(a['types'])
+    for t, n in b['types'].items():
+        types[t] = types.get(t, 0) + n
+    merged['types'] = types
+    type_sums = {t: dict(sums) for t, sums in a['type_sums'].items()}
+    for t, sums in b['type_sums'].items():
+        current = type_sums.setdefault(t, {p: 0.0 for p in PARAMETERS})
+        for p in PARAMETERS:
+            current[p] += sums[p]
+    merged['type_sums'] = type_sums
+    return merged
+
+
+def stats_from_summary(summary):
+    """Partial statistics equivalent to a stored DatasetSummary."""
+    stats = empty_stats()
+    stats['count'] = summary.equipment_count
+    for p in PARAMETERS:
+        stats['mean'][p] = getattr(summary, f'avg_{p}')
+        stats['m2'][p] = getattr(summary, f'm2_{p}')
+        stats['min'][p] = getattr(summary, f'min_{p}')
+        stats['max'][p] = getattr(summary, f'max_{p}')
+    stats['types'] = dict(summary.type_distribution)
+    stats['type_sums'] = {
+        r.type: {p: getattr(r, f'avg_{p}') * r.equipment_count for p in PARAMETERS}
+        for r in summary.dataset.type_rollups.all()
+    }
+    return stats
+
+
+def save_summary(dataset, stats):
+    """Write ``stats`` as the dataset's summary row and bump its version."""
+    fields = {'equipment_count': stats['count'], 'type_distribution': stats['types']}
+    for p in PARAMETERS:
+        fields[f'avg_{p}'] = stats['mean'][p]
+        fields[f'm2_{p}'] = stats['m2'][p]
+        fields[f'min_{p}'] = stats['min'][p]
+        fields[f'max_{p}'] = stats['max'][p]
+    with transaction.atomic():
+        summary = DatasetSummary.objects.select_for_update().filter(dataset=dataset).first()
+        if summary is None:
+            summary = DatasetSummary(dataset=dataset)
+        for field, value in fields.items():
+            setattr(summary, field, value)
+        summary.version += 1
+        summary.save()
+        save_rollups(dataset, stats)
+    dataset.summary = summary
+    return summary
+
+
+def append_to_summary(dataset, frame):
+    """Merge the statistics of ``frame``, rows about to be added, into the summary.
+
+    The summary row is locked for the merge so concurrent appends to one
+    dataset apply one after the other. Call inside the transaction that
+    writes the rows.
+    """
+    with transaction.atomic():
+        summary = DatasetSummary.objects.select_for_update().filter(dataset=dataset).first()
+        current = stats_from_summary(summary) if summary is not None else stats_from_summary(rebuild_summary(dataset))
+        return save_summary(dataset, merge_stats(current, summarize_frame(frame)))
+
+
+def save_rollups(dataset, stats):
+    """Replace the dataset's per-type rollups with those in ``stats``."""
+    TypeRollup.objects.filter(dataset=dataset).delete()
+    rollups = []
+    for t, count in stats['types'].items():
+        sums = stats['type_sums'].get(t, {})
+        averages = {f'avg_{p}': (sums.get(p) or 0) / count if count else 0 for p in PARAMETERS}
+        rollups.append(TypeRollup(dataset=dataset, type=t, equipment_count=count, **averages))
+    TypeRollup.objects.bulk_create(rollups)
+
+
+def rebuild_summary(dataset):
+    """Recompute a dataset's summary from its Equipment rows."""
+    qs = dataset.equipment.all()
+    aggregates = {'count': Count('id')}
+    for p in PARAMETERS:
+        aggregates[f'avg_{p}'] = Avg(p)
+        aggregates[f'var_{p}'] = Variance(p)
+        aggregates[f'min_{p}'] = Min(p)
+        aggregates[f'max_{p}'] = Max(p)
+    agg = qs.aggregate(**aggregates)
+    sums = {f'sum_{p}': Sum(p) for p in PARAMETERS}
+    types = qs.values('type').annotate(count=Count('id'), **sums).order_by()
+
+    stats = empty_stats()
+    stats['count'] = agg['count'] or 0
+    for p in PARAMETERS:
+        stats['mean'][p] = agg[f'avg_{p}'] or 0
+        stats['m2'][p] = (agg[f'var_{p}'] or 0) * stats['count']
+        stats['min'][p] = agg[f'min_{p}']
+        stats['max'][p] = agg[f'max_{p}']
+    stats['types'] = {t['type']: t['count'] for t in types}
+    stats['type_sums'] = {t['type']: {p: t[f'sum_{p}'] for p in PARAMETERS} for t in types}
+    return save_summary(dataset, stats)
+
+
+def get_summary(dataset):
+    """The dataset's summary, rebuilding it if it was never written."""
+    try:
+        return dataset.summary
+    except DatasetSummary.DoesNotExist:
+        return rebuild_summary(dataset)
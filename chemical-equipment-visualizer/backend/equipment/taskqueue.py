@@ -0,0 +1,143 @@
+"""Work queues stored in a model table, drained by in-process threads.
+
+Ingestion jobs (``jobs``) and report renderings (``reports``) are rows
+with a ``state`` of queued / running / ... . A ``TableQueue`` claims the
+oldest queued row with a conditional update, runs it, and repeats until
+none are left; ``kick`` hands that loop to a small per-process thread pool,
+and ``DrainCommand`` runs it from ``manage.py``. No external broker is
+involved.
+
+A running row records a heartbeat in ``heartbeat_field`` (its start time,
+or progress updates). One silent for longer than the timeout setting has
+lost its worker; ``reclaim_stale``, run before every claim, hands it to
+the queue's ``reclaim`` hook, which by default queues it again.
+"""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+QUEUED = 'queued'
+RUNNING = 'running'
+
+
+class TableQueue:
+    """The rows of ``model`` in state ``queued``, run one at a time by ``run``.
+
+    ``workers_setting`` names the setting for pool threads per process (0
+    leaves the queue to the management command); ``timeout_setting`` the
+    seconds a running row may go without a heartbeat. ``reclaim(row,
+    current)`` decides what happens to a stale row; ``current`` is a
+    queryset matching it only while no worker has touched it since it was
+    read. It returns whether the row was queued again.
+    """
+
+    def __init__(self, model, run, *, name, workers_setting, timeout_setting,
+                 heartbeat_field='started_at', reclaim=None, select_related=()):
+        self.model = model
+        self.run = run
+        self.name = name
+        self.workers_setting = workers_setting
+        self.timeout_setting = timeout_setting
+        self.heartbeat_field = heartbeat_field
+        self.reclaim = reclaim or self.requeue
+        self.select_related = select_related
+        self._executor = None
+
+    def kick(self):
+        """Ask the in-process pool to drain the queue (no-op if disabled)."""
+        workers = getattr(settings, self.workers_setting, 0)
+        if workers <= 0:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.name)
+        self._executor.submit(self._drain_in_thread)
+
+    def _drain_in_thread(self):
+        try:
+            self.drain()
+        finally:
+            # Pool threads outlive requests, so nothing else closes their connections.
+            close_old_connections()
+
+    def pending(self):
+        """Rows waiting for or held by a worker."""
+        return self.model.objects.filter(state__in=(QUEUED, RUNNING))
+
+    def stale_cutoff(self):
+        return timezone.now() - datetime.timedelta(seconds=getattr(settings, self.timeout_setting))
+
+    def is_stale(self, row):
+        """Whether a running row has gone without a heartbeat for the timeout."""
+        heartbeat = getattr(row, self.heartbeat_field)
+        return row.state == RUNNING and (heartbeat is None or heartbeat < self.stale_cutoff())
+
+    def requeue(self, row, current):
+        """Default ``reclaim``: queue the row again."""
+        return bool(current.update(state=QUEUED, **{self.heartbeat_field: None, 'started_at': None}))
+
+    def reclaim_stale(self):
+        """Pass every stale running row to ``reclaim``; returns how many were queued again."""
+        field = self.heartbeat_field
+        stale = self.model.objects.filter(
+            Q(**{f'{field}__lt': self.stale_cutoff()}) | Q(**{f'{field}__isnull': True}), state=RUNNING,
+        )
+        reclaimed = 0
+        for row in stale:
+            # Matching the heartbeat we read means no worker touched the row since.
+            current = self.model.objects.filter(pk=row.pk, state=RUNNING, **{field: getattr(row, field)})
+            if self.reclaim(row, current):
+                reclaimed += 1
+        return reclaimed
+
+    def claim(self, pk):
+        """Move row ``pk`` from queued to running; False if another worker got it first."""
+        now = timezone.now()
+        return bool(self.model.objects.filter(pk=pk, state=QUEUED).update(
+            state=RUNNING, **{'started_at': now, self.heartbeat_field: now}
+        ))
+
+    def claim_next(self):
+        """Atomically move the oldest queued row to running and return it."""
+        self.reclaim_stale()
+        queued = self.model.objects.filter(state=QUEUED).order_by('id')
+        for pk in queued.values_list('id', flat=True)[:10]:
+            if self.claim(pk):
+                return self.model.objects.select_related(*self.select_related).get(pk=pk)
+        return None
+
+    def drain(self):
+        """Run queued rows until none are left; returns how many ran."""
+        ran = 0
+        while True:
+            row = self.claim_next()
+            if row is None:
+                break
+            self.run(row)
+            ran += 1
+        return ran
+
+
+class DrainCommand(BaseCommand):
+    """Base for commands draining a ``TableQueue``; set ``queue`` and ``done_message``."""
+    queue = None
+    done_message = 'Ran {} items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop (default: 2)')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = self.queue.drain()
+            if ran:
+                self.stdout.write(self.style.SUCCESS(self.done_message.format(ran)))
+            if not options.get('loop'):
+                break
+            close_old_connections()
+            time.sleep(options.get('interval'))
@@ -1,15 +1,77 @@
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from django.core.management import call_command
-from .models import Dataset, Equipment
+from django.core.management.sql import emit_post_migrate_signal
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .models import (
+    EQUIPMENT_INDEXED_FIELDS, Dataset, DatasetSummary, Equipment, IngestJob, ReportArtifact, TypeRollup,
+    UploadSession,
+)
+from .anomalies import flag_columns, flag_dataset
+from .ingest import PYARROW_AVAILABLE, read_frame
+from .loaders import get_loader
+from . import jobs, loaders, reports, search, uploads
+from .renderers import MSGPACK_AVAILABLE
+from .serializers import EQUIPMENT_LIST_FIELDS, EquipmentSerializer
+from .views import EquipmentViewSet
+import base64
+import csv
+import datetime
+import gzip
 import io
+import json
+import re
+import numpy as np
+import pandas as pd
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from unittest import mock, skipUnless
 
 
-class UploadAndSummaryTests(TestCase):
+class MediaRootMixin:
+    """Point MEDIA_ROOT (spooled uploads, chunks, exports, reports) at a
+    temporary directory for each test; ``media_settings`` adds overrides."""
+    media_settings = {}
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name, **self.media_settings)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class UploadClientMixin:
+    """A token-authenticated client and an ``upload()`` helper for /api/upload/."""
+    upload_name = 'ingest.csv'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user('tester', 't@example.com', 'password')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def upload(self, content, name=None, **extra):
+        fp = io.BytesIO(content.encode() if isinstance(content, str) else content)
+        fp.name = name or self.upload_name
+        return self.client.post('/api/upload/', {'file': fp, **extra}, format='multipart')
+
+
+class UploadAndSummaryTests(MediaRootMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.client = APIClient()
         # create a user for authenticated endpoints
         self.user = User.objects.create_user('tester', 't@example.com', 'password')
@@ -113,7 +175,7 @@ Pump-1,Pump,120,5.2,110
         # Should return PDF or 501
         self.assertIn(res.status_code, (200, 501))
         if res.status_code == 200:
-            self.assertTrue(res.content.startswith(b'%PDF'))
+            self.assertTrue(b''.join(res.streaming_content).startswith(b'%PDF'))
 
     def test_generate_report_command(self):
         call_command('load_sample')
@@ -132,5 +194,1384 @@ Pump-1,Pump,120,5.2,110
 
 
 
+class IngestTests(UploadClientMixin, TestCase):
+    def test_upload_reports_rejected_rows(self):
+        res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+,Pump,10,1,1
+Valve-1,Valve,abc,4.1,105
+Valve-2,Valve,60,,105
+""")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['rejected'], 2)
+        self.assertEqual(res.data['rejections'], [
+            {'row': 2, 'reason': 'missing name'},
+            {'row': 3, 'reason': 'invalid flowrate'},
+        ])
+        ds = Dataset.objects.get(id=res.data['dataset']['id'])
+        valve = ds.equipment.get(name='Valve-2')
+        self.assertEqual(valve.pressure, 0)
+
+    def test_upload_header_aliases(self):
+        res = self.upload("""name,type,Material,Flowrate,Pressure,Temperature
+Pump-1,Pump,Steel,120,5.2,110
+""")
+        self.assertEqual(res.data['created'], 1)
+        eq = Equipment.objects.get(dataset_id=res.data['dataset']['id'])
+        self.assertEqual((eq.name, eq.type, eq.material), ('Pump-1', 'Pump', 'Steel'))
+
+
+    def test_duplicate_upload_returns_existing_dataset(self):
+        csv_content = """Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+"""
+        first = self.upload(csv_content)
+        self.assertFalse(first.data['duplicate'])
+        second = self.upload(csv_content, name='again.csv')
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.data['duplicate'])
+        self.assertEqual(second.data['created'], 0)
+        self.assertEqual(second.data['dataset']['id'], first.data['dataset']['id'])
+        self.assertEqual(Dataset.objects.count(), 1)
+
+        forced = self.upload(csv_content, force='true')
+        self.assertFalse(forced.data['duplicate'])
+        self.assertNotEqual(forced.data['dataset']['id'], first.data['dataset']['id'])
+        self.assertEqual(Equipment.objects.count(), 2)
+
+    def test_stream_mode_commits_in_chunks(self):
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 2):
+            res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Pump-2,Pump,121,5.3,111
+Pump-3,Pump,122,5.4,112
+,Pump,1,1,1
+Pump-5,Pump,124,5.6,114
+""", mode='stream')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['chunks'], 3)
+        self.assertEqual(res.data['created'], 4)
+        self.assertEqual(res.data['rejections'], [{'row': 4, 'reason': 'missing name'}])
+
+    def test_unrecognized_header_is_rejected(self):
+        for extra in ({}, {'mode': 'stream'}):
+            res = self.upload("foo,bar\n1,2\n", force='true', **extra)
+            self.assertEqual(res.status_code, 400)
+            self.assertIn('missing name column', res.data['detail'])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_stream_mode_reports_partial_progress(self):
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 2):
+            res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Pump-2,Pump,121,5.3,111
+"Pump-3,Pump,122,5.4,112
+Pump-4,Pump,123,5.5,113
+""", mode='stream')
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data['chunks'], 1)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(Equipment.objects.filter(dataset_id=res.data['dataset']['id']).count(), 2)
+
+    def test_failed_stream_is_not_a_duplicate(self):
+        content = """Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Pump-2,Pump,121,5.3,111
+"Pump-3,Pump,122,5.4,112
+"""
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 2):
+            failed = self.upload(content, mode='stream')
+            self.assertEqual(failed.status_code, 400)
+            again = self.upload(content, mode='stream')
+        self.assertEqual(again.status_code, 400)
+        self.assertFalse(again.data['duplicate'])
+        self.assertNotEqual(again.data['dataset']['id'], failed.data['dataset']['id'])
+
+        good = 'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,120,5.2,110\n'
+        first = self.upload(good, mode='stream')
+        self.assertFalse(first.data['duplicate'])
+        self.assertTrue(self.upload(good, mode='stream').data['duplicate'])
+
+
+
+class IngestJobTests(MediaRootMixin, UploadClientMixin, TestCase):
+    media_settings = {'INGEST_WORKERS': 0}
+
+    def test_async_upload_runs_as_background_job(self):
+        res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Pump-2,Pump,bad,5.3,111
+""", 'async.csv', mode='async')
+        self.assertEqual(res.status_code, 202)
+        job_id = res.data['job']['id']
+        self.assertEqual(res.data['job']['state'], 'queued')
+
+        call_command('process_ingest_jobs')
+
+        res2 = self.client.get(f'/api/jobs/{job_id}/')
+        self.assertEqual(res2.status_code, 200)
+        self.assertEqual(res2.data['state'], 'succeeded')
+        self.assertEqual(res2.data['rows_processed'], 2)
+        self.assertEqual(res2.data['rows_rejected'], 1)
+        self.assertEqual(Equipment.objects.filter(dataset_id=res2.data['dataset']).count(), 1)
+        self.assertEqual(os.listdir(os.path.join(self.media.name, 'ingest')), [])
+
+    def test_failed_job_dataset_is_not_a_duplicate(self):
+        content = 'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,120,5.2,110\n'
+        res = self.upload(content, 'async.csv', mode='async')
+        call_command('process_ingest_jobs')
+        job = IngestJob.objects.get(pk=res.data['job']['id'])
+        self.assertTrue(self.upload(content).data['duplicate'])
+        # A dataset whose job did not finish (e.g. recorded before hashes
+        # were only set on completion) is not a match.
+        IngestJob.objects.filter(pk=job.pk).update(state=IngestJob.FAILED)
+        res = self.upload(content)
+        self.assertFalse(res.data['duplicate'])
+        self.assertNotEqual(res.data['dataset']['id'], job.dataset_id)
+
+    def test_async_append_targets_existing_dataset(self):
+        ds = Dataset.objects.create(name='existing')
+        res = self.upload('Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-9,Pump,1,2,3\n',
+                          'more.csv', mode='async', dataset=ds.id)
+        self.assertTrue(res.data['job']['append'])
+        call_command('process_ingest_jobs')
+        self.assertEqual(self.client.get(f"/api/jobs/{res.data['job']['id']}/").data['dataset'], ds.id)
+        self.assertEqual(DatasetSummary.objects.get(dataset=ds).equipment_count, 1)
+
+    def test_job_status_requires_auth(self):
+        res = APIClient().get('/api/jobs/1/')
+        self.assertIn(res.status_code, (401, 403))
+
+    def test_job_status_is_scoped_to_owner(self):
+        res = self.upload('Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,1,2,3\n',
+                          'mine.csv', mode='async')
+        job_id = res.data['job']['id']
+        self.assertEqual(IngestJob.objects.get(pk=job_id).owner, self.user)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', 'o@example.com', 'password'))
+        self.assertEqual(other.get(f'/api/jobs/{job_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/').status_code, 200)
+
+    def spooled_job(self, **fields):
+        source = os.path.join(self.media.name, 'spooled.csv')
+        with open(source, 'w') as fh:
+            fh.write('Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,1,2,3\n')
+        stale = timezone.now() - datetime.timedelta(hours=1)
+        return IngestJob.objects.create(name='spooled.csv', source=source, state=IngestJob.RUNNING,
+                                        owner=self.user, started_at=stale, heartbeat_at=stale, **fields)
+
+    def test_stale_running_job_is_reclaimed(self):
+        partial = Dataset.objects.create(name='partial')
+        job = self.spooled_job(dataset=partial, rows_processed=5)
+        self.assertTrue(jobs.is_stale(job))
+        with mock.patch('equipment.jobs.kick') as kick:
+            self.client.get(f'/api/jobs/{job.id}/')
+        kick.assert_called_once()
+
+        call_command('process_ingest_jobs')
+        job.refresh_from_db()
+        self.assertEqual(job.state, IngestJob.SUCCEEDED)
+        self.assertEqual(job.rows_processed, 1)
+        self.assertFalse(Dataset.objects.filter(pk=partial.pk).exists())
+        self.assertEqual(Equipment.objects.filter(dataset=job.dataset).count(), 1)
+
+        # A live heartbeat is left alone.
+        live = self.spooled_job()
+        IngestJob.objects.filter(pk=live.pk).update(heartbeat_at=timezone.now())
+        self.assertEqual(jobs.reclaim_stale(), 0)
+
+    def test_interrupted_append_fails_and_drops_spool(self):
+        ds = Dataset.objects.create(name='target')
+        job = self.spooled_job(dataset=ds, append=True, rows_processed=3)
+        self.assertEqual(jobs.reclaim_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.state, IngestJob.FAILED)
+        self.assertFalse(os.path.exists(job.source))
+
+    def test_first_request_kicks_leftover_jobs(self):
+        from django.core.signals import request_started
+        IngestJob.objects.create(name='left.csv', source='/nonexistent')
+        request_started.connect(jobs.kick_on_first_request)
+        with mock.patch('equipment.jobs.kick') as kick:
+            self.client.get('/api/datasets/')
+            self.client.get('/api/datasets/')
+        kick.assert_called_once()
+
+
+
+class UploadSessionTests(MediaRootMixin, UploadClientMixin, TestCase):
+    media_settings = {'INGEST_WORKERS': 0}
+    CSV = b"""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Compressor-1,Compressor,95,8.4,95
+Valve-1,Valve,60,4.1,105
+"""
+
+    def setUp(self):
+        super().setUp()
+        # Tiny chunks keep the fixtures small.
+        patcher = mock.patch.object(uploads, 'MIN_CHUNK_SIZE', 16)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def put_chunk(self, sid, index, size=32):
+        data = self.CSV[index * size:(index + 1) * size]
+        return self.client.put(f'/api/uploads/{sid}/chunks/{index}/', data, content_type='application/octet-stream')
+
+    def test_chunked_upload_resume_and_complete(self):
+        res = self.client.post('/api/uploads/', {'filename': 'chunked.csv', 'total_size': len(self.CSV), 'chunk_size': 32}, format='json')
+        self.assertEqual(res.status_code, 201)
+        sid = res.data['id']
+        last = res.data['total_chunks'] - 1
+        self.assertEqual(last, (len(self.CSV) - 1) // 32)
+
+        # Send out of order, then "drop" before the last chunk
+        for index in reversed(range(last)):
+            self.assertEqual(self.put_chunk(sid, index).status_code, 200)
+        res = self.client.post(f'/api/uploads/{sid}/complete/')
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data['missing'], [last])
+        self.assertEqual(res.data['missing_count'], 1)
+
+        # Resume: ask the server what is missing and send it
+        res = self.client.get(f'/api/uploads/{sid}/')
+        self.assertEqual(res.data['received'], last)
+        self.assertEqual(res.data['missing'], [last])
+        self.assertEqual(self.put_chunk(sid, last).status_code, 200)
+
+        res = self.client.post(f'/api/uploads/{sid}/complete/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['dataset']['name'], 'chunked.csv')
+        self.assertEqual(self.client.post(f'/api/uploads/{sid}/complete/').status_code, 409)
+
+    def test_small_chunks_and_long_missing_lists_are_limited(self):
+        res = self.client.post('/api/uploads/', {'filename': 'tiny.csv', 'total_size': 10 ** 6, 'chunk_size': 8}, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('chunk_size', res.data)
+        # A file that fits in one chunk may use a smaller one.
+        res = self.client.post('/api/uploads/', {'filename': 'one.csv', 'total_size': 8, 'chunk_size': 8}, format='json')
+        self.assertEqual(res.status_code, 201)
+
+        with mock.patch.object(uploads, 'MAX_LISTED_CHUNKS', 2):
+            res = self.client.post('/api/uploads/', {'filename': 'big.csv', 'total_size': 160, 'chunk_size': 16}, format='json')
+        self.assertEqual(res.data['missing'], [0, 1])
+        self.assertEqual(res.data['missing_count'], 10)
+        self.assertEqual(res.data['received'], 0)
+
+    def test_chunk_with_wrong_size_is_rejected(self):
+        res = self.client.post('/api/uploads/', {'filename': 'bad.csv', 'total_size': 100, 'chunk_size': 32}, format='json')
+        sid = res.data['id']
+        res = self.client.put(f'/api/uploads/{sid}/chunks/0/', b'x' * 10, content_type='application/octet-stream')
+        self.assertEqual(res.status_code, 400)
+        res = self.client.put(f'/api/uploads/{sid}/chunks/9/', b'x' * 32, content_type='application/octet-stream')
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.client.get(f'/api/uploads/{sid}/').data['received'], 0)
+
+    def test_sessions_are_private_to_their_owner(self):
+        sid = self.client.post('/api/uploads/', {'filename': 'mine.csv', 'total_size': 64, 'chunk_size': 32}, format='json').data['id']
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', 'o@example.com', 'password'))
+        self.assertEqual(other.get(f'/api/uploads/{sid}/').status_code, 404)
+        res = other.put(f'/api/uploads/{sid}/chunks/0/', b'x' * 32, content_type='application/octet-stream')
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(other.post(f'/api/uploads/{sid}/complete/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/uploads/{sid}/').data['received'], 0)
+
+    def test_total_size_is_capped(self):
+        with self.settings(UPLOAD_MAX_SIZE=1000):
+            res = self.client.post('/api/uploads/', {'filename': 'big.csv', 'total_size': 1001}, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('total_size', res.data)
+
+    def test_expired_sessions_are_purged(self):
+        sid = self.client.post('/api/uploads/', {'filename': 'old.csv', 'total_size': 64, 'chunk_size': 32}, format='json').data['id']
+        self.assertEqual(self.put_chunk(sid, 0).status_code, 200)
+        session = UploadSession.objects.get(pk=sid)
+        # A spool file left behind by an earlier failed completion.
+        leftover = uploads.spool_path(session)
+        leftover.write_bytes(b'partial')
+        orphan = Path(self.media.name) / 'uploads' / 'not-a-session'
+        orphan.mkdir()
+        old = timezone.now() - datetime.timedelta(days=2)
+        UploadSession.objects.filter(pk=sid).update(created_at=old)
+        os.utime(orphan, (old.timestamp(), old.timestamp()))
+
+        out = io.StringIO()
+        call_command('purge_uploads', stdout=out)
+        self.assertIn('Removed 1 expired', out.getvalue())
+        self.assertFalse(UploadSession.objects.filter(pk=sid).exists())
+        self.assertFalse(uploads.session_dir(session).exists())
+        self.assertFalse(leftover.exists())
+        self.assertFalse(orphan.exists())
+
+    def test_expired_session_is_gone_on_access(self):
+        sid = self.client.post('/api/uploads/', {'filename': 'old.csv', 'total_size': 64, 'chunk_size': 32}, format='json').data['id']
+        self.assertEqual(self.put_chunk(sid, 0).status_code, 200)
+        with self.settings(UPLOAD_SESSION_TTL=0):
+            self.assertEqual(self.put_chunk(sid, 1).status_code, 404)
+        self.assertFalse(UploadSession.objects.filter(pk=sid).exists())
+        self.assertFalse((Path(self.media.name) / 'uploads' / sid).exists())
+
+    def test_failed_assembly_keeps_session_resumable(self):
+        sid = self.client.post('/api/uploads/', {'filename': 'c.csv', 'total_size': len(self.CSV), 'chunk_size': 32}, format='json').data['id']
+        total = UploadSession.objects.get(pk=sid).total_chunks
+        for index in range(total):
+            self.put_chunk(sid, index)
+        session = UploadSession.objects.get(pk=sid)
+        (uploads.session_dir(session) / f'{total - 1}.part').unlink()
+        with mock.patch.object(uploads, 'missing_chunks', return_value=[]):
+            res = self.client.post(f'/api/uploads/{sid}/complete/')
+        self.assertEqual(res.status_code, 500)
+        self.assertFalse(uploads.spool_path(session).exists())
+        self.assertFalse(UploadSession.objects.get(pk=sid).completed)
+        self.assertEqual(self.put_chunk(sid, total - 1).status_code, 200)
+        self.assertEqual(self.client.post(f'/api/uploads/{sid}/complete/').status_code, 200)
+
+
+
+class LoadSampleCommandTests(TestCase):
+    def write_csv(self, directory, name, rows):
+        lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        lines += [f'{name}-{i},Pump,{100 + i},5,110' for i in range(rows)]
+        with open(os.path.join(directory, name), 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+
+    def test_loads_directories_and_globs_in_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.write_csv(tmp, 'day1.csv', 3)
+            self.write_csv(tmp, 'day2.csv', 4)
+            self.write_csv(tmp, 'day3.csv', 5)
+            self.write_csv(tmp, 'notes.txt', 1)
+            out = io.StringIO()
+            call_command('load_sample', '--file', tmp, '--workers', '2', stdout=out)
+            self.assertEqual(
+                sorted(Dataset.objects.values_list('name', flat=True)),
+                ['day1.csv', 'day2.csv', 'day3.csv'],
+            )
+            self.assertEqual(Equipment.objects.count(), 12)
+            self.assertIn('Total: 3 datasets, 12 rows', out.getvalue())
+
+            # Re-running over a glob skips the files already loaded
+            out = io.StringIO()
+            call_command('load_sample', '--file', os.path.join(tmp, 'day*.csv'), '--workers', '1', stdout=out)
+            self.assertEqual(Dataset.objects.count(), 3)
+            self.assertIn('already loaded', out.getvalue())
+
+    def test_streaming_continues_past_a_bad_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.write_csv(tmp, 'a.csv', 3)
+            with open(os.path.join(tmp, 'b.parquet'), 'wb') as fh:
+                fh.write(b'not parquet')
+            self.write_csv(tmp, 'c.csv', 4)
+            out = io.StringIO()
+            call_command('load_sample', '--file', tmp, '--chunksize', '2', stdout=out)
+            self.assertEqual(sorted(Dataset.objects.values_list('name', flat=True)), ['a.csv', 'c.csv'])
+            self.assertIn('b.parquet: Failed to parse file', out.getvalue())
+            self.assertIn('Total: 2 datasets, 7 rows', out.getvalue())
+            self.assertIn('rows/sec), 1 failed', out.getvalue())
+
+
+
+@skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+class ColumnarUploadTests(UploadClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        import pyarrow as pa
+        self.table = pa.table({
+            'Equipment Name': ['Pump-1', 'Valve-1', None],
+            'Type': ['Pump', 'Valve', 'Valve'],
+            'Flowrate': [120.0, 60.0, 1.0],
+            'Pressure': [5.2, 4.1, 1.0],
+            'Temperature': [110.0, 105.0, 1.0],
+            'Notes': ['ignored', 'ignored', 'ignored'],
+        })
+
+    def test_parquet_upload(self):
+        import pyarrow.parquet as pq
+        buf = io.BytesIO()
+        pq.write_table(self.table, buf)
+        res = self.upload(buf.getvalue(), 'plant.parquet')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['rejections'], [{'row': 3, 'reason': 'missing name'}])
+        eq = Equipment.objects.get(name='Valve-1')
+        self.assertEqual((eq.type, eq.pressure), ('Valve', 4.1))
+
+    def test_feather_upload_streams(self):
+        import pyarrow.feather as feather
+        buf = io.BytesIO()
+        feather.write_feather(self.table, buf)
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 2):
+            res = self.upload(buf.getvalue(), 'plant.feather', mode='stream')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['chunks'], 2)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['rejections'], [{'row': 3, 'reason': 'missing name'}])
+
+    def test_file_without_name_column_is_rejected(self):
+        import pyarrow.parquet as pq
+        buf = io.BytesIO()
+        pq.write_table(self.table.drop_columns(['Equipment Name']), buf)
+        res = self.upload(buf.getvalue(), 'plant.parquet')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('missing name column', res.data['detail'])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_projection_reads_only_equipment_columns(self):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'plant.parquet')
+            pq.write_table(self.table, path)
+            self.assertNotIn('Notes', read_frame(path).columns)
+            call_command('load_sample', '--file', tmp, '--workers', '1', stdout=io.StringIO())
+        self.assertTrue(Dataset.objects.filter(name='plant.parquet').exists())
+
+
+
+class SharedCacheMixin:
+    """A file-based cache, standing in for a cache shared by every process
+    (version pointers are only cached there)."""
+
+    def setUp(self):
+        super().setUp()
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        backend = 'django.core.cache.backends.filebased.FileBasedCache'
+        override = self.settings(CACHES={'default': {'BACKEND': backend, 'LOCATION': location.name}})
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class DatasetSummaryTests(SharedCacheMixin, UploadClientMixin, TestCase):
+    upload_name = 'summary.csv'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_summary_written_at_ingest_and_read_without_aggregates(self):
+        csv_content = """Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+Pump-2,Pump,100,4.8,90
+Valve-1,Valve,60,4.1,105
+"""
+        for extra in ({}, {'mode': 'stream', 'force': 'true'}):
+            with mock.patch('equipment.ingest.CHUNK_ROWS', 2):
+                res = self.upload(csv_content, **extra)
+            summary = DatasetSummary.objects.get(dataset_id=res.data['dataset']['id'])
+            self.assertEqual(summary.equipment_count, 3)
+            self.assertAlmostEqual(summary.avg_flowrate, 280 / 3)
+            self.assertEqual((summary.min_pressure, summary.max_pressure), (4.1, 5.2))
+            self.assertEqual(summary.type_distribution, {'Pump': 2, 'Valve': 1})
+
+        ds_id = res.data['dataset']['id']
+        self.client.credentials()
+        with self.assertNumQueries(2):  # version pointer, then the joined summary
+            res = self.client.get(f'/api/datasets/{ds_id}/summary/')
+        self.assertEqual(res.data['max_temperature'], 110)
+        with self.assertNumQueries(2):  # list generation, then one page query
+            res = self.client.get('/api/datasets/')
+        self.assertEqual(len(res.data), 2)
+
+    def test_summary_follows_viewset_edits(self):
+        res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+""")
+        ds_id = res.data['dataset']['id']
+        created = self.client.post('/api/equipment/', {
+            'dataset': ds_id, 'name': 'Valve-1', 'type': 'Valve', 'material': 'Steel',
+            'flowrate': 80, 'pressure': 4, 'temperature': 90,
+        })
+        self.assertEqual(created.status_code, 201)
+        summary = DatasetSummary.objects.get(dataset_id=ds_id)
+        self.assertEqual(summary.equipment_count, 2)
+        self.assertEqual(summary.avg_flowrate, 100)
+
+        self.client.patch(f"/api/equipment/{created.data['id']}/", {'flowrate': 40})
+        self.assertEqual(DatasetSummary.objects.get(dataset_id=ds_id).min_flowrate, 40)
+
+        self.client.delete(f"/api/equipment/{created.data['id']}/")
+        summary = DatasetSummary.objects.get(dataset_id=ds_id)
+        self.assertEqual(summary.equipment_count, 1)
+        self.assertEqual(summary.type_distribution, {'Pump': 1})
+
+
+    def test_dataset_history_pages_with_cursor(self):
+        ids = []
+        for i in range(7):
+            ds = Dataset.objects.create(name=f'ds-{i}')
+            DatasetSummary.objects.create(dataset=ds, equipment_count=i)
+            ids.append(ds.id)
+        ids.reverse()
+
+        self.client.credentials()
+        res = self.client.get('/api/datasets/')
+        self.assertEqual([d['id'] for d in res.data], ids[:5])
+
+        seen = []
+        url = '/api/datasets/?page_size=3'
+        while url:
+            res = self.client.get(url)
+            seen.extend(d['id'] for d in res.data['results'])
+            url = res.data['next']
+        self.assertEqual(seen, ids)
+
+
+    def test_conditional_get_returns_304_from_cache(self):
+        res = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,5.2,110
+""")
+        ds_id = res.data['dataset']['id']
+        for url in (f'/api/datasets/{ds_id}/summary/', '/api/datasets/'):
+            first = self.client.get(url)
+            self.assertTrue(first.has_header('Last-Modified'))
+            etag = first['ETag']
+            with self.assertNumQueries(0):
+                again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(again.status_code, 304)
+
+            self.client.post('/api/equipment/', {
+                'dataset': ds_id, 'name': 'Valve-1', 'type': 'Valve', 'material': 'Steel',
+                'flowrate': 80, 'pressure': 4, 'temperature': 90,
+            })
+            changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(changed.data[0]['equipment_count'], 3)
+
+
+    def test_per_process_cache_sees_writes_from_other_processes(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=local):
+            cache.clear()
+            self.upload('Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,1,2,3\n', 'one.csv')
+            self.assertEqual(len(self.client.get('/api/datasets/').data), 1)
+            # Another worker's write cannot invalidate this process's cache.
+            with mock.patch('equipment.cache.invalidate'):
+                self.upload('Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-2,Pump,1,2,3\n', 'two.csv')
+            self.assertEqual(len(self.client.get('/api/datasets/').data), 2)
+
+    def test_list_body_cache_is_per_host(self):
+        for i in range(2):
+            self.upload(f'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-{i},Pump,1,2,3\n', f'{i}.csv')
+        with self.settings(ALLOWED_HOSTS=['a.example', 'b.example']):
+            for host in ('a.example', 'b.example'):
+                res = self.client.get('/api/datasets/', {'page_size': 1}, HTTP_HOST=host)
+                self.assertTrue(res.data['next'].startswith(f'http://{host}/'))
+
+    def test_extended_stats_overall_and_grouped(self):
+        res = self.upload("""Equipment Name,Type,Material,Flowrate,Pressure,Temperature
+Pump-1,Pump,Steel,100,5,110
+Pump-2,Pump,Steel,200,6,90
+Valve-1,Valve,Brass,50,4,105
+Valve-2,Valve,Steel,70,3,100
+""")
+        ds_id = res.data['dataset']['id']
+        res = self.client.get(f'/api/datasets/{ds_id}/stats/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], 4)
+        flow = res.data['overall']['flowrate']
+        self.assertEqual((flow['min'], flow['max']), (50, 200))
+        self.assertAlmostEqual(flow['std'], np.std([100, 200, 50, 70]))
+        self.assertAlmostEqual(flow['p50'], 85)
+        self.assertEqual(sum(flow['histogram']), 4)
+        self.assertEqual(len(res.data['histogram_edges']['flowrate']), len(flow['histogram']) + 1)
+        self.assertEqual(res.data['by_type']['Pump']['pressure']['max'], 6)
+        self.assertEqual(res.data['by_material']['Steel']['count'], 3)
+        self.assertEqual(res.data['by_material']['Brass']['temperature']['p99'], 105)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(f'/api/datasets/{ds_id}/stats/', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/api/datasets/999/stats/').status_code, 404)
+
+
+    def test_trends_by_type_and_name(self):
+        self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,100,5,110
+Pump-2,Pump,200,7,90
+Valve-1,Valve,50,4,105
+""")
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 1):
+            second = self.upload("""Equipment Name,Type,Flowrate,Pressure,Temperature
+Pump-1,Pump,120,8,110
+Valve-1,Valve,70,3,100
+""", mode='stream')
+
+        with self.assertNumQueries(3):  # list generation, token auth, one rollup query
+            res = self.client.get('/api/datasets/trends/')
+        self.assertEqual([s['key'] for s in res.data['series']], ['Pump', 'Valve'])
+        pump = res.data['series'][0]['points']
+        self.assertEqual([p['count'] for p in pump], [2, 1])
+        self.assertEqual([p['avg_pressure'] for p in pump], [6, 8])
+
+        res = self.client.get('/api/datasets/trends/', {'group': 'name', 'key': ['Valve-1']})
+        self.assertEqual(len(res.data['series']), 1)
+        self.assertEqual([p['avg_flowrate'] for p in res.data['series'][0]['points']], [50, 70])
+
+        self.client.delete(f"/api/equipment/{Equipment.objects.get(dataset_id=second.data['dataset']['id'], name='Pump-1').id}/")
+        res = self.client.get('/api/datasets/trends/', {'key': 'Pump', 'end': '2999-01-01'})
+        self.assertEqual(len(res.data['series'][0]['points']), 1)
+        res = self.client.get('/api/datasets/trends/', {'start': '2999-01-01'})
+        self.assertEqual(res.data['series'], [])
+        self.assertEqual(self.client.get('/api/datasets/trends/', {'group': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/datasets/trends/', {'start': 'soon'}).status_code, 400)
+
+
+    def test_downsampled_series(self):
+        values = np.sin(np.linspace(0, 6, 400)) * 10
+        values[123] = 500  # a spike both methods must keep
+        rows = ''.join(f'P-{i},Pump,{v},1,1\n' for i, v in enumerate(values))
+        res = self.upload('Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows)
+        ds_id = res.data['dataset']['id']
+
+        for method in ('lttb', 'minmax'):
+            res = self.client.get(f'/api/datasets/{ds_id}/series/',
+                                  {'parameter': 'flowrate', 'points': 40, 'method': method})
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.data['total'], 400)
+            self.assertLessEqual(len(res.data['value']), 40)
+            self.assertEqual(res.data['index'][0], 0)
+            self.assertEqual(res.data['index'][-1], 399)
+            self.assertEqual(res.data['index'], sorted(res.data['index']))
+            self.assertIn(123, res.data['index'])
+            self.assertEqual(res.data['name'][res.data['index'].index(123)], 'P-123')
+
+        res = self.client.get(f'/api/datasets/{ds_id}/series/', {'points': 1000})
+        self.assertEqual(len(res.data['value']), 400)
+        self.assertEqual(self.client.get(f'/api/datasets/{ds_id}/series/', {'parameter': 'name'}).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/datasets/{ds_id}/series/', {'points': 'many'}).status_code, 400)
+
+
+    def test_append_updates_summary_incrementally(self):
+        header = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+        first = self.upload(header + 'Pump-1,Pump,100,5,110\nValve-1,Valve,50,4,105\n')
+        ds_id = first.data['dataset']['id']
+        self.assertTrue(Dataset.objects.get(pk=ds_id).content_hash)
+
+        second = self.upload(header + 'Pump-2,Pump,200,7,90\n,Pump,1,1,1\n', dataset=ds_id)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual((second.data['created'], second.data['rejected']), (1, 1))
+        with mock.patch('equipment.ingest.CHUNK_ROWS', 1):
+            third = self.upload(header + 'Valve-2,Valve,70,3,100\nPump-3,Pump,90,6,95\n',
+                                dataset=ds_id, mode='stream')
+        self.assertEqual(third.data['chunks'], 2)
+        self.assertEqual(Dataset.objects.count(), 1)
+        self.assertEqual(Dataset.objects.get(pk=ds_id).content_hash, '')
+
+        flow = np.array([100, 50, 200, 70, 90])
+        temp = np.array([110, 105, 90, 100, 95])
+        data = third.data['dataset']
+        self.assertEqual(data['equipment_count'], 5)
+        self.assertAlmostEqual(data['avg_flowrate'], flow.mean())
+        self.assertAlmostEqual(data['var_flowrate'], flow.var())
+        self.assertAlmostEqual(data['var_temperature'], temp.var())
+        self.assertEqual((data['min_pressure'], data['max_pressure']), (3, 7))
+        self.assertEqual(data['type_distribution'], {'Pump': 3, 'Valve': 2})
+        pump = TypeRollup.objects.get(dataset_id=ds_id, type='Pump')
+        self.assertAlmostEqual(pump.avg_flowrate, 130)
+
+        # The incremental result matches a full recomputation.
+        from .summary import rebuild_summary
+        rebuilt = rebuild_summary(Dataset.objects.get(pk=ds_id))
+        self.assertAlmostEqual(rebuilt.var_flowrate, flow.var())
+        self.assertEqual(self.upload(header + 'X,Pump,1,1,1\n', dataset=999).status_code, 404)
+
+
+    def test_anomaly_flags_at_ingest_and_filter(self):
+        rows = ''.join(f'Pump-{i},Pump,100,{5 + i % 3 * 0.1},100\n' for i in range(20))
+        rows += 'Pump-X,Pump,100,50,100\nValve-1,Valve,10,50,300\nValve-2,Valve,10,50,310\n'
+        csv_content = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows
+        ids = []
+        for extra in ({}, {'mode': 'stream', 'force': 'true'}):
+            with mock.patch('equipment.ingest.CHUNK_ROWS', 5):
+                ids.append(self.upload(csv_content, **extra).data['dataset']['id'])
+
+        for ds_id in ids:
+            res = self.client.get(f'/api/datasets/{ds_id}/anomalies/')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual([r['name'] for r in res.data['results']], ['Pump-X'])
+            self.assertEqual(res.data['results'][0]['reasons'], ['pressure_zscore', 'pressure_iqr'])
+
+        res = self.client.get('/api/equipment/', {'anomalous': 'true', 'dataset': ids[0]})
+        self.assertEqual(res.data['count'], 1)
+        outlier = res.data['results'][0]
+        self.assertTrue(outlier['is_anomalous'])
+
+        self.client.patch(f"/api/equipment/{outlier['id']}/", {'pressure': 5})
+        self.assertEqual(self.client.get('/api/equipment/', {'anomalous': 'true'}).data['count'], 1)
+        self.assertEqual(self.client.get('/api/datasets/999/anomalies/').status_code, 404)
+
+    def test_database_flags_match_frame_flags(self):
+        rng = np.random.default_rng(7)
+        frame = pd.DataFrame({
+            'name': [f'E-{i}' for i in range(300)],
+            'type': rng.choice(['Pump', 'Valve', 'Tank'], 300),
+            'material': '',
+            'flowrate': rng.normal(100, 10, 300),
+            'pressure': np.append(rng.normal(5, 1, 297), [40, -30, 25]),
+            'temperature': np.append(rng.normal(100, 5, 299), [400]),
+        })
+        ds = Dataset.objects.create(name='flags')
+        Equipment.objects.bulk_create(Equipment(dataset=ds, **row) for row in frame.to_dict('records'))
+        self.assertGreater(flag_dataset(ds), 0)
+        stored = dict(ds.equipment.values_list('name', 'anomaly_flags'))
+        expected = flag_columns(frame).set_index('name')['anomaly_flags']
+        self.assertEqual(stored, {name: int(v) for name, v in expected.items()})
+
+        # An edit reflags its own type only, reading no rows of other types.
+        valve = ds.equipment.filter(type='Valve').first()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(f'/api/equipment/{valve.id}/', {'pressure': 500})
+        flagging = [q['sql'] for q in ctx.captured_queries if 'anomaly_flags' in q['sql'] or 'STDDEV' in q['sql'].upper()]
+        self.assertTrue(flagging)
+        self.assertFalse([sql for sql in flagging if "'Pump'" in sql or "'Tank'" in sql])
+        self.assertTrue(Equipment.objects.get(pk=valve.pk).is_anomalous)
+
+
+
+class LoaderTests(TestCase):
+    """The bulk loaders write the same rows, whichever one the backend uses."""
+
+    FRAME = pd.DataFrame({
+        'name': ['Pump, "big"', 'Line\nbreak', 'Tank-3'],
+        'type': ['Pump', '', 'Tank'],
+        'material': ['', 'Steel', 'Cast Iron'],
+        'flowrate': [0.1, 1e-12, 123456.789],
+        'pressure': [5.2, -0.0, 1 / 3],
+        'temperature': [110.0, 95.5, 2.5e5],
+    })
+
+    def stored(self, dataset):
+        fields = ('name', 'type', 'material', 'flowrate', 'pressure', 'temperature',
+                  'anomaly_flags', 'is_anomalous')
+        return list(dataset.equipment.order_by('id').values_list(*fields))
+
+    def expected(self):
+        return [(*row, 0, False) for row in self.FRAME.itertuples(index=False)]
+
+    def test_loaders_round_trip_rows(self):
+        for loader in {loaders.orm_load, get_loader()}:
+            with self.subTest(loader=loader.__name__):
+                dataset = Dataset.objects.create(name=loader.__name__)
+                self.assertEqual(loader(dataset, self.FRAME), 3)
+                self.assertEqual(self.stored(dataset), self.expected())
+
+        dataset = Dataset.objects.create(name='flags')
+        get_loader()(dataset, self.FRAME.assign(anomaly_flags=[0, 3, 0], is_anomalous=[False, True, False]))
+        self.assertEqual([row[-2:] for row in self.stored(dataset)], [(0, False), (3, True), (0, False)])
+
+    def test_copy_load_sends_csv_in_batches(self):
+        dataset = Dataset.objects.create(name='copy')
+        copied = []
+        raw = mock.Mock(spec=['copy_expert'])
+        raw.copy_expert.side_effect = lambda sql, buf: copied.append((sql, buf.read()))
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.cursor = raw
+        with mock.patch.object(connection, 'cursor', return_value=cursor), \
+                mock.patch.object(loaders, 'COPY_BATCH_SIZE', 2):
+            self.assertEqual(loaders.copy_load(dataset, self.FRAME), 3)
+
+        self.assertEqual(len(copied), 2)
+        sql = copied[0][0]
+        self.assertIn('FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (', sql)
+        columns = re.search(r'\((.*?)\) FROM STDIN', sql).group(1).replace('"', '').split(', ')
+        self.assertEqual(columns, ['dataset_id', *loaders.LOAD_FIELDS])
+        rows = list(csv.reader(io.StringIO(''.join(data for _, data in copied))))
+        self.assertEqual(rows[0][:4], [str(dataset.pk), 'Pump, "big"', 'Pump', ''])
+        self.assertEqual(rows[1][1], 'Line\nbreak')
+        for row, expected in zip(rows, self.expected()):
+            self.assertEqual([float(v) for v in row[4:7]], list(expected[3:6]))
+            self.assertEqual(row[7:], ['0', 'False'])
+
+    def test_benchmark_leaves_no_rows(self):
+        out = io.StringIO()
+        call_command('benchmark_loaders', rows=50, repeat=1, stdout=out)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(Equipment.objects.exists())
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN every supported EquipmentViewSet query shape on a seeded table.
+
+    A shape is one filter and/or one ordering field, scoped to a dataset or
+    across all of them, plus the search shapes in ``EXTRA``. The harness
+    fails if the page query or, for a filter, the page count reads the
+    whole Equipment table instead of walking an index. Orderings with an
+    index in their scope (any field across datasets, id and the numeric
+    fields within one) must also not sort the matching rows.
+    """
+    ROWS = 20000
+    FILTERS = {
+        'dataset': None,  # filled with the seeded dataset id
+        'type': 'Type-3',
+        'material': 'Material-2',
+        'pressure__gte': '9.5',
+        'temperature__gte': '395',
+        'anomalous': 'true',
+    }
+    EXTRA = [
+        {'search': 'eq-3'},
+        {'search': 'type-3 material', 'ordering': 'pressure'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets = [Dataset.objects.create(name=f'plan-{i}') for i in range(20)]
+        n = cls.ROWS // len(datasets)
+        for i, ds in enumerate(datasets):
+            frame = pd.DataFrame({
+                'name': [f'EQ-{i}-{j}' for j in range(n)],
+                'type': [f'Type-{j % 10}' for j in range(n)],
+                'material': [f'Material-{j % 7}' for j in range(n)],
+                'flowrate': np.linspace(0, 100, n),
+                'pressure': np.linspace(0, 10, n),
+                'temperature': np.linspace(0, 400, n),
+            })
+            get_loader()(ds, flag_columns(frame))
+        cls.dataset = datasets[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # The seeded table is small enough that the planner may prefer a
+            # scan or sort; plan as for a large one, using any index that applies.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+
+    def shapes(self):
+        """``(params, sorted by an index)`` for every shape, scoped and unscoped."""
+        filters = dict(self.FILTERS, dataset=str(self.dataset.id))
+        for base in ({'dataset': filters['dataset']}, {}):
+            for key, value in filters.items():
+                if key != 'dataset':
+                    yield dict(base, **{key: value}), False
+            for field in EquipmentViewSet.ordering_fields:
+                indexed = not base or field in EQUIPMENT_INDEXED_FIELDS
+                for ordering in (field, '-' + field):
+                    yield dict(base, ordering=ordering), indexed
+                    lookup = f'{field}__gte'
+                    if lookup in filters:
+                        yield dict(base, **{lookup: filters[lookup], 'ordering': ordering}), False
+                    elif field in filters:
+                        yield dict(base, **{field: filters[field], 'ordering': ordering}), False
+            yield base, True
+            for params in self.EXTRA:
+                yield dict(base, **params), False
+
+    def plan(self, params):
+        view = EquipmentViewSet(action_map={'get': 'list'}, format_kwarg=None)
+        view.request = view.initialize_request(RequestFactory().get('/api/equipment/', params))
+        return view.filter_queryset(view.get_queryset())[:10].explain()
+
+    def count_plan(self, params):
+        view = EquipmentViewSet(action_map={'get': 'list'}, format_kwarg=None)
+        view.request = view.initialize_request(RequestFactory().get('/api/equipment/', params))
+        return view.filter_queryset(view.get_queryset()).order_by().values('pk').explain()
+
+    def full_scans(self, plan, pk_order=False):
+        """Plan lines reading the whole table.
+
+        With ``pk_order`` (a query ordered by id), SQLite's plain SCAN walks
+        the rowid B-tree in key order and stops at the LIMIT, as PostgreSQL's
+        primary-key Index Scan does; whether its filter is indexed is checked
+        by the count plan.
+        """
+        table = Equipment._meta.db_table
+        if connection.vendor == 'postgresql':
+            return [line for line in plan.splitlines() if f'Seq Scan on {table}' in line]
+        return [line for line in plan.splitlines()
+                if re.search(rf'\bSCAN {table}\b', line) and 'INDEX' not in line
+                and not (pk_order and line.rstrip().endswith(f'SCAN {table}'))]
+
+    def full_sorts(self, plan):
+        """Plan lines sorting all matched rows rather than reading them in index order."""
+        if connection.vendor == 'postgresql':
+            return [line for line in plan.splitlines()
+                    if re.search(r'\bSort\b', line) and 'Incremental' not in line and 'Sort Key' not in line]
+        # A RIGHT PART sort only orders rows tied on the leading key.
+        return [line for line in plan.splitlines() if 'USE TEMP B-TREE FOR ORDER BY' in line]
+
+    def test_keyset_pages_seek_without_count(self):
+        client = APIClient()
+        table = Equipment._meta.db_table
+        prefix = 'EXPLAIN ' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN '
+        scoped = f'&dataset={self.dataset.id}'
+        for scope, ordering in [(scoped, '-pressure'), (scoped, 'temperature'),
+                                ('', '-pressure'), ('', 'type'), ('', 'name')]:
+            with self.subTest(scope=scope, ordering=ordering):
+                res = client.get(f'/api/equipment/?pagination=cursor&ordering={ordering}&page_size=500{scope}')
+                with CaptureQueriesContext(connection) as queries:
+                    res = client.get(res.data['next'])
+                self.assertEqual(len(res.data['results']), 500)
+                self.assertNotIn('count', res.data)
+                # One page query; a scoped page also looks up the dataset filter's choice.
+                selects = [q['sql'] for q in queries if f'FROM "{table}"' in q['sql']]
+                self.assertEqual(len(selects), 1)
+                with connection.cursor() as cursor:
+                    cursor.execute(prefix + selects[0])
+                    plan = '\n'.join(' '.join(str(c) for c in row) for row in cursor.fetchall())
+                self.assertEqual(self.full_scans(plan), [], plan)
+                self.assertEqual(self.full_sorts(plan), [], plan)
+
+    def test_list_fast_path_matches_serializer(self):
+        self.assertEqual(EQUIPMENT_LIST_FIELDS, tuple(EquipmentSerializer().fields))
+        Equipment.objects.filter(pk=Equipment.objects.first().pk).update(anomaly_flags=3, is_anomalous=True)
+        client = APIClient()
+        for params in ({'dataset': self.dataset.id}, {'pagination': 'cursor', 'ordering': '-pressure'}):
+            res = client.get('/api/equipment/', params)
+            ids = [r['id'] for r in res.data['results']]
+            rows = sorted(Equipment.objects.filter(id__in=ids), key=lambda e: ids.index(e.id))
+            expected = JSONRenderer().render(EquipmentSerializer(rows, many=True).data)
+            self.assertEqual(JSONRenderer().render(res.data['results']), expected)
+            self.assertEqual(json.loads(res.content)['results'], json.loads(expected))
+
+    def test_harness_detects_full_scan(self):
+        # A substring match on name cannot use an index.
+        self.assertTrue(self.full_scans(Equipment.objects.filter(name__icontains='EQ-1')[:10].explain()))
+        # An unindexed ordering sorts the whole table.
+        plan = Equipment.objects.order_by('anomaly_flags')[:10].explain()
+        self.assertTrue(self.full_scans(plan))
+        self.assertTrue(self.full_sorts(plan))
+
+    def test_no_full_scans(self):
+        for params, indexed_order in self.shapes():
+            with self.subTest(**params):
+                plan = self.plan(params)
+                self.assertEqual(self.full_scans(plan, pk_order='ordering' not in params), [], plan)
+                if indexed_order:
+                    self.assertEqual(self.full_sorts(plan), [], plan)
+                if set(params) - {'ordering'}:
+                    plan = self.count_plan(params)
+                    self.assertEqual(self.full_scans(plan), [], plan)
+
+
+    def test_keyset_pagination_walks_every_row_once(self):
+        client = APIClient()
+        rows = Equipment.objects.filter(dataset=self.dataset)
+        for ordering in ('type', '-flowrate', None):
+            params = {'pagination': 'cursor', 'page_size': 97, 'dataset': self.dataset.id}
+            if ordering:
+                params['ordering'] = ordering
+            res = client.get('/api/equipment/', params)
+            seen = []
+            while True:
+                self.assertNotIn('count', res.data)
+                seen.extend(r['id'] for r in res.data['results'])
+                if not res.data['next']:
+                    break
+                res = client.get(res.data['next'])
+            tie = '-id' if ordering and ordering.startswith('-') else 'id'
+            expected = rows.order_by(ordering or 'id', tie).values_list('id', flat=True)
+            self.assertEqual(seen, list(expected), ordering)
+        self.assertEqual(client.get('/api/equipment/', {'cursor': 'garbage'}).status_code, 404)
+        self.assertIn('count', client.get('/api/equipment/').data)
+
+    def test_tampered_cursor_values_are_rejected(self):
+        client = APIClient()
+
+        def get(ordering, cursor):
+            token = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            return client.get('/api/equipment/', {'ordering': ordering, 'cursor': token})
+
+        self.assertEqual(get('pressure', {'o': ['pressure', False], 'v': 5.0, 'id': 1}).status_code, 200)
+        self.assertEqual(get('pressure', {'o': ['pressure', False], 'v': '5.0', 'id': '1'}).status_code, 200)
+        for ordering, cursor in [
+            ('pressure', {'o': ['pressure', False], 'v': 'high', 'id': 1}),
+            ('pressure', {'o': ['pressure', False], 'v': {'x': 1}, 'id': 1}),
+            ('pressure', {'o': ['pressure', False], 'v': None, 'id': 1}),
+            ('pressure', {'o': ['pressure', False], 'v': 5.0, 'id': 'one'}),
+            ('pressure', {'o': ['pressure', False], 'v': 5.0, 'id': [1]}),
+            ('pressure', {'o': ['pressure'], 'v': 5.0, 'id': 1}),
+            ('pressure', {'o': 'pressure', 'v': 5.0, 'id': 1}),
+            ('pressure', {'o': ['temperature', False], 'v': 5.0, 'id': 1}),
+            ('anomaly_flags', {'o': ['anomaly_flags', False], 'v': 0, 'id': 1}),
+            ('pressure', ['pressure', 5.0, 1]),
+        ]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(get(ordering, cursor).status_code, 404)
+
+    def test_field_projection_and_columnar_layout(self):
+        client = APIClient()
+        params = {'dataset': self.dataset.id, 'fields': 'name,pressure', 'page_size': 50}
+        with CaptureQueriesContext(connection) as queries:
+            rows = client.get('/api/equipment/', params).data['results']
+        self.assertEqual(list(rows[0]), ['name', 'pressure'])
+        select = queries[-1]['sql'].split(' FROM ')[0]
+        self.assertNotIn('temperature', select)
+        self.assertNotIn('material', select)
+
+        columns = client.get('/api/equipment/', dict(params, layout='columnar')).data['results']
+        self.assertEqual(columns, {'name': [r['name'] for r in rows],
+                                   'pressure': [r['pressure'] for r in rows]})
+
+        # Keyset pages still work when the ordering field is not projected.
+        params = dict(params, pagination='cursor', ordering='-temperature', layout='columnar')
+        res = client.get('/api/equipment/', params)
+        self.assertEqual(list(res.data['results']), ['name', 'pressure'])
+        following = client.get(res.data['next']).data['results']
+        expected = Equipment.objects.filter(dataset=self.dataset).order_by('-temperature', '-id')
+        self.assertEqual(following['name'], list(expected.values_list('name', flat=True)[50:100]))
+
+        self.assertEqual(client.get('/api/equipment/', {'fields': 'name,secret'}).status_code, 400)
+        self.assertEqual(client.get('/api/equipment/', {'layout': 'xml'}).status_code, 400)
+
+
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        ds = Dataset.objects.create(name='search')
+        for name, type_, material in [('Pump-1', 'Centrifugal Pump', 'Steel'),
+                                      ('Pump-12', 'Piston Pump', 'Cast Iron'),
+                                      ('Valve-3', 'Gate Valve', 'Stainless Steel')]:
+            Equipment.objects.create(dataset=ds, name=name, type=type_, material=material,
+                                     flowrate=1, pressure=1, temperature=1)
+        self.client = APIClient()
+
+    def names(self, search, url='/api/equipment/'):
+        res = self.client.get(url, {'search': search})
+        if url.endswith('csv/'):
+            content = b''.join(res.streaming_content).decode()
+            return sorted(line.split(',')[0] for line in content.splitlines()[1:])
+        return sorted(r['name'] for r in res.data['results'])
+
+    def test_prefix_and_multi_term_search(self):
+        self.assertEqual(self.names('pump'), ['Pump-1', 'Pump-12'])
+        self.assertEqual(self.names('Pump-1'), ['Pump-1', 'Pump-12'])
+        self.assertEqual(self.names('pis'), ['Pump-12'])
+        self.assertEqual(self.names('steel valve'), ['Valve-3'])
+        self.assertEqual(self.names('stain'), ['Valve-3'])
+        self.assertEqual(self.names('cast pump', '/api/equipment/export/csv/'), ['Pump-12'])
+        self.assertEqual(len(self.names('')), 3)
+
+    def test_index_follows_edits_and_deletes(self):
+        pump = Equipment.objects.get(name='Pump-1')
+        pump.name = 'Compressor-1'
+        pump.save()
+        self.assertEqual(self.names('compressor'), ['Compressor-1'])
+        self.assertEqual(self.names('pump-1'), ['Compressor-1', 'Pump-12'])  # type still says Pump
+        Dataset.objects.all().delete()
+        self.assertEqual(self.names('pump'), [])
+
+    def test_bulk_loads_are_indexed(self):
+        ds = Dataset.objects.get(name='search')
+        frame = pd.DataFrame({'name': ['Mixer-7', 'Mixer-8'], 'type': ['Static Mixer'] * 2,
+                              'material': ['PVC'] * 2, 'flowrate': [1.0] * 2,
+                              'pressure': [1.0] * 2, 'temperature': [1.0] * 2})
+        get_loader()(ds, frame)
+        self.assertEqual(self.names('mixer pvc'), ['Mixer-7', 'Mixer-8'])
+        # Rows inserted one at a time after the load are still indexed.
+        Equipment.objects.create(dataset=ds, name='Mixer-9', type='Static Mixer', material='PVC',
+                                 flowrate=1, pressure=1, temperature=1)
+        self.assertEqual(self.names('mixer'), ['Mixer-7', 'Mixer-8', 'Mixer-9'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 triggers')
+    def test_triggers_survive_migrations(self):
+        def triggers():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+                return {row[0] for row in cursor.fetchall()}
+        # The test database is fully migrated, including table rebuilds.
+        self.assertLessEqual(set(search.SQLITE_TRIGGER_SQL), triggers())
+
+        # A rebuild drops them; the post_migrate handler restores and refills.
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER equipment_fts_ai')
+            cursor.execute('DROP TRIGGER equipment_fts_au')
+        Equipment.objects.create(dataset=Dataset.objects.get(name='search'), name='Mixer-1',
+                                 type='Static Mixer', material='PVC', flowrate=1, pressure=1, temperature=1)
+        emit_post_migrate_signal(0, False, 'default')
+        self.assertLessEqual(set(search.SQLITE_TRIGGER_SQL), triggers())
+        self.assertEqual(self.names('mixer'), ['Mixer-1'])
+
+
+class BinaryFormatTests(TestCase):
+    def setUp(self):
+        self.dataset = Dataset.objects.create(name='binary')
+        for i in range(3):
+            Equipment.objects.create(dataset=self.dataset, name=f'Pump-{i}', type='Pump', material='Steel',
+                                     flowrate=10.5 * i, pressure=i, temperature=100 + i)
+        self.client = APIClient()
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_arrow_stream(self):
+        import pyarrow as pa
+        accept = 'application/vnd.apache.arrow.stream'
+        res = self.client.get('/api/equipment/', {'fields': 'name,flowrate', 'ordering': 'id'}, HTTP_ACCEPT=accept)
+        self.assertEqual(res['Content-Type'], accept)
+        self.assertIn('Accept', res['Vary'])
+        table = pa.ipc.open_stream(res.content).read_all()
+        self.assertEqual(table.schema.field('flowrate').type, pa.float64())
+        self.assertEqual(table.to_pydict(), {'name': ['Pump-0', 'Pump-1', 'Pump-2'], 'flowrate': [0.0, 10.5, 21.0]})
+        self.assertEqual(json.loads(table.schema.metadata[b'meta'])['count'], 3)
+
+        res = self.client.get(f'/api/datasets/{self.dataset.id}/stats/', HTTP_ACCEPT=accept)
+        stats = pa.ipc.open_stream(res.content).read_all().to_pylist()[0]
+        self.assertEqual(stats, self.client.get(f'/api/datasets/{self.dataset.id}/stats/').json())
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_arrow_empty_page_keeps_columns(self):
+        import pyarrow as pa
+        res = self.client.get('/api/equipment/', {'fields': 'name,flowrate', 'type': 'Missing'},
+                              HTTP_ACCEPT='application/vnd.apache.arrow.stream')
+        table = pa.ipc.open_stream(res.content).read_all()
+        self.assertEqual(table.column_names, ['name', 'flowrate'])
+        self.assertEqual(table.num_rows, 0)
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_etag_per_format(self):
+        url = f'/api/datasets/{self.dataset.id}/stats/'
+        accept = 'application/vnd.apache.arrow.stream'
+        json_res = self.client.get(url)
+        arrow_res = self.client.get(url, HTTP_ACCEPT=accept)
+        self.assertNotEqual(json_res['ETag'], arrow_res['ETag'])
+        self.assertEqual(self.client.get(url, {'format': 'arrow'})['ETag'], arrow_res['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT=accept, HTTP_IF_NONE_MATCH=json_res['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT=accept, HTTP_IF_NONE_MATCH=arrow_res['ETag']).status_code, 304)
+
+    @skipUnless(MSGPACK_AVAILABLE, 'msgpack not installed')
+    def test_msgpack(self):
+        import msgpack
+        for url in ('/api/equipment/?layout=columnar', f'/api/datasets/{self.dataset.id}/stats/'):
+            res = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(res['Content-Type'], 'application/msgpack')
+            self.assertEqual(msgpack.unpackb(res.content), self.client.get(url).json())
+        # JSON stays the default.
+        self.assertEqual(self.client.get('/api/equipment/')['Content-Type'], 'application/json')
+
+
+class ExportTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.datasets = [Dataset.objects.create(name=f'export-{i}') for i in range(2)]
+        for ds in self.datasets:
+            for i in range(5):
+                Equipment.objects.create(dataset=ds, name=f'{ds.name}-{i}', type='Pump' if i % 2 else 'Valve',
+                                         material='Steel', flowrate=i, pressure=i, temperature=i)
+        self.client = APIClient()
+
+    def csv_rows(self, res):
+        content = b''.join(res.streaming_content)
+        if res.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return list(csv.reader(io.StringIO(content.decode())))
+
+    def test_streams_with_list_filters(self):
+        ds = self.datasets[1]
+        res = self.client.get('/api/equipment/export/csv/', {'dataset': ds.id, 'type': 'Pump', 'ordering': '-pressure'})
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = self.csv_rows(res)
+        self.assertEqual(rows[0], ['Name', 'Type', 'Material', 'Flowrate', 'Pressure', 'Temperature'])
+        self.assertEqual([r[0] for r in rows[1:]], ['export-1-3', 'export-1-1'])
+        self.assertEqual(len(self.csv_rows(self.client.get('/api/equipment/export/csv/'))), 11)
+
+    def test_gzip_and_chunking(self):
+        with mock.patch('equipment.exports.CHUNK_ROWS', 3):
+            res = self.client.get('/api/equipment/export/csv/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            chunks = list(res.streaming_content)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b''.join(chunks)).decode())))
+        self.assertEqual(len(rows), 11)
+        # Every chunk is flushed: the header, then the first rows, decompress
+        # from the chunks sent so far.
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(chunks[0]).decode(), 'Name,Type,Material,Flowrate,Pressure,Temperature\r\n')
+        first = next(csv.reader(io.StringIO(decompressor.decompress(chunks[1]).decode())))
+        self.assertEqual(first, rows[1])
+
+    def test_gzip_refused_with_zero_quality(self):
+        for header in ('gzip;q=0', 'deflate, gzip; q=0.0', 'gzipped'):
+            res = self.client.get('/api/equipment/export/csv/', HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(res.has_header('Content-Encoding'), header)
+            self.assertEqual(len(self.csv_rows(res)), 11)
+        res = self.client.get('/api/equipment/export/csv/', HTTP_ACCEPT_ENCODING='br;q=1, gzip;q=0.5')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_parquet_export_is_cached_by_version(self):
+        import pyarrow.parquet as pq
+        ds = self.datasets[0]
+        url = f'/api/datasets/{ds.id}/export/parquet/'
+        with mock.patch('equipment.exports.ROW_GROUP_ROWS', 2):
+            res = self.client.get(url)
+        self.assertEqual(res['Content-Type'], 'application/vnd.apache.parquet')
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(parquet.num_row_groups, 3)
+        self.assertEqual(parquet.metadata.row_group(0).column(0).compression, 'ZSTD')
+        frame = parquet.read().to_pandas()
+        self.assertEqual(frame['name'].tolist(), [f'export-0-{i}' for i in range(5)])
+        self.assertEqual(str(frame['flowrate'].dtype), 'float64')
+
+        # Served from disk until the dataset changes; then rewritten, old file removed.
+        with mock.patch('equipment.exports.write_parquet') as write:
+            self.client.get(url)
+        write.assert_not_called()
+        self.client.post('/api/equipment/', {'dataset': ds.id, 'name': 'export-0-new', 'type': 'Pump',
+                                             'material': 'Steel', 'flowrate': 1, 'pressure': 1, 'temperature': 1})
+        frame = pd.read_parquet(io.BytesIO(b''.join(self.client.get(url).streaming_content)))
+        self.assertEqual(len(frame), 6)
+        self.assertEqual(len(list((Path(self.media.name) / 'exports').glob('*.parquet'))), 1)
+        self.assertEqual(self.client.get('/api/datasets/999/export/parquet/').status_code, 404)
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_filtered_parquet_export(self):
+        res = self.client.get('/api/equipment/export/parquet/', {'type': 'Pump', 'ordering': 'name'})
+        frame = pd.read_parquet(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(frame['name'].tolist(), ['export-0-1', 'export-0-3', 'export-1-1', 'export-1-3'])
+        self.assertEqual(set(frame['dataset']), {d.id for d in self.datasets})
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_parquet_cache_key_ignores_unused_params(self):
+        url = '/api/equipment/export/parquet/'
+        exports_dir = Path(self.media.name) / 'exports'
+        self.client.get(url, {'type': 'Pump', 'pressure__gte': '1.50', 'search': 'steel export'})
+        for params in ({'type': 'Pump', 'pressure__gte': '1.5', 'search': 'Export  STEEL', 'junk': 'x'},
+                       {'type': 'Pump', 'pressure__gte': '1.5', 'search': 'export steel', 'ordering': 'id', 'page': '3'}):
+            self.client.get(url, params)
+        self.assertEqual(len(list(exports_dir.glob('*.parquet'))), 1)
+        self.client.get(url, {'type': 'Valve'})
+        self.assertEqual(len(list(exports_dir.glob('*.parquet'))), 2)
+
+    @skipUnless(PYARROW_AVAILABLE, 'pyarrow not installed')
+    def test_parquet_cache_evicts_least_recently_used(self):
+        exports_dir = Path(self.media.name) / 'exports'
+        urls = [f'/api/datasets/{ds.id}/export/parquet/' for ds in self.datasets]
+        self.client.get(urls[0])
+        size = next(exports_dir.glob('*.parquet')).stat().st_size
+        with self.settings(EXPORT_CACHE_MAX_BYTES=int(size * 2.5)):
+            self.client.get(urls[1])
+            for age, ds in enumerate(self.datasets, start=1):
+                os.utime(next(exports_dir.glob(f'dataset-{ds.id}-*.parquet')), (age, age))
+            self.client.get(urls[0])  # a hit marks it recently used
+            self.client.get('/api/equipment/export/parquet/', {'type': 'Pump'})
+        names = sorted(p.stem.rsplit('-', 1)[0] for p in exports_dir.glob('*.parquet'))
+        self.assertEqual(len(names), 2)
+        self.assertEqual(names[0], f'dataset-{self.datasets[0].id}')
+        self.assertTrue(names[1].startswith('query-'))
+
+
+class ReportTests(MediaRootMixin, UploadClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        call_command('load_sample')
+        self.dataset = Dataset.objects.first()
+        self.status_url = f'/api/datasets/{self.dataset.id}/report/'
+        self.pdf_url = f'/api/datasets/{self.dataset.id}/report/pdf/'
+
+    def pdf(self, res):
+        self.assertEqual(res.status_code, 200)
+        body = b''.join(res.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        return body
+
+    @skipUnless(reports.REPORTLAB_AVAILABLE, 'reportlab not installed')
+    def test_background_generation_and_status(self):
+        self.assertEqual(self.client.get(self.status_url).status_code, 404)
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(self.status_url)
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['report']['state'], 'queued')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.client.get(self.pdf_url, {'mode': 'async'}).status_code, 202)
+
+        self.assertEqual(reports.drain(), 1)
+        report = self.client.get(self.status_url).data['report']
+        self.assertEqual(report['state'], 'ready')
+        self.assertTrue(report['download'].endswith(self.pdf_url))
+        with mock.patch('equipment.reports.build_pdf') as build:
+            self.pdf(self.client.get(report['download']))
+        build.assert_not_called()
+
+    @skipUnless(reports.REPORTLAB_AVAILABLE, 'reportlab not installed')
+    def test_new_version_replaces_stored_report(self):
+        self.pdf(self.client.get(self.pdf_url))
+        first = ReportArtifact.objects.get()
+        self.assertTrue(os.path.exists(first.path))
+
+        self.client.post('/api/equipment/', {'dataset': self.dataset.id, 'name': 'Added', 'type': 'Pump',
+                                             'material': 'Steel', 'flowrate': 1, 'pressure': 1, 'temperature': 1})
+        self.pdf(self.client.get(self.pdf_url))
+        second = ReportArtifact.objects.get()
+        self.assertNotEqual(second.version, first.version)
+        self.assertFalse(os.path.exists(first.path))
+
+        out = os.path.join(self.media.name, 'out.pdf')
+        stdout = io.StringIO()
+        call_command('generate_report', '--dataset', str(self.dataset.id), '--out', out, stdout=stdout)
+        self.assertIn('cached report', stdout.getvalue())
+        with open(out, 'rb') as fh, open(second.path, 'rb') as stored:
+            self.assertEqual(fh.read(), stored.read())
+
+        self.dataset.delete()
+        self.assertFalse(os.path.exists(second.path))
+
+    @skipUnless(reports.REPORTLAB_AVAILABLE, 'reportlab not installed')
+    def test_failed_render_is_reported_and_requeued(self):
+        with mock.patch('equipment.reports.build_pdf', side_effect=RuntimeError('boom')):
+            self.client.post(self.status_url)
+            reports.drain()
+        report = self.client.get(self.status_url).data['report']
+        self.assertEqual(report['state'], 'failed')
+        self.assertIn('boom', report['error'])
+        self.assertIsNone(report['download'])
+        self.assertEqual(self.client.post(self.status_url).data['report']['state'], 'queued')
+
+    @skipUnless(reports.REPORTLAB_AVAILABLE, 'reportlab not installed')
+    def test_missing_report_file_is_rendered_again(self):
+        self.pdf(self.client.get(self.pdf_url))
+        os.remove(ReportArtifact.objects.get().path)
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.get(self.pdf_url, {'mode': 'async'})
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['report']['state'], 'queued')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(reports.drain(), 1)
+        self.pdf(self.client.get(self.pdf_url))
+
+        os.remove(ReportArtifact.objects.get().path)
+        self.pdf(self.client.get(self.pdf_url))
+        self.assertTrue(os.path.exists(ReportArtifact.objects.get().path))
+
+    def running_artifact(self, started_at, version=None):
+        return ReportArtifact.objects.create(
+            dataset=self.dataset, version=version or reports.current_version(self.dataset),
+            state=ReportArtifact.RUNNING, started_at=started_at,
+        )
+
+    @skipUnless(reports.REPORTLAB_AVAILABLE, 'reportlab not installed')
+    def test_stuck_render_is_requeued(self):
+        artifact = self.running_artifact(timezone.now() - datetime.timedelta(hours=1))
+        outdated = self.running_artifact(timezone.now() - datetime.timedelta(hours=1), version='old')
+        self.assertEqual(reports.drain(), 1)
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.state, ReportArtifact.READY)
+        self.assertFalse(ReportArtifact.objects.filter(pk=outdated.pk).exists())
+
+        ReportArtifact.objects.all().delete()
+        self.running_artifact(timezone.now() - datetime.timedelta(hours=1))
+        self.pdf(self.client.get(self.pdf_url))
+        self.assertEqual(ReportArtifact.objects.get().state, ReportArtifact.READY)
+
+    def test_running_render_is_left_alone(self):
+        artifact = self.running_artifact(timezone.now())
+        self.assertEqual(reports.drain(), 0)
+        self.assertEqual(self.client.get(self.status_url).data['report']['state'], 'running')
+        artifact.refresh_from_db()
+        self.assertEqual(artifact.state, ReportArtifact.RUNNING)
+
+
+
 
 # Create your tests here.
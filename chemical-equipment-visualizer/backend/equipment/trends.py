@@ -0,0 +1,91 @@
+"""Time series of dataset aggregates across uploads.
+
+Each Dataset is one snapshot at ``uploaded_at``. Per-type series come from
+the precomputed TypeRollup rows; per-name series are one grouped query
+over Equipment. Either way a whole date range is a single query, sorted so
+the points of each series are contiguous.
+"""
+import datetime
+from itertools import groupby
+
+from django.db.models import Avg, Count, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Equipment, TypeRollup
+from .summary import PARAMETERS
+
+GROUPINGS = ('type', 'name')
+
+
+def parse_bound(value, end=False):
+    """Aware datetime for a ``start``/``end`` parameter (date or datetime); None if blank.
+
+    A bare date as ``end`` covers that whole day.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.max if end else datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+def _in_range(qs, start, end, prefix='dataset__'):
+    if start is not None:
+        qs = qs.filter(**{f'{prefix}uploaded_at__gte': start})
+    if end is not None:
+        qs = qs.filter(**{f'{prefix}uploaded_at__lte': end})
+    return qs
+
+
+def _series(rows, key):
+    series = []
+    for value, points in groupby(rows, key=lambda r: r[key]):
+        series.append({
+            'key': value,
+            'points': [
+                {
+                    'dataset': r['dataset_id'],
+                    'uploaded_at': r['dataset__uploaded_at'],
+                    'count': r['count'],
+                    **{f'avg_{p}': r[f'avg_{p}'] for p in PARAMETERS},
+                }
+                for r in points
+            ],
+        })
+    return series
+
+
+def type_trends(start=None, end=None, keys=None):
+    """Per-type series read from the TypeRollup table."""
+    qs = _in_range(TypeRollup.objects.all(), start, end)
+    if keys:
+        qs = qs.filter(type__in=keys)
+    rows = qs.values(
+        'type', 'dataset_id', 'dataset__uploaded_at', *(f'avg_{p}' for p in PARAMETERS),
+        count=F('equipment_count'),
+    ).order_by('type', 'dataset__uploaded_at', 'dataset_id')
+    return _series(rows, 'type')
+
+
+def name_trends(start=None, end=None, keys=None):
+    """Per-equipment-name series from one grouped query over Equipment."""
+    qs = _in_range(Equipment.objects.all(), start, end)
+    if keys:
+        qs = qs.filter(name__in=keys)
+    rows = qs.values('name', 'dataset_id', 'dataset__uploaded_at').annotate(
+        count=Count('id'), **{f'avg_{p}': Avg(p) for p in PARAMETERS}
+    ).order_by('name', 'dataset__uploaded_at', 'dataset_id')
+    return _series(rows, 'name')
+
+
+def trends(group, start=None, end=None, keys=None):
+    if group == 'name':
+        return name_trends(start, end, keys)
+    return type_trends(start, end, keys)
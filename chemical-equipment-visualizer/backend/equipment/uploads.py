@@ -0,0 +1,156 @@
+"""On-disk chunk storage for resumable upload sessions.
+
+Each session keeps its chunks as ``<index>.part`` files under
+``MEDIA_ROOT/uploads/<session id>/``. Which chunks have arrived is read
+back from the directory, so parallel chunk uploads never contend on a
+database row. Completing a session concatenates the parts into the
+ingestion spool directory.
+
+Sessions belong to the user who created them and expire
+``UPLOAD_SESSION_TTL`` seconds after creation; ``purge_expired`` (run when
+a session is created, and by ``manage.py purge_uploads``) removes expired
+sessions with their chunks and any spool file they left behind.
+"""
+import datetime
+import hashlib
+import os
+import shutil
+import uuid
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+
+from django.utils import timezone
+
+from .jobs import spool_dir
+from .models import IngestJob, UploadSession
+
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNK_SIZE = 32 * 1024 * 1024
+# Smallest chunk_size for a file split into more than one chunk, so a
+# session at UPLOAD_MAX_SIZE has a bounded number of chunks.
+MIN_CHUNK_SIZE = 256 * 1024
+
+# Most missing chunk indexes listed in one response; clients send those and
+# ask again.
+MAX_LISTED_CHUNKS = 1000
+
+COPY_BUFFER = 1024 * 1024
+
+
+class ChunkError(Exception):
+    """Raised for a chunk that does not fit the session's layout."""
+
+
+def session_dir(session):
+    return Path(settings.MEDIA_ROOT) / 'uploads' / str(session.id)
+
+
+def spool_path(session):
+    return spool_dir() / f'{session.id.hex}{Path(session.filename).suffix}'
+
+
+def _part_path(session, index):
+    return session_dir(session) / f'{index}.part'
+
+
+def write_chunk(session, index, stream):
+    """Store chunk ``index`` read from ``stream``; re-sending a chunk replaces it."""
+    if not 0 <= index < session.total_chunks:
+        raise ChunkError(f'Chunk index must be between 0 and {session.total_chunks - 1}.')
+    expected = session.expected_chunk_size(index)
+
+    directory = session_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f'{index}.{uuid.uuid4().hex}.tmp'
+    written = 0
+    try:
+        with open(tmp, 'wb') as fh:
+            while True:
+                block = stream.read(min(COPY_BUFFER, expected - written + 1))
+                if not block:
+                    break
+                written += len(block)
+                if written > expected:
+                    break
+                fh.write(block)
+        if written != expected:
+            raise ChunkError(f'Chunk {index} must be {expected} bytes.')
+        # Rename into place so a dropped transfer never leaves a partial chunk.
+        os.replace(tmp, _part_path(session, index))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def received_chunks(session):
+    """Sorted indexes of the chunks stored so far."""
+    directory = session_dir(session)
+    if not directory.exists():
+        return []
+    return sorted(int(p.stem) for p in directory.glob('*.part'))
+
+
+def missing_chunks(session, limit=None):
+    """The lowest ``limit`` (default ``MAX_LISTED_CHUNKS``) indexes of chunks not stored yet."""
+    limit = limit or MAX_LISTED_CHUNKS
+    received = set(received_chunks(session))
+    return list(islice((i for i in range(session.total_chunks) if i not in received), limit))
+
+
+def assemble(session):
+    """Concatenate all chunks into a spool file.
+
+    Returns ``(path, sha256 hex digest)``, hashing the bytes as they are copied.
+    A partial spool file is removed if copying fails.
+    """
+    path = spool_path(session)
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'wb') as out:
+            for index in range(session.total_chunks):
+                with open(_part_path(session, index), 'rb') as part:
+                    for block in iter(lambda: part.read(COPY_BUFFER), b''):
+                        digest.update(block)
+                        out.write(block)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return str(path), digest.hexdigest()
+
+
+def discard(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+
+
+def purge_expired():
+    """Remove expired sessions, their chunks and spool files, and orphaned chunk directories.
+
+    A spool file still waiting on a background ingestion job is kept.
+    Returns the number of sessions removed.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    in_use = set(IngestJob.objects.filter(
+        state__in=(IngestJob.QUEUED, IngestJob.RUNNING)
+    ).values_list('source', flat=True))
+
+    expired = list(UploadSession.objects.filter(created_at__lte=cutoff))
+    for session in expired:
+        discard(session)
+        spooled = spool_path(session)
+        if str(spooled) not in in_use:
+            spooled.unlink(missing_ok=True)
+    UploadSession.objects.filter(pk__in=[s.pk for s in expired]).delete()
+
+    # Chunk directories whose session row is gone.
+    root = Path(settings.MEDIA_ROOT) / 'uploads'
+    if root.exists():
+        known = {str(pk) for pk in UploadSession.objects.values_list('id', flat=True)}
+        for directory in root.iterdir():
+            if not directory.is_dir() or directory.name in known:
+                continue
+            # Skip directories of sessions created since ``known`` was read.
+            if directory.stat().st_mtime <= cutoff.timestamp():
+                shutil.rmtree(directory, ignore_errors=True)
+    return len(expired)
@@ -2,10 +2,20 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     EquipmentViewSet,
-    export_equipment_csv,
     upload_csv,
+    job_status,
+    upload_session_create,
+    upload_session_detail,
+    upload_session_chunk,
+    upload_session_complete,
     datasets_list,
     dataset_summary,
+    dataset_stats,
+    dataset_series,
+    dataset_anomalies,
+    dataset_export_parquet,
+    dataset_trends,
+    dataset_report,
     dataset_report_pdf,
 )
 
@@ -13,9 +23,19 @@ router = DefaultRouter()
 router.register(r'equipment', EquipmentViewSet, basename='equipment')
 
 urlpatterns = router.urls + [
-    path('equipment/export/csv/', export_equipment_csv),
     path('upload/', upload_csv),
+    path('jobs/<int:pk>/', job_status),
+    path('uploads/', upload_session_create),
+    path('uploads/<uuid:pk>/', upload_session_detail),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', upload_session_chunk),
+    path('uploads/<uuid:pk>/complete/', upload_session_complete),
     path('datasets/', datasets_list),
+    path('datasets/trends/', dataset_trends),
     path('datasets/<int:pk>/summary/', dataset_summary),
+    path('datasets/<int:pk>/stats/', dataset_stats),
+    path('datasets/<int:pk>/series/', dataset_series),
+    path('datasets/<int:pk>/anomalies/', dataset_anomalies),
+    path('datasets/<int:pk>/export/parquet/', dataset_export_parquet),
+    path('datasets/<int:pk>/report/', dataset_report),
     path('datasets/<int:pk>/report/pdf/', dataset_report_pdf),
 ]
@@ -1,38 +1,70 @@
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from django.http import HttpResponse
-import csv
-import pandas as pd
-from io import BytesIO
-
-from .models import Equipment, Dataset
-from .serializers import EquipmentSerializer, DatasetSerializer
-from django.db.models import Count, Avg
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+import os
+
+from .models import Equipment, Dataset, IngestJob, ReportArtifact, UploadSession
+from .anomalies import flag_dataset
+from .filters import EquipmentFilter
+from . import cache, exports, jobs, reports, series, stats, trends, uploads
+from .ingest import (
+    STREAM_THRESHOLD,
+    IngestError,
+    IngestResult,
+    file_digest,
+    find_duplicate,
+    read_frame,
+    source_format,
+    ingest_frame,
+    ingest_stream,
+)
+from .serializers import (
+    LAYOUTS,
+    equipment_columns,
+    equipment_rows,
+    list_fields,
+    AnomalySerializer,
+    EquipmentSerializer,
+    DatasetSerializer,
+    IngestJobSerializer,
+    ReportArtifactSerializer,
+    UploadSessionSerializer,
+)
+from .renderers import BINARY_RENDERERS
+from .search import FullTextSearchFilter, terms as search_terms
+from .pagination import DatasetHistoryPagination, KeysetPagination
+from .summary import rebuild_summary
 from django.utils import timezone
 
-try:
-    # Optional dependency for PDF generation
-    from reportlab.pdfgen import canvas
-    REPORTLAB_AVAILABLE = True
-except Exception:
-    REPORTLAB_AVAILABLE = False
 
+# Bulk-read endpoints also answer in Arrow / MessagePack (see ``renderers``).
+BULK_RENDERERS = api_settings.DEFAULT_RENDERER_CLASSES + BINARY_RENDERERS
 
+
+@method_decorator(vary_on_headers('Accept'), name='dispatch')
 class EquipmentViewSet(ModelViewSet):
     queryset = Equipment.objects.all()
     serializer_class = EquipmentSerializer
+    renderer_classes = BULK_RENDERERS
 
     filter_backends = [
         DjangoFilterBackend,
-        SearchFilter,
+        FullTextSearchFilter,
         OrderingFilter
     ]
-
-    search_fields = ['name']
     ordering_fields = [
         'name',
         'type',
@@ -41,213 +73,552 @@ class EquipmentViewSet(ModelViewSet):
         'temperature',
         'flowrate'
     ]
+    ordering = ['id']
 
-    filterset_fields = {
-        'material': ['exact'],
-        'pressure': ['gte'],
-        'temperature': ['gte'],
-        'type': ['exact'],
-        'dataset': ['exact'],
-    }
+    filterset_class = EquipmentFilter
 
+    def list(self, request, *args, **kwargs):
+        """Read-only fast path: page rows are plain ``values_list`` tuples turned
+        into dicts, skipping model instances and per-field serialization.
+        The JSON is identical to EquipmentSerializer's.
 
-@api_view(['GET'])
-def export_equipment_csv(request):
-    qs = Equipment.objects.all()
+        ``?fields=name,pressure`` selects only those columns in SQL, and
+        ``?layout=columnar`` returns ``results`` as one array per field.
+        """
+        try:
+            fields = list_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        layout = request.query_params.get('layout', 'rows')
+        if layout not in LAYOUTS:
+            return Response({'detail': f'layout must be one of {", ".join(LAYOUTS)}.'}, status=400)
+        build = equipment_columns if layout == 'columnar' else equipment_rows
+        self.columns = fields
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*fields, *self._keyset_fields(queryset, fields), named=True)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(build(page, fields))
+        return Response(build(rows, fields))
+
+    @action(detail=False, methods=['get'], url_path='export/csv')
+    def export_csv(self, request):
+        """Every row matching the list's filters, search and ordering, streamed
+        as CSV; gzip-encoded when the client accepts it.
+        """
+        chunks = exports.csv_chunks(self.filter_queryset(self.get_queryset()))
+        if exports.accepts_gzip(request):
+            response = StreamingHttpResponse(exports.gzip_chunks(chunks), content_type='text/csv')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="equipment.csv"'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    @action(detail=False, methods=['get'], url_path='export/parquet')
+    def export_parquet(self, request):
+        """Every row matching the list's filters as a zstd Parquet file, cached
+        on disk until any dataset changes.
+        """
+        if not exports.PYARROW_AVAILABLE:
+            return Response({'detail': 'Parquet export not available (pyarrow missing).'}, status=501)
+        queryset = self.filter_queryset(self.get_queryset())
+        name = self._export_name(request)
+        path = exports.cached_parquet(queryset, name, cache.list_generation()['etag'])
+        return exports.parquet_response(path, 'equipment.parquet')
+
+    def get_renderer_context(self):
+        # Arrow pages keep their columns even when empty (see ``renderers``).
+        return {**super().get_renderer_context(), 'columns': getattr(self, 'columns', None)}
+
+    def _export_name(self, request):
+        """Cache name for a filtered export from what the filter backends apply."""
+        queryset = self.get_queryset()
+        filterset = self.filterset_class(request.query_params, queryset=queryset, request=request)
+        filterset.is_valid()
+        ordering = OrderingFilter().get_ordering(request, queryset, self)
+        terms = search_terms(request.query_params.get(FullTextSearchFilter.search_param))
+        return exports.query_name(filterset.form.cleaned_data, terms, ordering)
+
+    def _keyset_fields(self, queryset, fields):
+        # Keyset pages read the ordering value and id of their last row.
+        if not isinstance(self.paginator, KeysetPagination):
+            return ()
+        field, _ = self.paginator.get_ordering(self.request, queryset, self)
+        return tuple(f for f in dict.fromkeys((field, 'id')) if f not in fields)
+
+    @property
+    def paginator(self):
+        """Page numbers by default; keyset pages with ``cursor`` or ``pagination=cursor``."""
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.requested(self.request):
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+
+    # Keep the affected datasets' summaries and anomaly flags in step with edits.
+    def perform_create(self, serializer):
+        equipment = serializer.save()
+        _refresh_dataset(equipment.dataset, {equipment.type})
+
+    def perform_update(self, serializer):
+        previous, previous_type = serializer.instance.dataset, serializer.instance.type
+        equipment = serializer.save()
+        if previous.pk != equipment.dataset.pk:
+            _refresh_dataset(equipment.dataset, {equipment.type})
+            _refresh_dataset(previous, {previous_type})
+        else:
+            _refresh_dataset(equipment.dataset, {previous_type, equipment.type})
+
+    def perform_destroy(self, instance):
+        dataset, type_ = instance.dataset, instance.type
+        instance.delete()
+        _refresh_dataset(dataset, {type_})
+
+
+def _refresh_dataset(dataset, types):
+    """Reflag the edited ``types`` and rebuild the summary, both with database aggregates."""
+    flag_dataset(dataset, types)
+    rebuild_summary(dataset)
 
-    if request.GET.get('search'):
-        qs = qs.filter(name__icontains=request.GET['search'])
 
-    if request.GET.get('material'):
-        qs = qs.filter(material=request.GET['material'])
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_csv(request):
+    """Accept a CSV, Parquet or Arrow/Feather file and ingest it into a new Dataset.
 
-    if request.GET.get('pressure__gte'):
-        qs = qs.filter(pressure__gte=request.GET['pressure__gte'])
+    Requires authentication. The format is taken from the file extension.
 
-    if request.GET.get('temperature__gte'):
-        qs = qs.filter(temperature__gte=request.GET['temperature__gte'])
+    Rows that fail validation are skipped and reported in ``rejections``.
+    Pass ``mode=stream`` (implied for large files) to parse and commit the
+    file in bounded chunks; the response then reports how many chunks landed.
+    ``mode=async`` queues the file for the background workers and returns
+    202 with a job to poll at ``/api/jobs/<id>/``.
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="equipment.csv"'
+    Content identical to an earlier upload returns that dataset with
+    ``duplicate: true`` instead of ingesting again, unless ``force=true``.
+
+    ``dataset=<id>`` appends the rows to that dataset instead of creating a
+    new one; its summary is updated incrementally. Appends are not checked
+    for duplicates.
+    """
+    f = request.FILES.get('file')
+    if not f:
+        return Response({'detail': 'No file uploaded.'}, status=400)
+
+    name = getattr(f, 'name', f'upload-{timezone.now().isoformat()}')
+    if request.data.get('mode') == 'async':
+        source, content_hash = jobs.spool_upload(f)
+    else:
+        source, content_hash = f, file_digest(f)
+    return _ingest_upload(request, source, name, f.size, content_hash)
 
-    writer = csv.writer(response)
-    writer.writerow([
-        'Name',
-        'Type',
-        'Material',
-        'Flowrate',
-        'Pressure',
-        'Temperature'
-    ])
 
-    for e in qs:
-        writer.writerow([
-            e.name,
-            e.type,
-            e.material,
-            e.flowrate,
-            e.pressure,
-            e.temperature
-        ])
+def _is_true(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
 
-    return response
+
+def _ingest_upload(request, source, name, size, content_hash):
+    """Ingest ``source`` per the requested mode and build the upload response.
+
+    ``source`` is an uploaded file or the path of a spooled file; spooled
+    files are removed once ingested (or handed to a background job).
+    """
+    spooled = isinstance(source, str)
+    try:
+        target = None
+        if request.data.get('dataset') not in (None, ''):
+            try:
+                target = Dataset.objects.get(pk=int(request.data['dataset']))
+            except (TypeError, ValueError):
+                return Response({'detail': 'dataset must be an integer id.'}, status=400)
+            except Dataset.DoesNotExist:
+                return Response({'detail': 'Dataset to append to not found.'}, status=404)
+
+        if target is None and not _is_true(request.data.get('force')):
+            existing = find_duplicate(content_hash)
+            if existing is not None:
+                serializer = DatasetSerializer(existing, context={'request': request})
+                return Response({'dataset': serializer.data, **IngestResult.duplicate_of(existing).as_dict()})
+
+        if request.data.get('mode') == 'async':
+            job = jobs.enqueue(source, name, content_hash, dataset=target, owner=request.user)
+            spooled = False
+            return Response({'job': IngestJobSerializer(job).data}, status=202)
+
+        if request.data.get('mode') == 'stream' or size > STREAM_THRESHOLD:
+            try:
+                result = ingest_stream(source, name, content_hash=content_hash, dataset=target)
+            except IngestError as e:
+                partial = e.result.as_dict()
+                if e.result.dataset is not None:
+                    partial['dataset'] = DatasetSerializer(e.result.dataset, context={'request': request}).data
+                return Response({'detail': str(e), **partial}, status=400)
+        else:
+            try:
+                df = read_frame(source, name)
+            except Exception as e:
+                label = {'csv': 'CSV', 'parquet': 'Parquet', 'arrow': 'Arrow'}[source_format(source, name)]
+                return Response({'detail': f'Failed to parse {label}: {e}'}, status=400)
+            result = ingest_frame(df, name, content_hash, dataset=target)
+    finally:
+        if spooled and os.path.exists(source):
+            os.remove(source)
+
+    serializer = DatasetSerializer(result.dataset, context={'request': request})
+    return Response({'dataset': serializer.data, **result.as_dict()})
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def upload_csv(request):
-    """Accept a CSV file, parse with pandas, create Dataset and Equipment rows. Requires authentication."""
-    f = request.FILES.get('file')
-    if not f:
-        return Response({'detail': 'No file uploaded.'}, status=400)
+def upload_session_create(request):
+    """Start a resumable upload: POST filename, total_size and optional chunk_size.
+
+    Expired sessions are purged first, so abandoned uploads do not pile up.
+    """
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    uploads.purge_expired()
+    session = serializer.save(owner=request.user)
+    return Response(UploadSessionSerializer(session).data, status=201)
+
 
+def _get_session(request, pk):
+    """The requesting user's session ``pk``, or None if missing or expired.
+
+    An expired session found here is removed along with its chunks.
+    """
     try:
-        df = pd.read_csv(f)
-    except Exception as e:
-        return Response({'detail': f'Failed to parse CSV: {e}'}, status=400)
+        session = UploadSession.objects.get(pk=pk, owner=request.user)
+    except UploadSession.DoesNotExist:
+        return None
+    if session.expired:
+        uploads.discard(session)
+        session.delete()
+        return None
+    return session
 
-    # Normalize expected column names (case-insensitive)
-    df.columns = [c.strip() for c in df.columns]
 
-    name = getattr(f, 'name', f'upload-{timezone.now().isoformat()}')
-    dataset = Dataset.objects.create(name=name)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, pk):
+    """Report how many chunks have arrived, and which are missing, so a client can resume."""
+    session = _get_session(request, pk)
+    if session is None:
+        return Response({'detail': 'Not found.'}, status=404)
+    return Response(UploadSessionSerializer(session).data)
 
-    created = 0
-    for _, row in df.iterrows():
-        try:
-            eq = Equipment.objects.create(
-                dataset=dataset,
-                name=row.get('Equipment Name') or row.get('name') or row.get('Name'),
-                type=row.get('Type') or row.get('type') or '',
-                flowrate=float(row.get('Flowrate') or 0),
-                pressure=float(row.get('Pressure') or 0),
-                temperature=float(row.get('Temperature') or 0),
-                material=row.get('Material') or ''
-            )
-            created += 1
-        except Exception:
-            # skip bad rows
-            continue
-
-    serializer = DatasetSerializer(dataset, context={'request': request})
-    return Response({'dataset': serializer.data, 'created': created})
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_session_chunk(request, pk, index):
+    """Store one chunk; the raw request body is the chunk's bytes."""
+    session = _get_session(request, pk)
+    if session is None:
+        return Response({'detail': 'Not found.'}, status=404)
+    if session.completed:
+        return Response({'detail': 'Upload already completed.'}, status=409)
+    if request.stream is None:
+        return Response({'detail': 'Empty chunk.'}, status=400)
+    try:
+        uploads.write_chunk(session, index, request.stream)
+    except uploads.ChunkError as e:
+        return Response({'detail': str(e)}, status=400)
+    return Response({'index': index, 'received': len(uploads.received_chunks(session))})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_session_complete(request, pk):
+    """Assemble the chunks and ingest them like a direct upload (``mode`` applies)."""
+    session = _get_session(request, pk)
+    if session is None:
+        return Response({'detail': 'Not found.'}, status=404)
+    if session.completed:
+        return Response({'detail': 'Upload already completed.'}, status=409)
+    missing = uploads.missing_chunks(session)
+    if missing:
+        missing_count = session.total_chunks - len(uploads.received_chunks(session))
+        return Response({'detail': 'Upload incomplete.', 'missing': missing,
+                         'missing_count': missing_count}, status=409)
+
+    # Flip the flag first so a concurrent complete call cannot ingest twice.
+    if not UploadSession.objects.filter(pk=session.pk, completed=False).update(completed=True):
+        return Response({'detail': 'Upload already completed.'}, status=409)
+    try:
+        path, content_hash = uploads.assemble(session)
+    except OSError as e:
+        # The chunks are kept, so the client can retry completing.
+        UploadSession.objects.filter(pk=session.pk).update(completed=False)
+        return Response({'detail': f'Failed to assemble upload: {e}'}, status=500)
+    uploads.discard(session)
+    return _ingest_upload(request, path, session.filename, session.total_size, content_hash)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, pk):
+    """Report progress of a background ingestion job queued by the requesting user.
+
+    Polling a job that is still queued, or whose worker went silent, kicks
+    the worker pool.
+    """
+    try:
+        job = IngestJob.objects.get(pk=pk, owner=request.user)
+    except IngestJob.DoesNotExist:
+        return Response({'detail': 'Not found.'}, status=404)
+    if job.state == IngestJob.QUEUED or jobs.is_stale(job):
+        jobs.kick()
+    return Response(IngestJobSerializer(job).data)
+
+
+def _negotiated_format(request, renderers):
+    """Format DRF will render ``request`` in, or None if nothing is acceptable.
+
+    ``condition`` runs before the view negotiates, so this repeats it.
+    """
+    try:
+        renderer, _ = DefaultContentNegotiation().select_renderer(
+            Request(request), [renderer() for renderer in renderers])
+    except NotAcceptable:
+        return None
+    return renderer.format
+
+
+def _format_etag(etag_func, renderers=api_settings.DEFAULT_RENDERER_CLASSES):
+    """``etag_func`` suffixed with the negotiated format, so every representation
+    under ``Vary: Accept`` has its own validator.
+    """
+    def etag(request, *args, **kwargs):
+        tag = etag_func(request, *args, **kwargs)
+        fmt = tag and _negotiated_format(request, renderers)
+        return fmt and f'{tag}.{fmt}'
+    return etag
+
+
+def _list_etag(request):
+    return cache.list_generation()['etag']
+
+
+def _list_modified(request):
+    return cache.list_generation()['modified']
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=_format_etag(_list_etag), last_modified_func=_list_modified)
 @api_view(['GET'])
 def datasets_list(request):
-    """Return last 5 datasets with summary stats."""
-    last5 = Dataset.objects.order_by('-uploaded_at')[:5]
-    results = []
-    for ds in last5:
-        qs = ds.equipment.all()
-        agg = qs.aggregate(
-            count=Count('id'),
-            avg_flowrate=Avg('flowrate'),
-            avg_pressure=Avg('pressure'),
-            avg_temperature=Avg('temperature')
-        )
-        types = list(qs.values('type').annotate(count=Count('id')))
-        results.append({
-            'id': ds.id,
-            'name': ds.name,
-            'uploaded_at': ds.uploaded_at,
-            'equipment_count': agg['count'] or 0,
-            'avg_flowrate': agg['avg_flowrate'] or 0,
-            'avg_pressure': agg['avg_pressure'] or 0,
-            'avg_temperature': agg['avg_temperature'] or 0,
-            'type_distribution': {t['type']: t['count'] for t in types}
-        })
-    return Response(results)
+    """Return last 5 datasets with summary stats.
+
+    Passing ``cursor`` or ``page_size`` pages through the full history
+    instead (see ``DatasetHistoryPagination``); follow ``next`` to go back
+    in time. Either way summaries are joined in, so one query per page.
+    Bodies are cached per list generation and carry ETag/Last-Modified.
+    """
+    datasets = Dataset.objects.select_related('summary')
+    # Pages link to ``next`` by absolute URL, so the host is part of the key.
+    key = cache.list_body_key(cache.list_generation(), request.build_absolute_uri())
+    if 'cursor' not in request.query_params and 'page_size' not in request.query_params:
+        def build():
+            last5 = datasets.order_by('-uploaded_at', '-id')[:5]
+            return DatasetSerializer(last5, many=True, context={'request': request}).data
+        return Response(cache.cached_body(key, build))
+
+    paginator = DatasetHistoryPagination()
+
+    def build_page():
+        page = paginator.paginate_queryset(datasets, request)
+        serializer = DatasetSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data).data
+    return Response(cache.cached_body(key, build_page))
+
+
+def _dataset_etag(request, pk):
+    pointer = cache.dataset_version(pk)
+    return pointer and pointer['etag']
 
 
+def _dataset_modified(request, pk):
+    pointer = cache.dataset_version(pk)
+    return pointer and pointer['modified']
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=_format_etag(_dataset_etag), last_modified_func=_dataset_modified)
 @api_view(['GET'])
 def dataset_summary(request, pk):
+    """Summary stats for one dataset, cached by its version (ETag aware)."""
+    pointer = cache.dataset_version(pk)
+    if pointer is None:
+        return Response({'detail': 'Not found.'}, status=404)
+
+    def build():
+        ds = Dataset.objects.select_related('summary').get(pk=pk)
+        return DatasetSerializer(ds, context={'request': request}).data
+    return Response(cache.cached_body(cache.dataset_body_key(pk, pointer), build))
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=_format_etag(_dataset_etag, BULK_RENDERERS), last_modified_func=_dataset_modified)
+@api_view(['GET'])
+@renderer_classes(BULK_RENDERERS)
+def dataset_stats(request, pk):
+    """min/max/mean/std, p50/p90/p99 and histograms, overall and by type/material.
+
+    Computed with NumPy from one fetch of the dataset's rows and cached by
+    dataset version like the summary.
+    """
+    pointer = cache.dataset_version(pk)
+    if pointer is None:
+        return Response({'detail': 'Not found.'}, status=404)
+
+    def build():
+        return stats.dataset_stats(Dataset.objects.get(pk=pk))
+    return Response(cache.cached_body(cache.dataset_body_key(pk, pointer, 'stats'), build))
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=_format_etag(_dataset_etag), last_modified_func=_dataset_modified)
+@api_view(['GET'])
+def dataset_series(request, pk):
+    """A chart-sized series of one parameter: ``parameter``, ``points`` (default
+    500) and ``method`` (``lttb`` or ``minmax``), cached by dataset version.
+    """
+    pointer = cache.dataset_version(pk)
+    if pointer is None:
+        return Response({'detail': 'Not found.'}, status=404)
+    try:
+        parameter, points, method = series.validate(
+            request.query_params.get('parameter', 'pressure'),
+            request.query_params.get('points', series.DEFAULT_POINTS),
+            request.query_params.get('method', 'lttb'),
+        )
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+
+    def build():
+        return series.downsample(Dataset.objects.get(pk=pk), parameter, points, method)
+    key = cache.dataset_body_key(pk, pointer, f'series:{parameter}:{method}:{points}')
+    return Response(cache.cached_body(key, build))
+
+
+@condition(etag_func=_dataset_etag, last_modified_func=_dataset_modified)
+@api_view(['GET'])
+def dataset_export_parquet(request, pk):
+    """The dataset's rows as a zstd Parquet file, cached on disk by dataset version."""
+    if not exports.PYARROW_AVAILABLE:
+        return Response({'detail': 'Parquet export not available (pyarrow missing).'}, status=501)
+    pointer = cache.dataset_version(pk)
+    if pointer is None:
+        return Response({'detail': 'Not found.'}, status=404)
+    queryset = Equipment.objects.filter(dataset_id=pk).order_by('id')
+    path = exports.cached_parquet(queryset, f'dataset-{pk}', pointer['etag'])
+    return exports.parquet_response(path, f'dataset_{pk}.parquet')
+
+
+@api_view(['GET'])
+def dataset_anomalies(request, pk):
+    """Paginated rows of a dataset flagged as per-type outliers, with reasons."""
+    if not Dataset.objects.filter(pk=pk).exists():
+        return Response({'detail': 'Not found.'}, status=404)
+    qs = Equipment.objects.filter(dataset_id=pk, is_anomalous=True).order_by('id')
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(qs, request)
+    return paginator.get_paginated_response(AnomalySerializer(page, many=True).data)
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=_format_etag(_list_etag), last_modified_func=_list_modified)
+@api_view(['GET'])
+def dataset_trends(request):
+    """Per-type (``group=type``, default) or per-name (``group=name``) series of
+    count and averages across datasets, one point per dataset.
+
+    ``start``/``end`` bound ``uploaded_at`` (ISO date or datetime) and
+    repeated ``key`` parameters pick the types or names to include.
+    """
+    group = request.query_params.get('group', 'type')
+    if group not in trends.GROUPINGS:
+        return Response({'detail': f'group must be one of {", ".join(trends.GROUPINGS)}.'}, status=400)
+    try:
+        start = trends.parse_bound(request.query_params.get('start'))
+        end = trends.parse_bound(request.query_params.get('end'), end=True)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+    keys = request.query_params.getlist('key')
+
+    def build():
+        return {'group': group, 'series': trends.trends(group, start, end, keys)}
+    key = cache.list_body_key(cache.list_generation(), 'trends:' + request.GET.urlencode())
+    return Response(cache.cached_body(key, build))
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def dataset_report(request, pk):
+    """Status of the dataset's report for its current version.
+
+    POST queues the report for background rendering (again, if it failed)
+    and returns 202 until it is ready. GET returns 404 when none was queued.
+    Once ``state`` is ``ready``, ``download`` links to the PDF.
+    """
     try:
         ds = Dataset.objects.get(pk=pk)
     except Dataset.DoesNotExist:
         return Response({'detail': 'Not found.'}, status=404)
 
-    qs = ds.equipment.all()
-    agg = qs.aggregate(
-        count=Count('id'),
-        avg_flowrate=Avg('flowrate'),
-        avg_pressure=Avg('pressure'),
-        avg_temperature=Avg('temperature')
-    )
-    types = list(qs.values('type').annotate(count=Count('id')))
-
-    return Response({
-        'id': ds.id,
-        'name': ds.name,
-        'uploaded_at': ds.uploaded_at,
-        'equipment_count': agg['count'] or 0,
-        'avg_flowrate': agg['avg_flowrate'] or 0,
-        'avg_pressure': agg['avg_pressure'] or 0,
-        'avg_temperature': agg['avg_temperature'] or 0,
-        'type_distribution': {t['type']: t['count'] for t in types}
-    })
+    status = 200
+    if request.method == 'POST':
+        artifact = reports.request_report(ds)
+        if artifact.state != ReportArtifact.READY:
+            status = 202
+    else:
+        artifact = ReportArtifact.objects.filter(dataset=ds, version=reports.current_version(ds)).first()
+        if artifact is None:
+            return Response({'detail': 'No report requested for the current data.'}, status=404)
+    data = ReportArtifactSerializer(artifact, context={'request': request}).data
+    return Response({'report': data}, status=status)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dataset_report_pdf(request, pk):
-    """Generate a PDF report for a dataset with a tabular layout."""
+    """The dataset's PDF report, served from the report store when fresh.
+
+    A stale or missing report (including one whose file has gone) is
+    rendered in the request and kept, unless ``mode=async`` is passed: the report is then queued and the response
+    is 202 with its status (see ``dataset_report``).
+    """
     try:
         ds = Dataset.objects.get(pk=pk)
     except Dataset.DoesNotExist:
         return Response({'detail': 'Not found.'}, status=404)
 
-    if not REPORTLAB_AVAILABLE:
+    if not reports.REPORTLAB_AVAILABLE:
         return Response({'detail': 'PDF generation not available (reportlab missing).'}, status=501)
 
-    # Build PDF using Platypus for nicer layout
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib import colors
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer)
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Paragraph(f"Dataset Report: {ds.name}", styles['Title']))
-    story.append(Spacer(1, 12))
-
-    qs = ds.equipment.all()
-    agg = qs.aggregate(
-        count=Count('id'),
-        avg_flowrate=Avg('flowrate'),
-        avg_pressure=Avg('pressure'),
-        avg_temperature=Avg('temperature')
-    )
-
-    story.append(Paragraph(f"Uploaded: {ds.uploaded_at}", styles['Normal']))
-    story.append(Paragraph(f"Equipment Count: {agg['count'] or 0}", styles['Normal']))
-    story.append(Paragraph(f"Avg Flowrate: {round(agg['avg_flowrate'] or 0,2)}", styles['Normal']))
-    story.append(Paragraph(f"Avg Pressure: {round(agg['avg_pressure'] or 0,2)}", styles['Normal']))
-    story.append(Paragraph(f"Avg Temperature: {round(agg['avg_temperature'] or 0,2)}", styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Table header
-    data = [["Name", "Type", "Flowrate", "Pressure", "Temperature"]]
-    for e in qs:
-        data.append([e.name, e.type, str(e.flowrate), str(e.pressure), str(e.temperature)])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#007bff')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-
-    story.append(table)
-
-    doc.build(story)
-    buffer.seek(0)
-
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="dataset_{ds.id}.pdf"'
-    return response
+    artifact = reports.fresh_report(ds)
+    if artifact is None and request.query_params.get('mode') == 'async':
+        artifact = reports.request_report(ds)
+        if artifact.state != ReportArtifact.READY:
+            data = ReportArtifactSerializer(artifact, context={'request': request}).data
+            return Response({'report': data}, status=202)
+    if artifact is None:
+        artifact, _ = reports.ensure_report(ds)
+    if artifact.state != ReportArtifact.READY:
+        return Response({'detail': artifact.error or 'Report is being generated.'},
+                        status=500 if artifact.state == ReportArtifact.FAILED else 503)
+
+    try:
+        pdf = open(artifact.path, 'rb')
+    except FileNotFoundError:
+        # Purged since it was checked: queue it again.
+        artifact.delete()
+        artifact = reports.request_report(ds)
+        data = ReportArtifactSerializer(artifact, context={'request': request}).data
+        return Response({'report': data}, status=202)
+    return FileResponse(pdf, as_attachment=True, filename=f'dataset_{ds.id}.pdf',
+                        content_type='application/pdf')
@@ -16,12 +16,42 @@ if False:  # pragma: no cover
     import matplotlib.backends.backend_qt5agg  # noqa: F401
     import matplotlib  # noqa: F401
 
+import bisect
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Optional binary wire formats; JSON is used when neither is installed
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 API_BASE = 'http://127.0.0.1:8000/api'
 CONFIG_FILENAME = '.chemical_visualizer_config.json'
+# Unfinished upload sessions, keyed by file, so a later run can resume them
+PENDING_UPLOADS_FILENAME = '.chemical_visualizer_uploads.json'
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 4
+
+# Points requested per chart; the server downsamples larger datasets (LTTB)
+CHART_POINTS = 500
+# Labelled x ticks per chart; other points are named in the hover tooltip
+CHART_TICKS = 8
+
+# Columns shown in the equipment table; only these are fetched
+TABLE_FIELDS = ('name', 'type', 'material', 'flowrate', 'pressure', 'temperature')
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
 
 THEME_CSS = """
 QWidget { background-color: #fffaf0; font-family: "Segoe UI", Arial; }
@@ -51,21 +81,43 @@ class PlotCanvas(FigureCanvas):
         self.axes = fig.add_subplot(111)
         super().__init__(fig)
         self.setParent(parent)
+        self._hover = None
+        self.mpl_connect('motion_notify_event', self._show_point)
 
-    def plot_bar(self, labels, values, title=''):
-        self.axes.clear()
-        self.axes.bar(labels, values)
-        self.axes.set_title(title)
-        self.axes.tick_params(axis='x', rotation=45)
-        self.draw()
+    def plot_series(self, series, title='', kind='line'):
+        """Plot a downsampled series against its row positions.
 
-    def plot_line(self, labels, values, title=''):
+        ``series['index']`` is numeric, so repeated names stay separate points;
+        names label a handful of ticks and show in a tooltip on hover.
+        """
         self.axes.clear()
-        self.axes.plot(labels, values, marker='o')
+        index, values, names = series['index'], series['value'], series['name']
+        if kind == 'bar':
+            gaps = [b - a for a, b in zip(index, index[1:])]
+            self.axes.bar(index, values, width=0.8 * min(gaps) if gaps else 0.8)
+        else:
+            self.axes.plot(index, values, marker='o', markersize=3)
         self.axes.set_title(title)
-        self.axes.tick_params(axis='x', rotation=45)
+        self.axes.set_xlabel('Row')
+        ticks = list(range(0, len(index), max(1, len(index) // CHART_TICKS)))
+        self.axes.set_xticks([index[i] for i in ticks])
+        self.axes.set_xticklabels([names[i] for i in ticks], rotation=45, ha='right', fontsize=8)
+        self._hover = (index, values, names)
         self.draw()
 
+    def _show_point(self, event):
+        """Tooltip with the name and value of the point nearest the cursor."""
+        if not self._hover or event.inaxes is not self.axes or event.xdata is None:
+            self.setToolTip('')
+            return
+        index, values, names = self._hover
+        if not index:
+            return
+        i = bisect.bisect_left(index, event.xdata)
+        if i == len(index) or (i > 0 and event.xdata - index[i - 1] < index[i] - event.xdata):
+            i -= 1
+        self.setToolTip(f'{names[i]} (row {index[i]}): {values[i]:g}')
+
 
 class MainWindow(QtWidgets.QWidget):
     def __init__(self):
@@ -197,15 +249,11 @@ class MainWindow(QtWidgets.QWidget):
             return
         dsid = self.datasets[idx]['id']
         try:
-            res = requests.get(f'{self.api_base}/equipment/?dataset={dsid}', timeout=5)
-            res.raise_for_status()
-            data = res.json().get('results', [])
-            self.populate_table(data)
-            labels = [d['name'] for d in data]
-            pressures = [d['pressure'] for d in data]
-            temps = [d['temperature'] for d in data]
-            self.pressure_canvas.plot_bar(labels, pressures, 'Pressure')
-            self.temp_canvas.plot_line(labels, temps, 'Temperature')
+            self.populate_table(fetch_equipment(self.api_base, dsid))
+            pressures = fetch_series(self.api_base, dsid, 'pressure')
+            temps = fetch_series(self.api_base, dsid, 'temperature')
+            self.pressure_canvas.plot_series(pressures, 'Pressure', kind='bar')
+            self.temp_canvas.plot_series(temps, 'Temperature')
             self.status_label.setText(f"Showing dataset: {self.datasets[idx]['name']}")
         except requests.exceptions.ConnectionError as e:
             self.status_label.setText('Disconnected — cannot reach backend')
@@ -224,29 +272,42 @@ class MainWindow(QtWidgets.QWidget):
             self.table.setItem(r, 5, QtWidgets.QTableWidgetItem(str(item.get('temperature') or '')))
 
     def upload_csv(self):
-        fname, _ = QFileDialog.getOpenFileName(self, 'Select CSV', '', 'CSV Files (*.csv)')
+        fname, _ = QFileDialog.getOpenFileName(self, 'Select data file', '', 'Data Files (*.csv *.parquet *.feather *.arrow);;CSV Files (*.csv)')
         if not fname:
             return
+        progress = QtWidgets.QProgressDialog('Uploading...', None, 0, 100, self)
+        progress.setWindowTitle('Upload')
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        def on_progress(done, total):
+            progress.setMaximum(max(total, 1))
+            progress.setValue(done)
+            self.status_label.setText(f'Uploading — chunk {done}/{total}')
+            QtWidgets.QApplication.processEvents()
+
         try:
-            with open(fname, 'rb') as f:
-                filename = os.path.basename(fname)
-                files = {'file': (filename, f, 'text/csv')}
-                headers = {}
-                if getattr(self, 'token', None):
-                    headers['Authorization'] = f'Token {self.token}'
-                res = requests.post(f'{self.api_base}/upload/', files=files, headers=headers)
-                res.raise_for_status()
-                created = res.json().get('created')
-                QMessageBox.information(self, 'Success', f"Upload complete — created {created} items.")
-                self.load_datasets()
-                self.status_label.setText(f'Upload complete — {created} items added')
-                try:
-                    self.show_toast(f'Upload complete — {created} items')
-                except Exception:
-                    pass
+            result = chunked_upload(fname, getattr(self, 'token', None), self.api_base, progress=on_progress)
+            progress.close()
+            created = result.get('created')
+            if result.get('duplicate'):
+                message = f"Already uploaded — this file matches dataset \"{result['dataset']['name']}\"."
+            else:
+                message = f'Upload complete — created {created} items.'
+            QMessageBox.information(self, 'Success', message)
+            self.load_datasets()
+            self.status_label.setText(message)
+            try:
+                self.show_toast(message)
+            except Exception:
+                pass
         except requests.exceptions.ConnectionError as e:
+            progress.close()
+            self.status_label.setText('Upload interrupted — it will resume on the next try')
             self.show_connection_error_dialog(e)
         except Exception as e:
+            progress.close()
             QMessageBox.warning(self, 'Error', f'Upload failed: {e}')
 
     def download_report(self):
@@ -513,26 +574,173 @@ class MainWindow(QtWidgets.QWidget):
             QtWidgets.QApplication.quit()
 
 
-def headless_upload(csv_path, token, api_base=API_BASE):
-    """Upload CSV in a headless mode for CI. Returns 0 on success, non-zero otherwise."""
+def accept_header():
+    """Accept header preferring the binary formats this client can decode."""
+    types = []
+    if pa is not None:
+        types.append(ARROW_MEDIA_TYPE)
+    if msgpack is not None:
+        types.append(f'{MSGPACK_MEDIA_TYPE};q=0.9')
+    types.append('application/json;q=0.5')
+    return ', '.join(types)
+
+
+def decode_response(res):
+    """Body of a list response in whichever format the server chose.
+
+    An Arrow body is one table: its columns become a columnar ``results``
+    and the pagination fields come from the schema metadata.
+    """
+    content_type = res.headers.get('Content-Type', '').split(';')[0].strip()
+    if content_type == ARROW_MEDIA_TYPE and pa is not None:
+        table = pa.ipc.open_stream(res.content).read_all()
+        meta = json.loads((table.schema.metadata or {}).get(b'meta', b'{}'))
+        return dict(meta, results=table.to_pydict())
+    if content_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+        return msgpack.unpackb(res.content)
+    return res.json()
+
+
+def fetch_equipment(api_base, dsid, fields=TABLE_FIELDS):
+    """Rows of a dataset's first equipment page, fetched in the columnar layout."""
+    res = requests.get(
+        f'{api_base}/equipment/',
+        params={'dataset': dsid, 'fields': ','.join(fields), 'layout': 'columnar'},
+        headers={'Accept': accept_header()},
+        timeout=5,
+    )
+    res.raise_for_status()
+    columns = decode_response(res).get('results', {})
+    return [dict(zip(fields, row)) for row in zip(*(columns.get(f, []) for f in fields))]
+
+
+def fetch_series(api_base, dsid, parameter, points=CHART_POINTS):
+    """Chart-sized series of ``parameter`` for a dataset, downsampled server-side."""
+    res = requests.get(
+        f'{api_base}/datasets/{dsid}/series/',
+        params={'parameter': parameter, 'points': points},
+        timeout=10,
+    )
+    res.raise_for_status()
+    return res.json()
+
+
+def _load_pending_uploads():
+    path = Path.home() / PENDING_UPLOADS_FILENAME
+    try:
+        with open(path, 'r') as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+
+def _save_pending_uploads(pending):
     try:
+        with open(Path.home() / PENDING_UPLOADS_FILENAME, 'w') as fh:
+            json.dump(pending, fh)
+    except Exception as e:
+        print('save pending uploads error:', e)
+
+
+def chunked_upload(csv_path, token, api_base=API_BASE, progress=None, workers=UPLOAD_WORKERS):
+    """Upload a file through the resumable upload-session API.
+
+    Chunks are sent in parallel and retried with backoff. If a previous run
+    was interrupted, the server-side session is resumed and only the missing
+    chunks are sent. ``progress(done, total)`` is called as chunks land.
+    Returns the JSON from the completed upload.
+    """
+    headers = {}
+    if token:
+        headers['Authorization'] = f'Token {token}'
+    size = os.path.getsize(csv_path)
+    key = f'{os.path.abspath(csv_path)}|{size}|{int(os.path.getmtime(csv_path))}|{api_base}'
+    pending = _load_pending_uploads()
+
+    session = None
+    if key in pending:
+        res = requests.get(f'{api_base}/uploads/{pending[key]}/', headers=headers, timeout=10)
+        if res.status_code == 200 and not res.json().get('completed'):
+            session = res.json()
+    if session is None:
+        res = requests.post(f'{api_base}/uploads/', headers=headers, timeout=10, json={
+            'filename': os.path.basename(csv_path),
+            'total_size': size,
+            'chunk_size': UPLOAD_CHUNK_SIZE,
+        })
+        res.raise_for_status()
+        session = res.json()
+        pending[key] = session['id']
+        _save_pending_uploads(pending)
+
+    sid = session['id']
+    chunk_size = session['chunk_size']
+    total = session['total_chunks']
+    done = total - session['missing_count']
+    if progress:
+        progress(done, total)
+
+    def send(index):
         with open(csv_path, 'rb') as fh:
-            files = {'file': (os.path.basename(csv_path), fh, 'text/csv')}
-            headers = {}
-            if token:
-                headers['Authorization'] = f'Token {token}'
-            res = requests.post(f'{api_base}/upload/', files=files, headers=headers, timeout=60)
-            print('Status:', res.status_code)
+            fh.seek(index * chunk_size)
+            data = fh.read(chunk_size)
+        chunk_headers = dict(headers, **{'Content-Type': 'application/octet-stream'})
+        for attempt in range(UPLOAD_RETRIES):
             try:
-                print('Response JSON:', res.json())
-            except Exception:
-                print('Response text:', res.text)
-            if res.status_code == 200 and res.json().get('created', 0) > 0:
-                print('Headless upload: success')
-                return 0
-            else:
-                print('Headless upload: failed or no rows created')
-                return 2
+                res = requests.put(f'{api_base}/uploads/{sid}/chunks/{index}/', data=data, headers=chunk_headers, timeout=60)
+                if res.status_code < 500:
+                    res.raise_for_status()
+                    return index
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == UPLOAD_RETRIES - 1:
+                    raise
+            time.sleep(2 ** attempt)
+        res.raise_for_status()
+
+    # The server lists a limited number of missing chunks at a time.
+    missing = session['missing']
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while missing:
+            for future in as_completed([pool.submit(send, i) for i in missing]):
+                future.result()
+                done += 1
+                if progress:
+                    progress(done, total)
+            res = requests.get(f'{api_base}/uploads/{sid}/', headers=headers, timeout=10)
+            res.raise_for_status()
+            missing = res.json()['missing']
+
+    res = requests.post(f'{api_base}/uploads/{sid}/complete/', headers=headers, timeout=600)
+    # Keep the session only if the server says chunks are still missing
+    if not (res.status_code == 409 and res.json().get('missing')):
+        pending.pop(key, None)
+        _save_pending_uploads(pending)
+    res.raise_for_status()
+    return res.json()
+
+
+def headless_upload(csv_path, token, api_base=API_BASE):
+    """Upload CSV in a headless mode for CI. Returns 0 on success, non-zero otherwise."""
+    def progress(done, total):
+        print(f'Uploaded chunk {done}/{total}')
+
+    try:
+        result = chunked_upload(csv_path, token, api_base, progress=progress)
+        print('Response JSON:', result)
+        if result.get('duplicate'):
+            print('Headless upload: success (identical content already uploaded)')
+            return 0
+        if result.get('created', 0) > 0:
+            print('Headless upload: success')
+            return 0
+        else:
+            print('Headless upload: failed or no rows created')
+            return 2
+    except requests.exceptions.HTTPError as e:
+        print('Status:', e.response.status_code)
+        print('Response text:', e.response.text)
+        print('Headless upload: failed or no rows created')
+        return 2
     except Exception as e:
         print('Headless upload error:', e)
         return 3
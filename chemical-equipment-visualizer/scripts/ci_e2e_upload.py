@@ -43,6 +43,9 @@ with open(CSV_PATH, 'rb') as fh:
         print('Resp text:', r.text)
     if r.status_code != 200:
         sys.exit(1)
+    if r.json().get('duplicate'):
+        print('Identical content already uploaded as dataset', r.json()['dataset']['id'])
+        sys.exit(0)
     created = r.json().get('created', 0)
     if created <= 0:
         print('No rows created; failing')